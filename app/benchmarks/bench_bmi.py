@@ -0,0 +1,52 @@
+"""
+Calculates BMI and category for a synthetic population.
+
+Compares BMICalculator.calculate_many with the per-row calculate loop the
+GET /bmi endpoint runs for every request.
+
+Run from the app directory:
+    python -m benchmarks.bench_bmi [rows]
+"""
+
+import logging
+import sys
+import time
+
+import numpy as np
+
+from services.bmi_calculator.main import BMICalculator
+
+
+def per_row(weights, heights):
+    results = []
+    for weight, height in zip(weights, heights, strict=True):
+        bmi = BMICalculator.calculate(weight, height)
+        results.append((bmi, BMICalculator.category(bmi) if bmi is not None else None))
+    return results
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    # Keep the per-row loop from logging every out-of-range row
+    logging.getLogger("services.bmi_calculator.main").setLevel(logging.CRITICAL)
+
+    rng = np.random.default_rng(0)
+    weights = np.round(rng.normal(75, 20, rows), 1)
+    heights = np.round(rng.normal(170, 12, rows))
+    print(f"{rows:,} rows")
+
+    started = time.perf_counter()
+    per_row(weights.tolist(), heights.tolist())
+    loop_seconds = time.perf_counter() - started
+    print(f"per-row loop:   {loop_seconds:8.3f} s")
+
+    started = time.perf_counter()
+    batch = BMICalculator.calculate_many(weights, heights)
+    batch.categories()
+    vector_seconds = time.perf_counter() - started
+    print(f"calculate_many: {vector_seconds:8.3f} s")
+    print(f"speed-up:       {loop_seconds / vector_seconds:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
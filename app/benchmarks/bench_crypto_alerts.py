@@ -0,0 +1,80 @@
+"""
+Evaluates 1M price alerts against a synthetic price series.
+
+Compares the sorted threshold index in crypto_price_alert.alerts with the
+previous linear scan over every user's {"above", "below"} dict.
+
+Run from the app directory:
+    python -m benchmarks.bench_crypto_alerts [alerts] [ticks]
+"""
+
+import random
+import sys
+import time
+
+from services.crypto_price_alert.alerts import AlertBook
+
+
+def linear_scan(alerts, price):
+    """The evaluation loop check_price_alerts used before the index."""
+    fired = []
+    for user, alert_price in alerts.items():
+        if (alert_price["above"] and price >= alert_price["above"]) or (
+            alert_price["below"] and price <= alert_price["below"]
+        ):
+            fired.append(user)
+    return fired
+
+
+def price_series(ticks, start=50000.0, volatility=0.002):
+    price = start
+    series = []
+    for _ in range(ticks):
+        price *= 1 + random.gauss(0, volatility)
+        series.append(price)
+    return series
+
+
+def main():
+    n_alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    random.seed(42)
+
+    alerts = {}
+    for i in range(n_alerts):
+        threshold = random.uniform(25000, 75000)
+        if i % 2:
+            alerts[f"user{i}"] = {"above": threshold, "below": None}
+        else:
+            alerts[f"user{i}"] = {"above": None, "below": threshold}
+    series = price_series(n_ticks)
+
+    started = time.perf_counter()
+    book = AlertBook()
+    book.load(
+        ("bitcoin", user, thresholds["above"], thresholds["below"])
+        for user, thresholds in alerts.items()
+    )
+    build = time.perf_counter() - started
+
+    book.evaluate("bitcoin", series[0])
+    started = time.perf_counter()
+    fired = sum(len(book.evaluate("bitcoin", price)) for price in series[1:])
+    indexed = time.perf_counter() - started
+
+    scan_ticks = min(n_ticks, 20)
+    started = time.perf_counter()
+    for price in series[:scan_ticks]:
+        linear_scan(alerts, price)
+    scan = (time.perf_counter() - started) / scan_ticks
+
+    per_tick = indexed / max(n_ticks - 1, 1)
+    print(f"alerts: {n_alerts:,}, ticks: {n_ticks:,}")
+    print(f"index build: {build:.2f} s")
+    print(f"indexed evaluation: {per_tick * 1e6:.1f} us/tick ({fired:,} fired)")
+    print(f"linear scan: {scan * 1e3:.1f} ms/tick (sampled over {scan_ticks} ticks)")
+    print(f"speedup: {scan / per_tick:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Serializes a parsed CSV in each output format of csv_tool.
+
+Compares the records JSON upload_csv returns by default (FastAPI encodes the
+list of row dicts) with the column-oriented JSON, Arrow IPC and Parquet
+outputs, reporting serialization time and payload size. The pyarrow formats
+are skipped when pyarrow is not installed.
+
+Run from the app directory:
+    python -m benchmarks.bench_csv_formats [rows]
+"""
+
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from services.csv_tool.formats import to_arrow, to_columns_json, to_parquet
+
+
+def records(df):
+    """What upload_csv returns and FastAPI then serializes."""
+    return json.dumps(jsonable_encoder(df.to_dict(orient="records"))).encode()
+
+
+def frame(rows):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "id": np.arange(rows),
+            "user_id": rng.integers(0, 10_000, rows),
+            "amount": np.round(rng.normal(100, 30, rows), 2),
+            "ratio": rng.random(rows),
+            "country": rng.choice(["DE", "FR", "US", "JP", "BR"], rows),
+            "status": rng.choice(["new", "paid", "refunded"], rows),
+        }
+    )
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    df = frame(rows)
+    print(f"{rows:,} rows x {len(df.columns)} columns")
+
+    writers = {
+        "records JSON": records,
+        "columns JSON": to_columns_json,
+        "Arrow IPC": to_arrow,
+        "Parquet": to_parquet,
+    }
+    baseline = None
+    for name, write in writers.items():
+        started = time.perf_counter()
+        try:
+            payload = write(df)
+        except ImportError:
+            print(f"{name:14s} skipped, pyarrow is not installed")
+            continue
+        seconds = time.perf_counter() - started
+        size = len(payload) if isinstance(payload, bytes) else payload.nbytes
+        baseline = baseline or (seconds, size)
+        print(
+            f"{name:14s} {seconds:8.3f} s {size / 1e6:9.1f} MB  "
+            f"{baseline[0] / seconds:6.1f}x faster  "
+            f"{size / baseline[1]:6.1%} of the size"
+        )
+
+
+if __name__ == "__main__":
+    main()
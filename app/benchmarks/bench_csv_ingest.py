@@ -0,0 +1,85 @@
+"""
+Parses a generated CSV single-threaded and with csv_tool's parallel ingest.
+
+Compares pd.read_csv (what upload_csv runs) with read_csv_parallel, with
+sampled and with explicit column types, and with pyarrow's multithreaded
+reader. The file has integer, float, text, quoted-with-comma and boolean
+columns and is generated once in the temp directory.
+
+Run from the app directory:
+    python -m benchmarks.bench_csv_ingest [megabytes] [workers]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.csv_tool.ingest import read_csv_parallel
+
+SCHEMA = {
+    "id": "int64",
+    "user_id": "int64",
+    "amount": "float64",
+    "country": "string",
+    "comment": "string",
+    "paid": "bool",
+}
+
+
+def generate(path, megabytes):
+    rng = np.random.default_rng(0)
+    rows = 200_000
+    with open(path, "w") as out:
+        out.write(",".join(SCHEMA) + "\n")
+        start = 0
+        while out.tell() < megabytes * 1024 * 1024:
+            frame = pd.DataFrame(
+                {
+                    "id": np.arange(start, start + rows),
+                    "user_id": rng.integers(0, 1_000_000, rows),
+                    "amount": np.round(rng.normal(100, 30, rows), 2),
+                    "country": rng.choice(["DE", "FR", "US", "JP", "BR"], rows),
+                    "comment": rng.choice(["ok", "late, again", "gift"], rows),
+                    "paid": rng.random(rows) < 0.7,
+                }
+            )
+            frame.to_csv(out, header=False, index=False)
+            start += rows
+
+
+def timed(name, parse):
+    started = time.perf_counter()
+    frame = parse()
+    seconds = time.perf_counter() - started
+    print(f"{name:32s} {seconds:8.2f} s  {len(frame):,} rows")
+    return seconds
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    path = os.path.join(tempfile.gettempdir(), f"bench_csv_ingest_{megabytes}.csv")
+    if not os.path.exists(path):
+        generate(path, megabytes)
+    print(f"{os.path.getsize(path) / 1e6:,.0f} MB, {workers} workers")
+
+    baseline = timed("pd.read_csv", lambda: pd.read_csv(path))
+    for name, parse in (
+        ("parallel, sampled types", lambda: read_csv_parallel(path, workers)),
+        ("parallel, explicit types", lambda: read_csv_parallel(path, workers, SCHEMA)),
+    ):
+        print(f"{'':32s} {baseline / timed(name, parse):8.1f}x")
+    try:
+        import pyarrow.csv as pacsv
+    except ImportError:
+        print("pyarrow multithreaded reader skipped, pyarrow is not installed")
+        return
+    timed("pyarrow multithreaded reader", lambda: pacsv.read_csv(path))
+
+
+if __name__ == "__main__":
+    main()
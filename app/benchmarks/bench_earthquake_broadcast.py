@@ -0,0 +1,102 @@
+"""
+Delivers alerts to many in-memory websocket clients, one of them stalled.
+
+Compares the loop the service used before, which serialized each event for
+every connection and awaited the sends one after another, with the
+EarthquakeBroadcaster. Reports how long the healthy clients take to
+receive every alert.
+
+Run from the app directory:
+    python -m benchmarks.bench_earthquake_broadcast [clients] [events] [stall]
+"""
+
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+
+from services.earthquake_alert.broadcast import EarthquakeBroadcaster
+from services.earthquake_alert.main import Earthquake
+
+
+class Client:
+    def __init__(self, stall=0.0):
+        self.stall = stall
+        self.received = 0
+        self.done = asyncio.Event()
+        self.expected = 0
+
+    async def send_text(self, message):
+        await asyncio.sleep(self.stall)
+        self.received += 1
+        if self.received == self.expected:
+            self.done.set()
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data))
+
+    async def receive_text(self):
+        await asyncio.Event().wait()
+
+    async def close(self, code=1000):
+        pass
+
+
+async def sequential(clients, earthquakes):
+    for earthquake in earthquakes:
+        for connection in clients:
+            await connection.send_json(earthquake.model_dump(mode="json"))
+
+
+async def broadcast(clients, earthquakes, stall):
+    broadcaster = EarthquakeBroadcaster(send_timeout=stall / 2)
+    tasks = [
+        asyncio.create_task(broadcaster.serve(broadcaster.subscribe(client)))
+        for client in clients
+    ]
+    await asyncio.sleep(0)
+    broadcaster.publish(earthquakes)
+    await asyncio.gather(
+        *(client.done.wait() for client in clients if not client.stall)
+    )
+    await broadcaster.aclose()
+    await asyncio.gather(*tasks)
+
+
+async def run(clients, events, stall):
+    earthquakes = [
+        Earthquake(
+            id=f"us{i:08d}",
+            magnitude=5.0,
+            latitude=35.0,
+            longitude=139.0,
+            depth=10.0,
+            time=datetime(2024, 1, 1),
+            location_description="Somewhere",
+        )
+        for i in range(events)
+    ]
+    print(f"{clients:,} clients, {events} alerts, one client stalls {stall:g} s")
+    for name, deliver in (
+        ("sequential", lambda c: sequential(c, earthquakes)),
+        ("broadcaster", lambda c: broadcast(c, earthquakes, stall)),
+    ):
+        connections = [Client(stall)] + [Client() for _ in range(clients - 1)]
+        for connection in connections:
+            connection.expected = events
+        started = time.perf_counter()
+        await deliver(connections)
+        seconds = time.perf_counter() - started
+        print(f"{name:12} {seconds * 1e3:9.1f} ms")
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    stall = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    asyncio.run(run(clients, events, stall))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Polls a synthetic USGS feed served from memory.
+
+Compares a poll the way update_earthquake_data did it before, where every
+feature of the feed was converted to a model on every poll, with the
+incremental FeedPoller when the feed is unchanged (a 304) and when only a
+few features were updated since the last poll.
+
+Run from the app directory:
+    python -m benchmarks.bench_earthquake_feed [features] [changed]
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+
+from services.earthquake_alert.feed import FeedPoller
+from services.earthquake_alert.main import Earthquake, convert_usgs_to_earthquake
+from services.earthquake_alert.store import EarthquakeStore
+from services.http_client import OutboundClient, OutboundConfig
+
+
+def feed(features, changed, revision):
+    return {
+        "features": [
+            {
+                "id": f"us{i:08d}",
+                "properties": {
+                    "mag": 1.0 + i % 50 / 10,
+                    "time": 1704067200000 + i * 60000,
+                    "updated": revision if i >= features - changed else 1,
+                    "place": "Somewhere",
+                },
+                "geometry": {"coordinates": [i % 360 - 180, i % 180 - 90, 10.0]},
+            }
+            for i in range(features)
+        ]
+    }
+
+
+async def run(features, changed):
+    # Encoded up front, so only the polling side is timed
+    bodies = [json.dumps(feed(features, changed, revision)) for revision in (2, 2, 3)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers.get("If-None-Match") == '"same"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=bodies.pop(0), headers={"ETag": '"v"'})
+
+    client = OutboundClient(
+        OutboundConfig(), async_transport=httpx.MockTransport(handler)
+    )
+    url = "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/all_week.geojson"
+    store = EarthquakeStore(Earthquake)
+    started = time.perf_counter()
+    response = await client.aget(url)
+    for feature in response.json()["features"]:
+        store.add(convert_usgs_to_earthquake(feature))
+    full = time.perf_counter() - started
+
+    poller = FeedPoller("week", client)
+    for feature in await poller.poll():
+        store.upsert(convert_usgs_to_earthquake(feature))
+    started = time.perf_counter()
+    for feature in await poller.poll():
+        store.upsert(convert_usgs_to_earthquake(feature))
+    incremental = time.perf_counter() - started
+
+    poller._validators = {url: ('"same"', None)}
+    started = time.perf_counter()
+    assert await poller.poll() == []
+    not_modified = time.perf_counter() - started
+
+    print(f"{features:,} features, {changed:,} changed per poll")
+    print(f"full poll:        {full * 1e3:8.1f} ms")
+    print(f"incremental poll: {incremental * 1e3:8.1f} ms")
+    print(f"304 poll:         {not_modified * 1e3:8.1f} ms")
+
+
+def main():
+    features = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    changed = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(run(features, changed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Filters a synthetic history of earthquakes the ways get_earthquakes can.
+
+Compares the list of models the service kept before, which every request
+copied and ran successive comprehensions over, with the columnar
+EarthquakeStore, which cuts the time window by binary search, masks the
+rest and builds models only for the rows returned.
+
+Run from the app directory:
+    python -m benchmarks.bench_earthquake_query [events]
+"""
+
+import sys
+import time
+from datetime import timedelta
+
+from benchmarks.bench_earthquake_store import history
+from services.earthquake_alert.main import Earthquake, calculate_distance
+from services.earthquake_alert.store import EarthquakeStore
+
+
+def list_query(
+    db,
+    min_magnitude=None,
+    max_magnitude=None,
+    start_time=None,
+    end_time=None,
+    latitude=None,
+    longitude=None,
+    radius_km=None,
+):
+    """The filters get_earthquakes applied to the list of models."""
+    filtered = db.copy()
+    if min_magnitude is not None:
+        filtered = [eq for eq in filtered if eq.magnitude >= min_magnitude]
+    if max_magnitude is not None:
+        filtered = [eq for eq in filtered if eq.magnitude <= max_magnitude]
+    if start_time is not None:
+        filtered = [eq for eq in filtered if eq.time >= start_time]
+    if end_time is not None:
+        filtered = [eq for eq in filtered if eq.time <= end_time]
+    if latitude is not None and longitude is not None and radius_km is not None:
+        filtered = [
+            eq
+            for eq in filtered
+            if calculate_distance(eq.latitude, eq.longitude, latitude, longitude)
+            <= radius_km
+        ]
+    return filtered
+
+
+def timed(function, **query):
+    started = time.perf_counter()
+    result = function(**query)
+    return time.perf_counter() - started, len(result)
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    earthquakes = history(events)
+    store = EarthquakeStore(Earthquake, earthquakes)
+    store.query()  # Merges the pending rows
+    end_time = earthquakes[-1].time
+    month = end_time - timedelta(days=30)
+    queries = {
+        "last 30 days": dict(start_time=month),
+        "magnitude >= 6": dict(min_magnitude=6.0),
+        "30 days, >= 2.5, 500 km": dict(
+            start_time=month,
+            min_magnitude=2.5,
+            latitude=35.0,
+            longitude=-118.0,
+            radius_km=500.0,
+        ),
+        "all, 4-5, 500 km": dict(
+            min_magnitude=4.0,
+            max_magnitude=5.0,
+            latitude=35.0,
+            longitude=-118.0,
+            radius_km=500.0,
+        ),
+    }
+    print(f"{events:,} events")
+    for name, query in queries.items():
+        before, count = timed(list_query, db=earthquakes, **query)
+        after, found = timed(
+            store.query,
+            start=query.get("start_time"),
+            end=query.get("end_time"),
+            min_magnitude=query.get("min_magnitude"),
+            max_magnitude=query.get("max_magnitude"),
+            latitude=query.get("latitude"),
+            longitude=query.get("longitude"),
+            radius_km=query.get("radius_km"),
+        )
+        assert found == count
+        print(
+            f"{name:24} list {before * 1e3:9.1f} ms   "
+            f"columnar {after * 1e3:8.2f} ms   {count:,} rows"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Answers "within 200 km of me" queries over a synthetic global history.
+
+Compares the linear scan get_earthquakes used before, which called
+calculate_distance on every stored event, with EarthquakeStore.within,
+which prunes to the grid cells around the point and runs a vectorized
+haversine on their events only.
+
+Run from the app directory:
+    python -m benchmarks.bench_earthquake_spatial [events] [radius_km]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_earthquake_store import history
+from services.earthquake_alert.main import Earthquake, calculate_distance
+from services.earthquake_alert.store import EarthquakeStore
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    radius_km = float(sys.argv[2]) if len(sys.argv) > 2 else 200.0
+    earthquakes = history(events)
+    store = EarthquakeStore(Earthquake, earthquakes)
+    store.within(0.0, 0.0, 0.0)  # Merges the pending rows
+    rng = np.random.default_rng(1)
+    points = list(
+        zip(rng.uniform(-80, 80, 20), rng.uniform(-180, 180, 20), strict=True)
+    )
+    print(f"{events:,} events, {len(points)} queries of {radius_km:g} km")
+
+    started = time.perf_counter()
+    scanned = [
+        [
+            eq
+            for eq in earthquakes
+            if calculate_distance(eq.latitude, eq.longitude, latitude, longitude)
+            <= radius_km
+        ]
+        for latitude, longitude in points[:3]
+    ]
+    scan = (time.perf_counter() - started) / 3
+
+    started = time.perf_counter()
+    found = [
+        store.within(latitude, longitude, radius_km) for latitude, longitude in points
+    ]
+    grid = (time.perf_counter() - started) / len(points)
+    for expected, actual in zip(scanned, found[:3], strict=True):
+        assert {eq.id for eq in expected} == {eq.id for eq in actual}
+
+    matches = sum(map(len, found)) / len(found)
+    print(f"linear scan: {scan * 1e3:10.2f} ms per query")
+    print(f"grid index:  {grid * 1e3:10.2f} ms per query, {matches:.0f} matches")
+
+
+if __name__ == "__main__":
+    main()
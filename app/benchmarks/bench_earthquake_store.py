@@ -0,0 +1,95 @@
+"""
+Ingests a synthetic history of earthquakes and looks events up by id.
+
+Compares EarthquakeStore with the list the service used before, where every
+ingested feature ran a duplicate check over the whole list and every
+lookup scanned it. The list is only timed on a slice of the history, as it
+is quadratic; its time for the full history is extrapolated.
+
+Run from the app directory:
+    python -m benchmarks.bench_earthquake_store [events] [list_events]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from services.earthquake_alert.main import Earthquake
+from services.earthquake_alert.store import EarthquakeStore
+
+
+def history(events):
+    rng = np.random.default_rng(0)
+    start = datetime(2000, 1, 1)
+    seconds = np.sort(rng.uniform(0, 25 * 365 * 86400, events))
+    return [
+        Earthquake.model_construct(
+            id=f"us{i:08d}",
+            magnitude=float(magnitude),
+            latitude=float(latitude),
+            longitude=float(longitude),
+            depth=float(depth),
+            time=start + timedelta(seconds=float(offset)),
+            location_description="synthetic",
+        )
+        for i, (magnitude, latitude, longitude, depth, offset) in enumerate(
+            zip(
+                rng.exponential(1.0, events),
+                rng.uniform(-90, 90, events),
+                rng.uniform(-180, 180, events),
+                rng.uniform(0, 700, events),
+                seconds,
+                strict=True,
+            )
+        )
+    ]
+
+
+def list_ingest(earthquakes):
+    """The duplicate check update_earthquake_data ran for every feature."""
+    db = []
+    for earthquake in earthquakes:
+        if all(eq.id != earthquake.id for eq in db):
+            db.append(earthquake)
+    return db
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    list_events = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    earthquakes = history(events)
+    # Each feed repeats the events of the previous poll; replay a tenth twice
+    feed = earthquakes + earthquakes[-events // 10 :]
+    print(f"{events:,} events, {len(feed):,} features ingested")
+
+    started = time.perf_counter()
+    list_ingest(earthquakes[:list_events])
+    sample = time.perf_counter() - started
+    estimate = sample * (len(feed) / list_events) ** 2
+    print(f"list ingest:   {sample:8.3f} s for {list_events:,}")
+    print(f"               ~{estimate:,.0f} s extrapolated to all")
+
+    started = time.perf_counter()
+    store = EarthquakeStore(Earthquake)
+    added = store.add_many(feed)
+    seconds = time.perf_counter() - started
+    print(f"store ingest:  {seconds:8.3f} s, {len(added):,} new")
+
+    ids = [earthquakes[i].id for i in range(0, events, max(events // 1000, 1))]
+    db = store.copy()
+    started = time.perf_counter()
+    for earthquake_id in ids[:20]:
+        next(eq for eq in db if eq.id == earthquake_id)
+    scan = (time.perf_counter() - started) / 20
+    started = time.perf_counter()
+    for earthquake_id in ids:
+        store.get(earthquake_id)
+    lookup = (time.perf_counter() - started) / len(ids)
+    print(f"list lookup:   {scan * 1e6:10.1f} us")
+    print(f"store lookup:  {lookup * 1e6:10.3f} us")
+
+
+if __name__ == "__main__":
+    main()
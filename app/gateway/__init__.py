@@ -0,0 +1,3 @@
+from .executor import GatewayExecutor, PoolSaturatedError, ServicePool
+from .registry import ServiceRegistry, ServiceSpec, ServiceUnavailableError
+from .mount import LazyServiceApp, enable_in_process
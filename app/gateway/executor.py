@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE = 16
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a service pool has no free worker and its queue is full."""
+
+    def __init__(self, service: str):
+        super().__init__(f"Service {service!r} is overloaded, try again later")
+        self.service = service
+
+
+class ServicePool:
+    """Bounded thread pool for the blocking calls of a single service."""
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int = DEFAULT_WORKERS,
+        max_queue: int = DEFAULT_QUEUE,
+    ):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"gateway-{name}"
+        )
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_last = 0.0
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Runs a blocking callable on the pool and awaits its result.
+
+        Raises:
+            PoolSaturatedError: all workers are busy and the queue is full
+        """
+        with self._lock:
+            if self._active + self._queued >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise PoolSaturatedError(self.name)
+            self._queued += 1
+        submitted = time.perf_counter()
+
+        def call() -> Any:
+            waited = time.perf_counter() - submitted
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._wait_total += waited
+                self._wait_last = waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+        def release_if_cancelled(future: Future) -> None:
+            # A call cancelled while still queued never runs, so free its slot here
+            if future.cancelled():
+                with self._lock:
+                    self._queued -= 1
+
+        future = self._executor.submit(call)
+        future.add_done_callback(release_if_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the current depth of the pool and its queue wait times."""
+        with self._lock:
+            started = self._completed + self._active
+            avg_wait = self._wait_total / started if started else 0.0
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": self._queued,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_ms": {
+                    "last": round(self._wait_last * 1000, 3),
+                    "avg": round(avg_wait * 1000, 3),
+                    "max": round(self._wait_max * 1000, 3),
+                },
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class GatewayExecutor:
+    """Keeps one bounded pool per service so a slow upstream only blocks itself."""
+
+    def __init__(
+        self,
+        default_workers: int = DEFAULT_WORKERS,
+        default_queue: int = DEFAULT_QUEUE,
+        sizes: Optional[Mapping[str, Tuple[int, int]]] = None,
+    ):
+        self.default_workers = default_workers
+        self.default_queue = default_queue
+        self.sizes: Dict[str, Tuple[int, int]] = dict(sizes or {})
+        self._pools: Dict[str, ServicePool] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "GatewayExecutor":
+        """
+        Builds the executor from environment variables:
+
+        GATEWAY_POOL_WORKERS - default worker count per service
+        GATEWAY_POOL_QUEUE - default queue length per service
+        GATEWAY_POOL_SIZES - per-service overrides, e.g.
+            "crypto_price_alert=8:32,weather_alert=2" (workers[:queue])
+        """
+        default_workers = int(environ.get("GATEWAY_POOL_WORKERS", DEFAULT_WORKERS))
+        default_queue = int(environ.get("GATEWAY_POOL_QUEUE", DEFAULT_QUEUE))
+        return cls(
+            default_workers,
+            default_queue,
+            parse_pool_sizes(environ.get("GATEWAY_POOL_SIZES", ""), default_queue),
+        )
+
+    def pool(self, service: str) -> ServicePool:
+        with self._lock:
+            pool = self._pools.get(service)
+            if pool is None:
+                workers, queue = self.sizes.get(
+                    service, (self.default_workers, self.default_queue)
+                )
+                pool = ServicePool(service, workers, queue)
+                self._pools[service] = pool
+                logger.info(
+                    f"Created pool for {service}: {workers} workers, queue {queue}"
+                )
+            return pool
+
+    async def run(
+        self, service: str, func: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        """Runs a blocking service call on that service's own pool."""
+        return await self.pool(service).run(func, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            pools = dict(self._pools)
+        return {name: pool.stats() for name, pool in sorted(pools.items())}
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.shutdown(wait=wait)
+
+
+def parse_pool_sizes(value: str, default_queue: int) -> Dict[str, Tuple[int, int]]:
+    """Parses "name=workers[:queue],..." into {name: (workers, queue)}."""
+    sizes: Dict[str, Tuple[int, int]] = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            name, size = entry.split("=", 1)
+            workers, _, queue = size.partition(":")
+            sizes[name.strip()] = (
+                int(workers),
+                int(queue) if queue else default_queue,
+            )
+        except ValueError as e:
+            raise ValueError(f"Invalid pool size entry: {entry!r}") from e
+    return sizes
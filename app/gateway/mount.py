@@ -0,0 +1,44 @@
+import logging
+from types import ModuleType
+from starlette.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
+
+from .registry import ServiceRegistry, ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class LazyServiceApp:
+    """
+    ASGI app that forwards to a service's own FastAPI app inside the gateway.
+
+    The service is loaded through the registry on its first request, so mounting
+    every service costs nothing until it is used. Lifespan events are not
+    forwarded: the registry enters each service lifespan itself and exits them
+    all together with the gateway's lifespan.
+    """
+
+    def __init__(self, registry: ServiceRegistry, name: str):
+        self.registry = registry
+        self.name = name
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            return
+        try:
+            module = await self.registry.load(self.name)
+        except ServiceUnavailableError as e:
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1011})
+                return
+            response = JSONResponse(status_code=503, content={"detail": str(e)})
+            await response(scope, receive, send)
+            return
+        await module.app(scope, receive, send)
+
+
+def enable_in_process(name: str, module: ModuleType) -> None:
+    """Switches a service that calls itself over HTTP to direct function calls."""
+    if hasattr(module, "IN_PROCESS"):
+        setattr(module, "IN_PROCESS", True)  # noqa: B010
+        logger.info(f"{name} calls are served in-process")
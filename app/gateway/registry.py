@@ -0,0 +1,161 @@
+import asyncio
+import importlib
+import logging
+import time
+from contextlib import AsyncExitStack
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceSpec(NamedTuple):
+    """Where to find a service: its module and the callable the gateway uses."""
+
+    name: str
+    module: str
+    entrypoint: Optional[str] = None
+
+
+class ServiceUnavailableError(Exception):
+    """Raised when a service cannot be imported or started."""
+
+    def __init__(self, service: str, reason: str):
+        super().__init__(f"Service {service!r} is unavailable: {reason}")
+        self.service = service
+        self.reason = reason
+
+
+class ServiceRegistry:
+    """
+    Imports service modules on first use instead of at gateway import time.
+
+    Loading a service imports its module off the event loop and, if the module
+    exposes a FastAPI ``app``, enters that app's lifespan so its startup hooks
+    (schedulers, pollers, precomputation) run only once the service is needed.
+    Lifespans are exited together when the registry is closed.
+
+    ``on_load`` is called with the service name and module right after the
+    import, before the service is started. A spec naming an entrypoint the
+    module lacks fails the load there, so no background work is started.
+    """
+
+    def __init__(
+        self,
+        specs: Iterable[ServiceSpec],
+        on_load: Optional[Callable[[str, ModuleType], None]] = None,
+    ):
+        self.specs: Dict[str, ServiceSpec] = {spec.name: spec for spec in specs}
+        self.on_load = on_load
+        self._modules: Dict[str, ModuleType] = {}
+        self._import_seconds: Dict[str, float] = {}
+        self._start_seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._stack = AsyncExitStack()
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._modules
+
+    async def load(self, name: str) -> ModuleType:
+        """Imports and starts a service once; later calls return the cached module."""
+        module = self._modules.get(name)
+        if module is not None:
+            return module
+
+        spec = self.specs.get(name)
+        if spec is None:
+            raise ServiceUnavailableError(name, "unknown service")
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            module = self._modules.get(name)
+            if module is not None:
+                return module
+
+            started = time.perf_counter()
+            try:
+                module = await asyncio.to_thread(importlib.import_module, spec.module)
+            except Exception as e:
+                self._errors[name] = f"import failed: {e}"
+                logger.error(f"Failed to import {spec.module}: {e}")
+                raise ServiceUnavailableError(name, self._errors[name]) from e
+            self._import_seconds[name] = time.perf_counter() - started
+
+            # Checked before the lifespan runs, so a bad spec starts nothing
+            if spec.entrypoint and not callable(getattr(module, spec.entrypoint, None)):
+                self._errors[name] = f"no entrypoint {spec.entrypoint!r}"
+                logger.error(self._errors[name])
+                raise ServiceUnavailableError(name, self._errors[name])
+
+            started = time.perf_counter()
+            try:
+                if self.on_load is not None:
+                    self.on_load(name, module)
+                await self._start(module)
+            except Exception as e:
+                self._errors[name] = f"startup failed: {e}"
+                logger.error(f"Failed to start {name}: {e}")
+                raise ServiceUnavailableError(name, self._errors[name]) from e
+            self._start_seconds[name] = time.perf_counter() - started
+
+            self._errors.pop(name, None)
+            self._modules[name] = module
+            logger.info(
+                f"Loaded {name} in {self._import_seconds[name] * 1000:.1f} ms "
+                f"(startup {self._start_seconds[name] * 1000:.1f} ms)"
+            )
+            return module
+
+    async def _start(self, module: ModuleType) -> None:
+        app = getattr(module, "app", None)
+        if app is None or not hasattr(app, "router"):
+            return
+        await self._stack.enter_async_context(app.router.lifespan_context(app))
+
+    async def resolve(self, name: str) -> Callable[..., Any]:
+        """Loads a service and returns its gateway entrypoint."""
+        module = await self.load(name)
+        spec = self.specs[name]
+        if not spec.entrypoint:
+            raise ServiceUnavailableError(name, f"{spec.module} has no entrypoint")
+        return getattr(module, spec.entrypoint)
+
+    async def warm_up(self, names: Iterable[str]) -> None:
+        """Loads the given services eagerly, logging failures instead of raising."""
+        for name in names:
+            try:
+                await self.load(name)
+            except ServiceUnavailableError as e:
+                logger.warning(f"Warm-up skipped: {e}")
+
+    async def aclose(self) -> None:
+        """Runs the shutdown hooks of every started service."""
+        await self._stack.aclose()
+        self._stack = AsyncExitStack()
+        self._modules.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        report: Dict[str, Dict[str, Any]] = {}
+        for name in sorted(self.specs):
+            entry: Dict[str, Any] = {"loaded": name in self._modules}
+            if name in self._import_seconds:
+                entry["import_ms"] = round(self._import_seconds[name] * 1000, 3)
+            if name in self._start_seconds:
+                entry["startup_ms"] = round(self._start_seconds[name] * 1000, 3)
+            if name in self._errors:
+                entry["error"] = self._errors[name]
+            report[name] = entry
+        return report
+
+
+def parse_warmup(value: str, names: Iterable[str]) -> List[str]:
+    """Parses a comma separated warm-up list; "all" selects every service."""
+    known = list(names)
+    selected = [name.strip() for name in value.split(",") if name.strip()]
+    if selected == ["all"]:
+        return known
+    unknown = [name for name in selected if name not in known]
+    if unknown:
+        raise ValueError(f"Unknown services in warm-up list: {', '.join(unknown)}")
+    return selected
@@ -1,26 +1,108 @@
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any
 from fastapi import FastAPI, Request
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-
-
-from app.services.basic_list_operations import basic_list_operations_service
-from app.services.bmi_calculator import bmi_calculator_service
-from app.services.crypto_price_alert import crypto_price_alert_service
-from app.services.bpm_counter import bpm_counter
-from app.services.word_counter import word_counter
-from app.services.weather_alert import weather_alert
-from app.services.text_to_speech import text_to_speech
-from app.services.text_reverse import text_reverse
-from app.services.temperature_converter import temperature_converter
-from app.services.qr_code_generator import qr_code_generator
-from app.services.password_generator import password_generator
-from app.services.net_benchmark import net_benchmark
-from app.services.language_translator import language_translator
-from app.services.fourier_transform import fourier_transform
-from app.services.earthquake_alert import earthquake_alert
-from app.services.csv_tool import csv_tool
-
-app = FastAPI()
+from fastapi.responses import HTMLResponse, JSONResponse
+
+from app.gateway import (
+    GatewayExecutor,
+    LazyServiceApp,
+    PoolSaturatedError,
+    ServiceRegistry,
+    ServiceSpec,
+    ServiceUnavailableError,
+    enable_in_process,
+)
+from app.gateway.registry import parse_warmup
+from app.services.http_client import outbound_metrics
+
+logger = logging.getLogger(__name__)
+
+
+SERVICES = [
+    ServiceSpec(
+        "basic_list_operations",
+        "app.services.basic_list_operations.main",
+        "basic_list_operations_service",
+    ),
+    ServiceSpec(
+        "bmi_calculator", "app.services.bmi_calculator.main", "bmi_calculator_service"
+    ),
+    ServiceSpec(
+        "crypto_price_alert",
+        "app.services.crypto_price_alert.main",
+        "crypto_price_alert_service",
+    ),
+    ServiceSpec("bpm_counter", "app.services.bpm_counter.main", "bpm_counter"),
+    ServiceSpec("word_counter", "app.services.word_counter.main", "word_counter"),
+    ServiceSpec("weather_alert", "app.services.weather_alert.main", "weather_alert"),
+    ServiceSpec("text_to_speech", "app.services.text_to_speech.main", "text_to_speech"),
+    ServiceSpec("text_reverse", "app.services.text_reverse.main", "text_reverse"),
+    ServiceSpec(
+        "temperature_converter",
+        "app.services.temperature_converter.main",
+        "temperature_converter",
+    ),
+    ServiceSpec(
+        "qr_code_generator", "app.services.qr_code_generator.main", "qr_code_generator"
+    ),
+    ServiceSpec(
+        "password_generator",
+        "app.services.password_generator.main",
+        "password_generator",
+    ),
+    ServiceSpec("net_benchmark", "app.services.net_benchmark.main", "net_benchmark"),
+    ServiceSpec(
+        "language_translator",
+        "app.services.language_translator.main",
+        "language_translator",
+    ),
+    ServiceSpec(
+        "fourier_transform", "app.services.fourier_transform.main", "fourier_transform"
+    ),
+    ServiceSpec(
+        "earthquake_alert", "app.services.earthquake_alert.main", "earthquake_alert"
+    ),
+    ServiceSpec("csv_tool", "app.services.csv_tool.main", "csv_tool"),
+]
+
+# "gateway" calls service entrypoints only; "mounted" also serves every service
+# app under /services/<name> in this process, sharing the gateway lifespan
+GATEWAY_MODE = os.getenv("GATEWAY_MODE", "gateway")
+MOUNTED = GATEWAY_MODE == "mounted"
+
+executor = GatewayExecutor.from_env()
+registry = ServiceRegistry(SERVICES, on_load=enable_in_process if MOUNTED else None)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Handles startup and shutdown events."""
+    started = time.perf_counter()
+    await registry.warm_up(
+        parse_warmup(
+            os.getenv("GATEWAY_WARMUP", "all" if MOUNTED else ""), registry.specs
+        )
+    )
+    for name, stats in registry.stats().items():
+        if "import_ms" in stats:
+            logger.info(f"Service {name} imported in {stats['import_ms']} ms")
+    logger.info(f"Gateway started in {(time.perf_counter() - started) * 1000:.1f} ms")
+    try:
+        yield
+    finally:
+        await registry.aclose()
+        executor.shutdown(wait=False)
+
+
+app = FastAPI(lifespan=lifespan)
+
+if MOUNTED:
+    for service_name in registry.specs:
+        app.mount(f"/services/{service_name}", LazyServiceApp(registry, service_name))
 
 templates = Jinja2Templates(directory="app/templates")
 
@@ -31,113 +113,152 @@ async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
+@app.exception_handler(PoolSaturatedError)
+async def pool_saturated_handler(request: Request, exc: PoolSaturatedError):
+    """Rejects calls to a service whose pool and queue are full."""
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(ServiceUnavailableError)
+async def service_unavailable_handler(request: Request, exc: ServiceUnavailableError):
+    """Reports services that failed to import or start."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+async def call_service(name: str, *args: Any) -> Any:
+    """Loads a service on first use and runs its entrypoint on its own pool."""
+    entrypoint = await registry.resolve(name)
+    return await executor.run(name, entrypoint, *args)
+
+
+@app.get("/api/services")
+async def services():
+    """Which services are loaded and how long their imports took."""
+    return registry.stats()
+
+
+@app.get("/api/pools")
+async def pools():
+    """Depth and queue wait time of every service pool."""
+    return executor.stats()
+
+
+@app.get("/api/outbound")
+async def outbound():
+    """Per-host latency, pool saturation and errors of outbound API calls."""
+    return outbound_metrics()
+
+
 @app.post("/api/basic-list-operations")
 async def basic_list_operations(operation: str, item: str = None):
     """Эндпоинт для управления списком"""
-    result = basic_list_operations_service(operation, item)
+    result = await call_service("basic_list_operations", operation, item)
     return result
 
 
 @app.post("/api/bmi-calculator")
 async def bmi_calculator(height: float, weight: float):
     """Пример эндпоинта для BMI Calculator."""
-    result = bmi_calculator_service(height, weight)
+    result = await call_service("bmi_calculator", height, weight)
     return {"result": result}
 
 
 @app.post("/api/crypto-price-alert")
 async def crypto_price_alert(crypto: str, target_price: float):
     """Пример эндпоинта для Crypto Price Alert."""
-    result = crypto_price_alert_service(crypto, target_price)
+    result = await call_service("crypto_price_alert", crypto, target_price)
     return {"result": result}
 
 
 @app.post("/api/bpm-counter")
 async def bpm_counter_endpoint(bpm_data: list):
     """Пример эндпоинта для BPM Counter."""
-    result = bpm_counter(bpm_data)
+    result = await call_service("bpm_counter", bpm_data)
     return {"result": result}
 
 
 @app.post("/api/word-counter")
 async def word_counter_endpoint(text: str):
     """Пример эндпоинта для Word Counter."""
-    result = word_counter(text)
+    result = await call_service("word_counter", text)
     return {"result": result}
 
 
 @app.post("/api/weather-alert")
 async def weather_alert_endpoint(location: str):
     """Пример эндпоинта для Weather Alert."""
-    result = weather_alert(location)
+    result = await call_service("weather_alert", location)
     return {"result": result}
 
 
 @app.post("/api/text-to-speech")
 async def text_to_speech_endpoint(text: str):
     """Пример эндпоинта для Text to Speech."""
-    result = text_to_speech(text)
+    # The service's Form default only applies to its own requests
+    result = await call_service("text_to_speech", text, "en")
     return {"result": result}
 
 
 @app.post("/api/text-reverse")
 async def text_reverse_endpoint(text: str):
     """Пример эндпоинта для Text Reverse."""
-    result = text_reverse(text)
+    result = await call_service("text_reverse", text)
     return {"result": result}
 
 
 @app.post("/api/temperature-converter")
 async def temperature_converter_endpoint(value: float, unit: str):
     """Пример эндпоинта для Temperature Converter."""
-    result = temperature_converter(value, unit)
+    result = await call_service("temperature_converter", value, unit)
     return {"result": result}
 
 
 @app.post("/api/qr-code-generator")
 async def qr_code_generator_endpoint(data: str):
     """Пример эндпоинта для QR Code Generator."""
-    result = qr_code_generator(data)
+    result = await call_service("qr_code_generator", data)
     return {"result": result}
 
 
 @app.post("/api/password-generator")
 async def password_generator_endpoint(length: int):
     """Пример эндпоинта для Password Generator."""
-    result = password_generator(length)
+    result = await call_service("password_generator", length)
     return {"result": result}
 
 
 @app.post("/api/net-benchmark")
 async def net_benchmark_endpoint():
     """Пример эндпоинта для Net Benchmark."""
-    result = net_benchmark()
+    result = await call_service("net_benchmark")
     return {"result": result}
 
 
 @app.post("/api/language-translator")
 async def language_translator_endpoint(text: str, target_language: str):
     """Пример эндпоинта для Language Translator."""
-    result = language_translator(text, target_language)
+    result = await call_service("language_translator", text, target_language)
     return {"result": result}
 
 
 @app.post("/api/fourier-transform")
 async def fourier_transform_endpoint(data: list):
     """Пример эндпоинта для Fourier Transform."""
-    result = fourier_transform(data)
+    result = await call_service("fourier_transform", data)
     return {"result": result}
 
 
 @app.post("/api/earthquake-alert")
 async def earthquake_alert_endpoint(location: str):
     """Пример эндпоинта для Earthquake Alert."""
-    result = earthquake_alert(location)
+    result = await call_service("earthquake_alert", location)
     return {"result": result}
 
 
 @app.post("/api/csv-tool")
 async def csv_tool_endpoint(file_path: str):
     """Пример эндпоинта для CSV Tool."""
-    result = csv_tool(file_path)
+    result = await call_service("csv_tool", file_path)
     return {"result": result}
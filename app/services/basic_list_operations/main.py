@@ -4,6 +4,9 @@ import os
 import logging
 import json
 import requests
+from typing import Optional
+
+from ..http_client import get_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,19 +19,26 @@ MAX_LIST_SIZE = 100
 
 BASE_URL = "http://localhost:5000"
 
+# Set by the gateway when this app is mounted in the same process, so the
+# service function calls the handlers below directly instead of going over HTTP
+IN_PROCESS = False
+
 
 def basic_list_operations_service(operation: str, item: str = None):
+    if IN_PROCESS:
+        return _call_in_process(operation, item)
+    client = get_client()
     try:
         if operation == "add" and item:
-            response = requests.post(f"{BASE_URL}/add", params={"item": item})
+            response = client.post(f"{BASE_URL}/add", params={"item": item})
         elif operation == "remove" and item:
-            response = requests.delete(f"{BASE_URL}/remove", params={"item": item})
+            response = client.delete(f"{BASE_URL}/remove", params={"item": item})
         elif operation == "search" and item:
-            response = requests.get(f"{BASE_URL}/search", params={"item": item})
+            response = client.get(f"{BASE_URL}/search", params={"item": item})
         elif operation == "sort":
-            response = requests.get(f"{BASE_URL}/sort")
+            response = client.get(f"{BASE_URL}/sort")
         elif operation == "length":
-            response = requests.get(f"{BASE_URL}/length")
+            response = client.get(f"{BASE_URL}/length")
         else:
             return {"error": "Invalid operation or missing item"}
 
@@ -37,6 +47,25 @@ def basic_list_operations_service(operation: str, item: str = None):
         return {"error": str(e)}
 
 
+def _call_in_process(operation: str, item: Optional[str] = None):
+    """Same results as the HTTP calls above, without leaving the process."""
+    try:
+        if operation == "add" and item:
+            return add_item(item)
+        elif operation == "remove" and item:
+            return remove_item(item)
+        elif operation == "search" and item:
+            return search_item(item)
+        elif operation == "sort":
+            return {"sorted_list": list(sort_list()["sorted_list"])}
+        elif operation == "length":
+            return get_length()
+        else:
+            return {"error": "Invalid operation or missing item"}
+    except HTTPException as e:
+        return {"detail": e.detail}
+
+
 @app.post("/add")
 def add_item(item: str):
     logger.info(f"Attempting to add item: {item}")
@@ -1,11 +1,17 @@
 import argparse
+import io
+import json
 import logging
 import sys
 import os
+import numpy as np
+import pandas as pd
 import uvicorn
 
-from typing import Optional
-from fastapi import FastAPI, HTTPException
+from bisect import bisect_right
+from typing import NamedTuple, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 
 
@@ -16,6 +22,26 @@ load_dotenv()
 
 app = FastAPI()
 
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised for batch bodies in a format the endpoint cannot read"""
+
+
+class BMIBatch(NamedTuple):
+    """Result of ``BMICalculator.calculate_many``; rows flagged invalid are NaN."""
+
+    bmi: np.ndarray
+    category: np.ndarray
+    invalid: np.ndarray
+
+    def categories(self) -> np.ndarray:
+        """Category labels per row, None for invalid rows."""
+        labels = np.array(BMICalculator.CATEGORIES, dtype=object)[self.category]
+        labels[self.invalid] = None
+        return labels
+
 
 class BMICalculator:
     """Class for BMI calculation with data validation"""
@@ -25,6 +51,10 @@ class BMICalculator:
     MIN_HEIGHT = 50  # centimeters
     MAX_HEIGHT = 272  # Guinness record
 
+    # Lower bounds of every category but the first
+    CATEGORY_BOUNDS = (18.5, 25.0, 30.0)
+    CATEGORIES = ("Underweight", "Normal weight", "Overweight", "Obesity")
+
     @classmethod
     def calculate(cls, weight: float, height_cm: float) -> Optional[float]:
         """
@@ -75,6 +105,118 @@ class BMICalculator:
 
         return True
 
+    @classmethod
+    def category(cls, bmi: float) -> str:
+        """Returns the category of a BMI value"""
+        return cls.CATEGORIES[bisect_right(cls.CATEGORY_BOUNDS, bmi)]
+
+    @classmethod
+    def calculate_many(cls, weights, heights_cm) -> BMIBatch:
+        """
+        Calculates BMI and category for many rows at once
+
+        Rows are validated with the same ranges as ``calculate``, but invalid
+        rows are flagged in the returned mask instead of being logged one by
+        one.
+
+        Args:
+            weights: array-like of weights in kilograms
+            heights_cm: array-like of heights in centimeters
+
+        Returns:
+            BMIBatch: BMI values (NaN where invalid), category indexes into
+            ``CATEGORIES`` and the invalid-row mask
+        """
+        weight = np.asarray(weights, dtype=np.float64)
+        height = np.asarray(heights_cm, dtype=np.float64)
+        if weight.shape != height.shape or weight.ndim != 1:
+            raise ValueError("Weights and heights must be 1-D arrays of equal length.")
+
+        # NaN fails every comparison, so missing values end up invalid too
+        valid = (
+            (weight >= cls.MIN_WEIGHT)
+            & (weight <= cls.MAX_WEIGHT)
+            & (height >= cls.MIN_HEIGHT)
+            & (height <= cls.MAX_HEIGHT)
+        )
+        invalid = ~valid
+
+        height_m = height / 100
+        bmi = np.full(weight.shape, np.nan)
+        np.divide(weight, height_m * height_m, out=bmi, where=valid)
+        bmi = np.round(bmi, 1)
+        category = np.digitize(bmi, cls.CATEGORY_BOUNDS).astype(np.int8)
+        category[invalid] = 0
+
+        if invalid.any():
+            logger.info(f"{int(invalid.sum())} of {len(bmi)} rows are out of range")
+        return BMIBatch(bmi, category, invalid)
+
+
+def _read_batch(body: bytes, content_type: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Parses weight and height columns from a JSON, CSV or Arrow body"""
+    if content_type == "application/json":
+        data = json.loads(body)
+        if not isinstance(data, dict):
+            raise ValueError("JSON body must be an object with weights and heights.")
+        return (
+            np.asarray(data.get("weights"), dtype=np.float64),
+            np.asarray(data.get("heights_cm"), dtype=np.float64),
+        )
+
+    if content_type == "text/csv":
+        frame = pd.read_csv(
+            io.BytesIO(body),
+            usecols=["weight", "height_cm"],
+            dtype={"weight": np.float64, "height_cm": np.float64},
+        )
+        return frame["weight"].to_numpy(), frame["height_cm"].to_numpy()
+
+    if content_type == ARROW_STREAM:
+        import pyarrow as pa
+
+        table = pa.ipc.open_stream(body).read_all()
+        return (
+            table.column("weight").to_numpy().astype(np.float64),
+            table.column("height_cm").to_numpy().astype(np.float64),
+        )
+
+    raise UnsupportedFormatError(f"Unsupported content type: {content_type}")
+
+
+def _write_batch(batch: BMIBatch, accept: str) -> Response:
+    """Serializes a batch result in the format the client accepts"""
+    if "text/csv" in accept:
+        frame = pd.DataFrame({"bmi": batch.bmi, "category": batch.categories()})
+        return Response(frame.to_csv(index=False), media_type="text/csv")
+
+    if ARROW_STREAM in accept:
+        import pyarrow as pa
+
+        table = pa.table(
+            {
+                "bmi": pa.array(batch.bmi, mask=batch.invalid),
+                "category": pa.array(batch.categories()),
+            }
+        )
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue().to_pybytes(), media_type=ARROW_STREAM)
+
+    bmi = batch.bmi.astype(object)
+    bmi[batch.invalid] = None
+    # Built by hand: FastAPI's encoder walks every element of a large list
+    content = json.dumps(
+        {
+            "count": len(batch.bmi),
+            "invalid": np.flatnonzero(batch.invalid).tolist(),
+            "bmi": bmi.tolist(),
+            "category": batch.categories().tolist(),
+        }
+    )
+    return Response(content, media_type="application/json")
+
 
 @app.get("/")
 def read_root():
@@ -98,17 +240,7 @@ def calculate_bmi(weight: float, height_cm: float):
         if bmi is None:
             raise HTTPException(status_code=400, detail="Invalid input parameters")
 
-        category = "Unknown"
-        if bmi < 18.5:
-            category = "Underweight"
-        elif 18.5 <= bmi < 25:
-            category = "Normal weight"
-        elif 25 <= bmi < 30:
-            category = "Overweight"
-        else:
-            category = "Obesity"
-
-        return {"bmi": bmi, "category": category}
+        return {"bmi": bmi, "category": BMICalculator.category(bmi)}
 
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve)) from ve
@@ -117,6 +249,40 @@ def calculate_bmi(weight: float, height_cm: float):
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
+def bmi_calculator_service(height_cm: float, weight: float):
+    """Gateway entrypoint: ``/bmi`` with the gateway's argument order."""
+    return calculate_bmi(weight, height_cm)
+
+
+@app.post("/bmi/batch")
+async def calculate_bmi_batch(request: Request):
+    """
+    Calculate BMI for many rows in one request.
+
+    The body is a JSON object {"weights": [...], "heights_cm": [...]}, a CSV
+    with weight and height_cm columns, or an Arrow IPC stream with the same
+    columns. The response is JSON unless the Accept header asks for CSV or
+    Arrow; invalid rows get a null BMI and category.
+    """
+    content_type = request.headers.get("content-type", "application/json")
+    content_type = content_type.split(";")[0].strip().lower()
+    accept = request.headers.get("accept", "application/json")
+    body = await request.body()
+
+    try:
+        weights, heights = await run_in_threadpool(_read_batch, body, content_type)
+        batch = await run_in_threadpool(BMICalculator.calculate_many, weights, heights)
+        return await run_in_threadpool(_write_batch, batch, accept)
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e)) from e
+    except ImportError as e:
+        raise HTTPException(
+            status_code=415, detail="Arrow support requires pyarrow"
+        ) from e
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
 def get_args() -> argparse.Namespace:
     """Gets arguments via command line or interactive input"""
     parser = argparse.ArgumentParser(
@@ -0,0 +1,343 @@
+import io
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import (
+    BinaryIO,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+import aubio
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+WIN_S = 1024
+HOP_S = 512
+# Rate ffmpeg resamples to; soundfile input is analysed at its native rate
+FFMPEG_SAMPLERATE = 44100
+# Rate the fast mode downsamples to, by averaging whole groups of samples
+FAST_SAMPLERATE = 22050
+READ_CHUNK = 64 * 1024
+
+
+class UnsupportedAudioError(ValueError):
+    """Raised when an upload cannot be decoded by any available decoder."""
+
+
+class AnalysisTimeoutError(TimeoutError):
+    """Raised when an analysis runs past its deadline."""
+
+
+class BPMResult(NamedTuple):
+    """Detected tempo and the share of beat intervals that agree with it."""
+
+    bpm: float
+    confidence: float
+
+
+class FastOptions(NamedTuple):
+    """
+    Settings of the fast analysis mode.
+
+    Only ``excerpts`` windows of ``excerpt_seconds`` spread over the file
+    are tracked, and tracking stops once the running median tempo has
+    stayed within ``tolerance`` BPM for ``stable_beats`` beats. With
+    ``downsample`` audio is averaged down to about 22050 Hz first.
+    """
+
+    excerpts: int = 3
+    excerpt_seconds: float = 20.0
+    tolerance: float = 0.5
+    stable_beats: int = 8
+    downsample: bool = True
+
+    @classmethod
+    def from_env(cls) -> "FastOptions":
+        defaults = cls()
+        return cls(
+            excerpts=int(os.getenv("BPM_FAST_EXCERPTS", defaults.excerpts)),
+            excerpt_seconds=float(
+                os.getenv("BPM_FAST_EXCERPT_SECONDS", defaults.excerpt_seconds)
+            ),
+            tolerance=float(os.getenv("BPM_FAST_TOLERANCE", defaults.tolerance)),
+            stable_beats=int(os.getenv("BPM_FAST_STABLE_BEATS", defaults.stable_beats)),
+            downsample=os.getenv("BPM_FAST_DOWNSAMPLE", "1") not in ("0", "false"),
+        )
+
+
+def _soundfile_blocks(
+    audio: sf.SoundFile,
+    hop_s: int,
+    start: int = 0,
+    frames: Optional[int] = None,
+    factor: int = 1,
+) -> Iterator[np.ndarray]:
+    """
+    Yields mono float32 hops of ``frames`` frames of ``audio`` from ``start``.
+
+    With ``factor`` > 1 each output sample averages ``factor`` consecutive
+    samples, so a hop covers ``hop_s * factor`` frames of the file.
+    """
+    audio.seek(start)
+    read_s = hop_s * factor
+    frames_2d = np.empty((read_s, audio.channels), dtype=np.float32)
+    mono = np.empty(read_s, dtype=np.float32)
+    out = np.empty(hop_s, dtype=np.float32) if factor > 1 else mono
+    remaining = frames
+    while remaining is None or remaining >= read_s:
+        read = audio.read(read_s, dtype="float32", always_2d=True, out=frames_2d)
+        if len(read) < read_s:
+            return
+        # All buffers are reused, so memory does not grow with the file
+        np.mean(read, axis=1, out=mono)
+        if factor > 1:
+            np.mean(mono.reshape(hop_s, factor), axis=1, out=out)
+        if remaining is not None:
+            remaining -= read_s
+        yield out
+
+
+def _closing(audio: sf.SoundFile, blocks: Iterator[np.ndarray]) -> Iterator:
+    with audio:
+        yield from blocks
+
+
+def _ffmpeg_blocks(
+    fileobj: BinaryIO, hop_s: int, samplerate: int = FFMPEG_SAMPLERATE
+) -> Iterator[np.ndarray]:
+    """Pipes ``fileobj`` through ffmpeg and yields mono float32 hops."""
+    process = subprocess.Popen(
+        [
+            "ffmpeg",
+            "-loglevel",
+            "error",
+            "-i",
+            "pipe:0",
+            "-f",
+            "f32le",
+            "-ac",
+            "1",
+            "-ar",
+            str(samplerate),
+            "pipe:1",
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    stdin, stdout = process.stdin, process.stdout
+    assert stdin is not None and isinstance(stdout, io.BufferedReader)
+
+    def feed() -> None:
+        try:
+            while chunk := fileobj.read(READ_CHUNK):
+                stdin.write(chunk)
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            stdin.close()
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    hop_bytes = hop_s * 4
+    buffer = bytearray(hop_bytes)
+    view = memoryview(buffer)
+    try:
+        while True:
+            filled = 0
+            while filled < hop_bytes:
+                read = stdout.readinto(view[filled:])
+                if not read:
+                    return
+                filled += read
+            yield np.frombuffer(buffer, dtype=np.float32)
+    finally:
+        stdout.close()
+        process.kill()
+        process.wait()
+        writer.join()
+
+
+def _open_soundfile(fileobj: BinaryIO) -> Optional[sf.SoundFile]:
+    """Opens ``fileobj`` with libsndfile, or returns None if ffmpeg must decode it."""
+    start = fileobj.tell()
+    try:
+        return sf.SoundFile(fileobj)
+    except sf.LibsndfileError as e:
+        if shutil.which("ffmpeg") is None:
+            raise UnsupportedAudioError(f"Unsupported audio format: {e}") from e
+        logger.info(f"libsndfile cannot decode the upload, using ffmpeg: {e}")
+    fileobj.seek(start)
+    return None
+
+
+def open_pcm_stream(fileobj: BinaryIO, hop_s: int = HOP_S) -> Tuple[int, Iterator]:
+    """
+    Returns the sample rate and an iterator of mono float32 blocks of ``hop_s``.
+
+    libsndfile decodes straight from the (seekable) file object; formats it
+    does not know are piped through ffmpeg when it is installed. Blocks are
+    views into reused buffers and must be consumed before the next one is
+    requested.
+    """
+    audio = _open_soundfile(fileobj)
+    if audio is None:
+        return FFMPEG_SAMPLERATE, _ffmpeg_blocks(fileobj, hop_s)
+    return audio.samplerate, _closing(audio, _soundfile_blocks(audio, hop_s))
+
+
+class TempoTracker:
+    """
+    Tempos of the beat intervals seen so far.
+
+    With a ``tolerance`` the tracker reports convergence once the running
+    median has moved less than ``tolerance`` BPM over the last
+    ``stable_beats`` intervals.
+    """
+
+    def __init__(self, tolerance: Optional[float] = None, stable_beats: int = 8):
+        self.tolerance = tolerance
+        self.bpms: List[float] = []
+        self._medians: Deque[float] = deque(maxlen=max(stable_beats, 1))
+
+    def add(self, bpm: float) -> None:
+        self.bpms.append(bpm)
+        if self.tolerance is not None:
+            self._medians.append(float(np.median(self.bpms)))
+
+    @property
+    def converged(self) -> bool:
+        return (
+            self.tolerance is not None
+            and len(self._medians) == self._medians.maxlen
+            and max(self._medians) - min(self._medians) <= self.tolerance
+        )
+
+    def result(self) -> BPMResult:
+        return summarize_tempo(self.bpms)
+
+
+def summarize_tempo(bpms: List[float]) -> BPMResult:
+    """Median of the inter-beat tempos, with the share lying within 4% of it."""
+    if not len(bpms):
+        logger.warning("Fewer than 2 beats detected")
+        return BPMResult(0.0, 0.0)
+    values = np.asarray(bpms, dtype=np.float64)
+    bpm = float(np.median(values))
+    confidence = float(np.mean(np.abs(values - bpm) <= 0.04 * bpm))
+    logger.info(f"Detected BPM: {bpm:.2f} ({len(values) + 1} beats)")
+    return BPMResult(round(bpm, 2), round(confidence, 3))
+
+
+def beats_to_bpm(beats: List[float], samplerate: int) -> float:
+    """Median tempo of the intervals between beat positions given in samples."""
+    intervals = np.diff(np.asarray(beats, dtype=np.float64)) / samplerate
+    return summarize_tempo(list(60.0 / intervals[intervals > 0])).bpm
+
+
+def detect_beats(
+    blocks: Iterable[np.ndarray],
+    samplerate: int,
+    win_s: int = WIN_S,
+    hop_s: int = HOP_S,
+    deadline: Optional[float] = None,
+    tracker: Optional[TempoTracker] = None,
+) -> List[float]:
+    """
+    Feeds hop-sized blocks to aubio's tempo tracker and returns beat positions.
+
+    Inter-beat tempos are also added to ``tracker``, and tracking stops as
+    soon as it has converged. ``deadline`` is a ``time.monotonic()`` value
+    after which the analysis is abandoned with AnalysisTimeoutError.
+    """
+    tempo = aubio.tempo("default", win_s, hop_s, samplerate)
+    beats: List[float] = []
+    for i, block in enumerate(blocks):
+        if tempo(block):
+            beat = tempo.get_last()
+            if tracker is not None and beats and beat > beats[-1]:
+                tracker.add(60.0 * samplerate / (beat - beats[-1]))
+            beats.append(beat)
+            if tracker is not None and tracker.converged:
+                break
+        # About every 1.5 s of audio at 44.1 kHz
+        if deadline is not None and i % 128 == 0 and time.monotonic() > deadline:
+            raise AnalysisTimeoutError("BPM analysis timed out")
+    return beats
+
+
+def _excerpts(
+    total: int, samplerate: int, fast: Optional[FastOptions]
+) -> List[Tuple[int, Optional[int]]]:
+    """(start, frames) windows to analyse; the whole file unless in fast mode."""
+    if fast is None:
+        return [(0, None)]
+    length = int(fast.excerpt_seconds * samplerate)
+    if total <= length * fast.excerpts:
+        return [(0, None)]
+    # Spread evenly, e.g. centred on 25%, 50% and 75% of the file for three
+    step = (total - length) / (fast.excerpts + 1)
+    return [(int(step * (i + 1)), length) for i in range(fast.excerpts)]
+
+
+def analyze_stream(
+    fileobj: BinaryIO,
+    fast: Optional[FastOptions] = None,
+    timeout: Optional[float] = None,
+) -> BPMResult:
+    """Detects the BPM of an audio file object without writing it anywhere."""
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    tracker = (
+        TempoTracker(fast.tolerance, fast.stable_beats) if fast else TempoTracker()
+    )
+    audio = _open_soundfile(fileobj)
+    if audio is None:
+        # ffmpeg's output cannot seek, so fast mode only stops early here
+        blocks = _ffmpeg_blocks(fileobj, HOP_S)
+        detect_beats(blocks, FFMPEG_SAMPLERATE, deadline=deadline, tracker=tracker)
+        return tracker.result()
+
+    with audio:
+        factor = 1
+        if fast is not None and fast.downsample:
+            factor = max(1, audio.samplerate // FAST_SAMPLERATE)
+        samplerate = audio.samplerate // factor
+        # Window and hop shrink with the rate so they span the same time
+        win_s, hop_s = WIN_S // factor, HOP_S // factor
+        for start, frames in _excerpts(audio.frames, audio.samplerate, fast):
+            # detect_beats starts a fresh aubio tracker per excerpt, as beats
+            # do not carry across the gaps
+            blocks = _soundfile_blocks(audio, hop_s, start, frames, factor)
+            detect_beats(
+                blocks, samplerate, win_s, hop_s, deadline=deadline, tracker=tracker
+            )
+            if tracker.converged:
+                break
+    return tracker.result()
+
+
+def analyze_path(
+    path: str, fast: Optional[FastOptions] = None, timeout: Optional[float] = None
+) -> BPMResult:
+    """``analyze_stream`` over a file on disk, for worker processes."""
+    with open(path, "rb") as fileobj:
+        return analyze_stream(fileobj, fast, timeout)
+
+
+def analyze_bytes(
+    data: bytes, fast: Optional[FastOptions] = None, timeout: Optional[float] = None
+) -> BPMResult:
+    """``analyze_stream`` over an encoded file held in memory."""
+    return analyze_stream(io.BytesIO(data), fast, timeout)
@@ -0,0 +1,80 @@
+import os
+import tarfile
+import zipfile
+from typing import IO, BinaryIO, Callable, Iterator, Tuple, TypeVar, Union
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+MAX_MEMBER_BYTES = 200 * 1024 * 1024
+
+T = TypeVar("T")
+
+
+class BatchFileError(ValueError):
+    """Raised for one file of a batch that cannot be read."""
+
+    def __init__(self, name: str, reason: str):
+        super().__init__(reason)
+        self.name = name
+
+
+def _skip_member(name: str) -> bool:
+    # Directories and metadata that archivers add next to the real files
+    base = os.path.basename(name.rstrip("/"))
+    return not base or base.startswith(".") or name.startswith("__MACOSX/")
+
+
+def _read(
+    name: str, stream: IO[bytes], read_member: Callable[[str, IO[bytes]], T]
+) -> Union[T, BatchFileError]:
+    try:
+        return read_member(name, stream)
+    except BatchFileError as e:
+        return e
+    except (zipfile.BadZipFile, RuntimeError) as e:
+        # Corrupt or encrypted zip members
+        return BatchFileError(name, str(e))
+
+
+def iter_batch_files(
+    name: str, fileobj: BinaryIO, read_member: Callable[[str, IO[bytes]], T]
+) -> Iterator[Tuple[str, Union[T, BatchFileError]]]:
+    """
+    Yields (name, ``read_member(name, stream)``) for one uploaded file, or for
+    each file in an archive.
+
+    Zip archives are read through the central directory of the (seekable)
+    upload and tar archives as a stream; members are decompressed one at a
+    time as ``read_member`` reads them and never extracted. A member that
+    cannot be read, or for which ``read_member`` raises BatchFileError, is
+    yielded as a BatchFileError instead of ending the batch.
+    """
+    lowered = (name or "").lower()
+    if lowered.endswith(".zip") or zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or _skip_member(info.filename):
+                    continue
+                try:
+                    member = archive.open(info)
+                except (zipfile.BadZipFile, RuntimeError) as e:
+                    yield info.filename, BatchFileError(info.filename, str(e))
+                    continue
+                with member:
+                    result = _read(info.filename, member, read_member)
+                yield info.filename, result
+        return
+
+    fileobj.seek(0)
+    if lowered.endswith(TAR_SUFFIXES):
+        with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+            for entry in archive:
+                if not entry.isfile() or _skip_member(entry.name):
+                    continue
+                stream = archive.extractfile(entry)
+                if stream is None:
+                    continue
+                yield entry.name, _read(entry.name, stream, read_member)
+        return
+
+    yield name, _read(name, fileobj, read_member)
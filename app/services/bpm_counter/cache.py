@@ -0,0 +1,160 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .audio import BPMResult
+
+logger = logging.getLogger(__name__)
+
+# Bump when the analysis changes so results of the old one are not reused
+ANALYSIS_VERSION = "1"
+
+
+def content_hasher(variant: str = "full") -> "hashlib._Hash":
+    """
+    Hash object that is fed the upload chunk by chunk as it is read.
+
+    ``variant`` names the analysis settings, so each mode has its own keys.
+    """
+    return hashlib.sha256(f"{ANALYSIS_VERSION}:{variant}:".encode())
+
+
+class BPMCache:
+    """
+    BPM results (with their confidence) by content hash of the uploaded file.
+
+    The memory tier is an LRU of ``max_entries`` results. With ``disk_path``
+    results are also kept in a SQLite file that outlives restarts; once the
+    file grows past ``disk_max_bytes`` the least recently used tenth of its
+    rows is evicted. Disk hits are promoted to memory.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        disk_path: Optional[str] = None,
+        disk_max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, Tuple[BPMResult, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: Optional[sqlite3.Connection] = None
+        if disk_path:
+            self._disk = sqlite3.connect(
+                disk_path, isolation_level=None, check_same_thread=False
+            )
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS bpm_cache ("
+                "key TEXT PRIMARY KEY, bpm REAL NOT NULL, confidence REAL NOT NULL, "
+                "size INTEGER NOT NULL, used REAL NOT NULL)"
+            )
+            self._disk.execute(
+                "CREATE INDEX IF NOT EXISTS bpm_cache_used ON bpm_cache (used)"
+            )
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def get(self, key: str) -> Optional[BPMResult]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            elif self._disk is not None:
+                entry = self._disk_get(key)
+                if entry is not None:
+                    self._remember(key, entry)
+                    self.disk_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self.bytes_saved += entry[1]
+            return entry[0]
+
+    def put(self, key: str, result: BPMResult, size: int) -> None:
+        """Stores the result for a file of ``size`` bytes."""
+        with self._lock:
+            self._remember(key, (result, size))
+            disk = self._disk
+            if disk is not None:
+                try:
+                    disk.execute(
+                        "INSERT OR REPLACE INTO bpm_cache VALUES (?, ?, ?, ?, ?)",
+                        (key, *result, size, time.time()),
+                    )
+                    self._evict_disk()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to write the BPM cache: {e}")
+
+    def _remember(self, key: str, entry: Tuple[BPMResult, int]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[Tuple[BPMResult, int]]:
+        disk = self._disk
+        assert disk is not None
+        try:
+            row = disk.execute(
+                "SELECT bpm, confidence, size FROM bpm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            disk.execute(
+                "UPDATE bpm_cache SET used = ? WHERE key = ?", (time.time(), key)
+            )
+            return BPMResult(row[0], row[1]), row[2]
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read the BPM cache: {e}")
+            return None
+
+    def _disk_bytes(self) -> int:
+        disk = self._disk
+        assert disk is not None
+        (pages,) = disk.execute("PRAGMA page_count").fetchone()
+        (page_size,) = disk.execute("PRAGMA page_size").fetchone()
+        (free,) = disk.execute("PRAGMA freelist_count").fetchone()
+        return (pages - free) * page_size
+
+    def _evict_disk(self) -> None:
+        disk = self._disk
+        assert disk is not None
+        if self._disk_bytes() <= self.disk_max_bytes:
+            return
+        (rows,) = disk.execute("SELECT COUNT(*) FROM bpm_cache").fetchone()
+        disk.execute(
+            "DELETE FROM bpm_cache WHERE key IN "
+            "(SELECT key FROM bpm_cache ORDER BY used LIMIT ?)",
+            (max(1, rows // 10),),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            report: Dict[str, Any] = {
+                "entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups if lookups else 0.0, 3),
+                "bytes_saved": self.bytes_saved,
+            }
+            if self._disk is not None:
+                report["disk_bytes"] = self._disk_bytes()
+            return report
+
+    def close(self) -> None:
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
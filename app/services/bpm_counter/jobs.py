@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import IO, Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SPOOL_CHUNK = 1024 * 1024
+
+
+class FileTooLargeError(ValueError):
+    """Raised when a file being spooled exceeds its size limit."""
+
+
+class SpooledFile(NamedTuple):
+    path: str
+    size: int
+    key: str
+
+
+def hash_file(fileobj: IO[bytes], digest: "hashlib._Hash") -> Tuple[str, int]:
+    """
+    Feeds ``fileobj`` to ``digest`` from its current position, then seeks
+    back there. Returns the hex digest and the number of bytes read.
+    """
+    start = fileobj.tell()
+    size = 0
+    while chunk := fileobj.read(SPOOL_CHUNK):
+        size += len(chunk)
+        digest.update(chunk)
+    fileobj.seek(start)
+    return digest.hexdigest(), size
+
+
+def spool(
+    fileobj: IO[bytes],
+    digest: Optional["hashlib._Hash"] = None,
+    max_bytes: Optional[int] = None,
+) -> Tuple[str, int]:
+    """
+    Copies ``fileobj`` to a temporary file for a worker process to read and
+    returns its path and size.
+
+    ``digest``, if given, is fed chunk by chunk along the way, for streams
+    that cannot be read twice. The caller owns the file and removes it once
+    the analysis is done.
+
+    Raises:
+        FileTooLargeError: more than ``max_bytes`` were read; nothing is kept
+    """
+    size = 0
+    with tempfile.NamedTemporaryFile(prefix="bpm-", delete=False) as spooled:
+        try:
+            while chunk := fileobj.read(SPOOL_CHUNK):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise FileTooLargeError(f"File is larger than {max_bytes} bytes")
+                if digest is not None:
+                    digest.update(chunk)
+                spooled.write(chunk)
+        except BaseException:
+            spooled.close()
+            remove_spooled(spooled.name)
+            raise
+    return spooled.name, size
+
+
+def remove_spooled(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class AnalysisQueueFullError(Exception):
+    """Raised when every worker is busy and the job queue is full."""
+
+
+class AnalysisExecutor:
+    """
+    Process pool for CPU-bound audio analysis.
+
+    At most ``workers + max_queue`` jobs are accepted at once; further
+    submissions raise AnalysisQueueFullError instead of piling up. Jobs get
+    ``timeout`` seconds of run time, enforced inside the worker so a stuck
+    job frees its process. The pool is created on first use with the
+    ``forkserver`` start method, which keeps workers from inheriting the
+    server's threads.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: int = 16,
+        timeout: float = 300.0,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "AnalysisExecutor":
+        workers = os.getenv("BPM_WORKERS")
+        return cls(
+            workers=int(workers) if workers else None,
+            max_queue=int(os.getenv("BPM_QUEUE", "16")),
+            timeout=float(os.getenv("BPM_JOB_TIMEOUT", "300")),
+        )
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return self._pool
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        """
+        Queues ``func(*args, timeout=timeout)`` on the pool.
+
+        Raises:
+            AnalysisQueueFullError: the pool and its queue are full
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise AnalysisQueueFullError("BPM analysis queue is full")
+            self._pending += 1
+            submitted = False
+            try:
+                try:
+                    future = self._get_pool().submit(func, *args, timeout=self.timeout)
+                except BrokenProcessPool:
+                    # A worker died (e.g. killed by the OOM killer); start over
+                    logger.error("Analysis pool is broken, restarting it")
+                    self._pool = None
+                    future = self._get_pool().submit(func, *args, timeout=self.timeout)
+                submitted = True
+            finally:
+                if not submitted:
+                    self._pending -= 1
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Submits a job and awaits its result."""
+        return await asyncio.wrap_future(self.submit(func, *args))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+class Job:
+    """An analysis submitted through the job API."""
+
+    def __init__(self, filename: Optional[str], future: Future):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.future = future
+        self.created = time.time()
+
+    def status(self) -> Dict[str, Any]:
+        report: Dict[str, Any] = {"id": self.id, "filename": self.filename}
+        if not self.future.done():
+            report["status"] = "running" if self.future.running() else "queued"
+            return report
+        error = self.future.exception() if not self.future.cancelled() else None
+        if self.future.cancelled() or error is not None:
+            report["status"] = "failed"
+            report["error"] = str(error) if error else "cancelled"
+        else:
+            report["status"] = "done"
+            report["result"] = self.future.result()
+        return report
+
+
+class JobStore:
+    """Recent jobs by id; the oldest finished jobs are forgotten past ``max_jobs``."""
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+            for job_id in list(self._jobs):
+                if len(self._jobs) <= self.max_jobs:
+                    break
+                if self._jobs[job_id].future.done():
+                    del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
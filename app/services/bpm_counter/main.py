@@ -1,119 +1,374 @@
-from fastapi import FastAPI, UploadFile, HTTPException, Request, File
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, UploadFile, HTTPException, Request, Response, File
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-import tempfile
+from asyncio import FIRST_COMPLETED
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import IO, Any, BinaryIO, Dict, List, Literal, Optional, Tuple
+import asyncio
 import io
+import json
 import os
-import aubio
-import numpy as np
+import tarfile
+import zipfile
 import logging
-from pydub import AudioSegment
 import uvicorn
 
-app = FastAPI()
+from .audio import (
+    AnalysisTimeoutError,
+    FastOptions,
+    UnsupportedAudioError,
+    analyze_path,
+    analyze_stream,
+    beats_to_bpm,
+)
+from .batch import MAX_MEMBER_BYTES, BatchFileError, iter_batch_files
+from .cache import BPMCache, content_hasher
+from .jobs import (
+    AnalysisExecutor,
+    AnalysisQueueFullError,
+    FileTooLargeError,
+    Job,
+    JobStore,
+    SpooledFile,
+    hash_file,
+    remove_spooled,
+    spool,
+)
 
+NO_BPM_DETAIL = "Could not detect BPM. Ensure the audio has clear rhythmic elements."
 
-templates = Jinja2Templates(directory="services/bpm_counter/templates")
+# "full" tracks every hop of the file; "fast" tracks excerpts until the tempo
+# converges (see FastOptions)
+AnalysisMode = Literal["full", "fast"]
+FAST_OPTIONS = FastOptions.from_env()
 
-logger = logging.getLogger(__name__)
+analysis_executor = AnalysisExecutor.from_env()
+jobs = JobStore()
+bpm_cache = BPMCache(
+    max_entries=int(os.getenv("BPM_CACHE_SIZE", "4096")),
+    disk_path=os.getenv("BPM_CACHE_DB"),
+    disk_max_bytes=int(os.getenv("BPM_CACHE_DB_MAX_BYTES", str(64 * 1024 * 1024))),
+)
 
 
-def convert_audio_to_wav(audio_data: bytes) -> bytes:
-    try:
-        audio = AudioSegment.from_file(io.BytesIO(audio_data))
-        wav_data = io.BytesIO()
-        audio.export(wav_data, format="wav", parameters=["-ac", "1", "-ar", "44100"])
-        return wav_data.getvalue()
-    except Exception as e:
-        logger.error(f"Conversion error: {str(e)}")
-        raise
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Handles startup and shutdown events."""
+    yield
+    analysis_executor.shutdown()
+    bpm_cache.close()
 
 
-def calculate_bpm(file_path: str) -> float:
-    try:
-        win_s = 1024
-        hop_s = 512
-        samplerate = 44100
+app = FastAPI(lifespan=lifespan)
 
-        src = aubio.source(file_path, samplerate, hop_s)
-        tempo = aubio.tempo("default", win_s, hop_s, samplerate)
 
-        beats = []
-        total_frames = 0
-
-        while True:
-            samples, read = src()
-            if read < hop_s:
-                break
-            if tempo(samples):
-                beats.append(tempo.get_last())
-            total_frames += read
+@app.exception_handler(AnalysisQueueFullError)
+async def queue_full_handler(request: Request, exc: AnalysisQueueFullError):
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"}
+    )
 
-        if len(beats) < 2:
-            logger.warning(f"Only {len(beats)} beats detected")
-            return 0.0
 
-        bpms = []
-        for i in range(1, len(beats)):
-            interval = (beats[i] - beats[i - 1]) / samplerate
-            if interval > 0:
-                bpms.append(60.0 / interval)
+templates = Jinja2Templates(directory="services/bpm_counter/templates")
 
-        if not bpms:
-            return 0.0
+logger = logging.getLogger(__name__)
 
-        avg_bpm = np.median(bpms)
-        logger.info(f"Detected BPM: {avg_bpm:.2f} ({len(beats)} beats)")
-        return round(float(avg_bpm), 2)
 
+def calculate_bpm(file_path: str) -> float:
+    try:
+        with open(file_path, "rb") as audio_file:
+            return analyze_stream(audio_file).bpm
     except Exception as e:
         logger.error(f"BPM detection error: {str(e)}")
         return 0.0
 
 
+def bpm_counter(beat_times: List[float]) -> float:
+    """Gateway entrypoint: the tempo of beat times given in seconds."""
+    return beats_to_bpm(beat_times, 1)
+
+
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
 upload_file = File(...)
+upload_files = File(...)
+
+
+def fast_options(mode: AnalysisMode) -> Optional[FastOptions]:
+    return FAST_OPTIONS if mode == "fast" else None
+
+
+def cache_variant(mode: AnalysisMode) -> str:
+    """Cache namespace of a mode, including the fast settings in use."""
+    if mode == "fast":
+        return "fast:" + ",".join(map(str, FAST_OPTIONS))
+    return mode
+
+
+def cached_future(key: str) -> Optional[Future]:
+    """A finished future holding the cached result for ``key``, if any."""
+    result = bpm_cache.get(key)
+    if result is None:
+        return None
+    future: Future = Future()
+    future.set_result(result)
+    return future
+
+
+async def submit_upload(
+    file: UploadFile, mode: AnalysisMode = "full"
+) -> Tuple[Future, bool]:
+    """
+    Starts the analysis of an upload unless its result is cached.
+
+    The upload Starlette has already spooled is hashed chunk by chunk off
+    the event loop, so a cache hit is answered without decoding or copying
+    anything. Only on a miss is it copied to a temporary file whose path
+    the worker opens. Returns the future of the BPMResult and whether it
+    came from the cache.
+    """
+    key, size = await asyncio.to_thread(
+        hash_file, file.file, content_hasher(cache_variant(mode))
+    )
+    future = cached_future(key)
+    if future is not None:
+        return future, True
+    path, _ = await asyncio.to_thread(spool, file.file)
+    try:
+        return submit_audio(SpooledFile(path, size, key), mode)
+    except BaseException:
+        remove_spooled(path)
+        raise
+
+
+def submit_audio(
+    spooled: SpooledFile, mode: AnalysisMode = "full"
+) -> Tuple[Future, bool]:
+    """
+    Returns the cached result for ``spooled.key`` or starts analysing the
+    spooled file. Once this returns, the file is removed when it is no
+    longer needed; if it raises, the caller still owns it.
+    """
+    future = cached_future(spooled.key)
+    if future is not None:
+        remove_spooled(spooled.path)
+        return future, True
+
+    # The worker reads the encoded file from disk and decodes it one hop at a
+    # time
+    future = analysis_executor.submit(analyze_path, spooled.path, fast_options(mode))
+
+    def finished(done: Future) -> None:
+        remove_spooled(spooled.path)
+        if not done.cancelled() and done.exception() is None:
+            bpm_cache.put(spooled.key, done.result(), spooled.size)
+
+    future.add_done_callback(finished)
+    return future, False
 
 
 @app.post("/upload")
 async def upload_audio(
+    response: Response,
     file: UploadFile = upload_file,
+    mode: AnalysisMode = "full",
 ):
     if not file:
         raise HTTPException(400, "No file uploaded")
 
     logger.info(f"Processing file: {file.filename}")
     try:
-        audio_data = await file.read()
-        wav_data = convert_audio_to_wav(audio_data)
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            tmp.write(wav_data)
-            tmp_path = tmp.name
-
-        try:
-            bpm = calculate_bpm(tmp_path)
-        finally:
-            os.unlink(tmp_path)
+        future, cached = await submit_upload(file, mode)
+        response.headers["X-Cache"] = "hit" if cached else "miss"
+        result = await asyncio.wrap_future(future)
 
-        if bpm <= 0:
+        if result.bpm <= 0:
             logger.warning("BPM detection failed")
-            raise HTTPException(
-                400,
-                "Could not detect BPM. Ensure the audio has clear rhythmic elements.",
-            )
+            raise HTTPException(400, NO_BPM_DETAIL)
 
-        return {"bpm": bpm}
+        return {"bpm": result.bpm, "confidence": result.confidence, "mode": mode}
 
+    except (HTTPException, AnalysisQueueFullError):
+        raise
+    except AnalysisTimeoutError as e:
+        raise HTTPException(504, str(e)) from e
+    except UnsupportedAudioError as e:
+        raise HTTPException(415, str(e)) from e
     except Exception as e:
         logger.error(f"Processing error: {str(e)}")
         raise HTTPException(500, f"Error processing audio: {str(e)}") from e
 
 
+def spool_member(mode: AnalysisMode):
+    """Spools batch files of at most MAX_MEMBER_BYTES, hashed for ``mode``."""
+
+    def read_member(name: str, stream: IO[bytes]) -> SpooledFile:
+        # Tar members are streamed and cannot be read again after hashing, so
+        # they are hashed while they are copied
+        digest = content_hasher(cache_variant(mode))
+        try:
+            path, size = spool(stream, digest, MAX_MEMBER_BYTES)
+        except FileTooLargeError as e:
+            raise BatchFileError(name, str(e)) from e
+        return SpooledFile(path, size, digest.hexdigest())
+
+    return read_member
+
+
+async def batch_files(uploads: List[Tuple[str, BinaryIO]], mode: AnalysisMode):
+    """Yields (name, spooled file or error) for every file of a batch request."""
+    for upload_name, fileobj in uploads:
+        files = iter_batch_files(upload_name, fileobj, spool_member(mode))
+        while True:
+            try:
+                # Reading and spooling the next file happens off the event loop
+                item = await asyncio.to_thread(next, files, None)
+            except (tarfile.TarError, zipfile.BadZipFile, OSError) as e:
+                yield upload_name, BatchFileError(upload_name, str(e))
+                break
+            if item is None:
+                break
+            yield item
+
+
+def batch_line(name: str, future: Any, cached: bool = False, error=None):
+    """One NDJSON result line, from a finished analysis or an error."""
+    if error is None:
+        try:
+            bpm, confidence = future.result()
+            if bpm <= 0:
+                error = NO_BPM_DETAIL
+        except Exception as e:
+            error = str(e) or type(e).__name__
+    result: Dict[str, Any] = (
+        {"file": name, "error": str(error)}
+        if error is not None
+        else {"file": name, "bpm": bpm, "confidence": confidence, "cached": cached}
+    )
+    return (json.dumps(result) + "\n").encode()
+
+
+async def batch_results(
+    uploads: List[Tuple[str, BinaryIO]], mode: AnalysisMode = "full"
+):
+    """
+    Analyses batch files in parallel and yields NDJSON lines as they finish.
+
+    At most one analysis per pool worker is in flight for a batch, which
+    keeps the shared queue open to other requests and bounds the disk space
+    held by spooled files.
+    """
+    running: Dict[asyncio.Future, str] = {}
+
+    async def wait_for_one():
+        done, _ = await asyncio.wait(running, return_when=FIRST_COMPLETED)
+        return [batch_line(running.pop(waiter), waiter) for waiter in done]
+
+    try:
+        async for name, data in batch_files(uploads, mode):
+            if isinstance(data, BatchFileError):
+                yield batch_line(name, None, error=data)
+                continue
+            future, cached, error = None, False, None
+            try:
+                while len(running) >= analysis_executor.workers:
+                    for line in await wait_for_one():
+                        yield line
+                while future is None and error is None:
+                    try:
+                        future, cached = submit_audio(data, mode)
+                    except AnalysisQueueFullError as e:
+                        # Other requests fill the queue; retry once ours frees up
+                        if not running:
+                            error = e
+                            continue
+                        for line in await wait_for_one():
+                            yield line
+            finally:
+                if future is None:
+                    remove_spooled(data.path)
+            if error is not None:
+                yield batch_line(name, None, error=error)
+            elif future.done():
+                yield batch_line(name, future, cached)
+            else:
+                running[asyncio.wrap_future(future)] = name
+        while running:
+            for line in await wait_for_one():
+                yield line
+    finally:
+        for _, fileobj in uploads:
+            fileobj.close()
+
+
+@app.post("/batch")
+async def batch_upload(
+    files: List[UploadFile] = upload_files, mode: AnalysisMode = "full"
+):
+    """
+    Detects the BPM of many files, streaming one NDJSON line per file.
+
+    Files may be sent as several multipart parts, as zip or tar archives, or
+    both. Lines are written as analyses finish, not in upload order.
+    """
+    # FastAPI closes uploads once the handler returns, before the response
+    # body is streamed, so the generator takes over the spooled files
+    uploads = []
+    for file in files:
+        uploads.append((file.filename or "upload", file.file))
+        file.file = io.BytesIO()
+    return StreamingResponse(
+        batch_results(uploads, mode), media_type="application/x-ndjson"
+    )
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(file: UploadFile = upload_file, mode: AnalysisMode = "full"):
+    """Queues a BPM analysis and returns its id without waiting for the result."""
+    future, _ = await submit_upload(file, mode)
+    job = Job(file.filename, future)
+    jobs.add(job)
+    return job_status(job)
+
+
+@app.get("/jobs/stats")
+def executor_stats():
+    """Returns worker and queue counters of the analysis pool."""
+    return analysis_executor.stats()
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Returns hit rate and bytes saved by the BPM result cache."""
+    return bpm_cache.stats()
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Returns the status of a job and, once done, its BPM."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return job_status(job)
+
+
+def job_status(job: Job) -> dict:
+    report = job.status()
+    if report["status"] == "done":
+        result = report.pop("result")
+        if result.bpm > 0:
+            report["bpm"] = result.bpm
+            report["confidence"] = result.confidence
+        else:
+            report["status"] = "failed"
+            report["error"] = NO_BPM_DETAIL
+    return report
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     port = int(os.getenv("PORT", 8000))
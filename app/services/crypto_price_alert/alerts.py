@@ -0,0 +1,190 @@
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+Thresholds = Tuple[Optional[float], Optional[float]]
+
+
+class ThresholdIndex:
+    """Users' thresholds for one direction of one coin, sorted by price."""
+
+    def __init__(self) -> None:
+        self.prices: List[float] = []
+        self.users: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def add(self, price: float, user: str) -> None:
+        i = bisect_right(self.prices, price)
+        self.prices.insert(i, price)
+        self.users.insert(i, user)
+
+    def add_many(self, entries: Iterable[Tuple[float, str]]) -> None:
+        """Adds many thresholds with one sort instead of one insert each."""
+        merged = sorted(
+            chain(zip(self.prices, self.users, strict=True), entries), key=itemgetter(0)
+        )
+        self.prices = [price for price, _ in merged]
+        self.users = [user for _, user in merged]
+
+    def remove(self, price: float, user: str) -> None:
+        lo = bisect_left(self.prices, price)
+        hi = bisect_right(self.prices, price)
+        for i in range(lo, hi):
+            if self.users[i] == user:
+                del self.prices[i]
+                del self.users[i]
+                return
+
+    def between(self, low: float, high: float, closed_low: bool) -> List[str]:
+        """Users whose threshold lies in (low, high], or [low, high) if closed_low."""
+        if closed_low:
+            lo = bisect_left(self.prices, low)
+            hi = bisect_left(self.prices, high)
+        else:
+            lo = bisect_right(self.prices, low)
+            hi = bisect_right(self.prices, high)
+        return self.users[lo:hi]
+
+
+class CoinAlerts:
+    """
+    All alerts for one coin, evaluated incrementally between price ticks.
+
+    An alert fires on the tick where the price reaches its threshold: only
+    thresholds between the previous and the current price are looked at, so a
+    tick costs O(log n + fired) instead of a scan over every user. Alerts set
+    since the last tick are checked against the current price on their own.
+    """
+
+    def __init__(self) -> None:
+        self.above = ThresholdIndex()
+        self.below = ThresholdIndex()
+        self.thresholds: Dict[str, Thresholds] = {}
+        self.last_price: Optional[float] = None
+        self._pending: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.thresholds)
+
+    def set(self, user: str, above: Optional[float], below: Optional[float]) -> None:
+        self.remove(user)
+        if above:
+            self.above.add(above, user)
+        if below:
+            self.below.add(below, user)
+        self.thresholds[user] = (above, below)
+        self._pending.add(user)
+
+    def set_many(self, alerts: Iterable[Tuple[str, Optional[float], Optional[float]]]):
+        """Bulk version of ``set`` for loading many (user, above, below) alerts."""
+        above: List[Tuple[float, str]] = []
+        below: List[Tuple[float, str]] = []
+        for user, user_above, user_below in alerts:
+            self.remove(user)
+            if user_above:
+                above.append((user_above, user))
+            if user_below:
+                below.append((user_below, user))
+            self.thresholds[user] = (user_above, user_below)
+            self._pending.add(user)
+        self.above.add_many(above)
+        self.below.add_many(below)
+
+    def remove(self, user: str) -> None:
+        old = self.thresholds.pop(user, None)
+        if old is None:
+            return
+        above, below = old
+        if above:
+            self.above.remove(above, user)
+        if below:
+            self.below.remove(below, user)
+        self._pending.discard(user)
+
+    def evaluate(self, price: float) -> List[Tuple[str, str]]:
+        """Returns (user, "above" | "below") for every alert reached by ``price``."""
+        previous = self.last_price
+        self.last_price = price
+        fired: List[Tuple[str, str]] = []
+
+        if previous is None:
+            # First price seen: every threshold already reached fires
+            fired += [
+                (u, "above")
+                for u in self.above.users[: bisect_right(self.above.prices, price)]
+            ]
+            fired += [
+                (u, "below")
+                for u in self.below.users[bisect_left(self.below.prices, price) :]
+            ]
+        elif price > previous:
+            fired += [(u, "above") for u in self.above.between(previous, price, False)]
+        elif price < previous:
+            fired += [(u, "below") for u in self.below.between(price, previous, True)]
+
+        if self._pending and previous is not None:
+            already = set(fired)
+            for user in self._pending:
+                above, below = self.thresholds[user]
+                if above and price >= above and (user, "above") not in already:
+                    fired.append((user, "above"))
+                if below and price <= below and (user, "below") not in already:
+                    fired.append((user, "below"))
+        self._pending.clear()
+        return fired
+
+
+class AlertBook:
+    """Price alerts of all users, indexed per coin."""
+
+    def __init__(self) -> None:
+        self.coins: Dict[str, CoinAlerts] = {}
+
+    def __len__(self) -> int:
+        return sum(len(alerts) for alerts in self.coins.values())
+
+    def __contains__(self, crypto: str) -> bool:
+        return crypto in self.coins
+
+    def cryptos(self) -> List[str]:
+        return list(self.coins)
+
+    def get(self, crypto: str, user: str) -> Optional[Thresholds]:
+        alerts = self.coins.get(crypto)
+        return alerts.thresholds.get(user) if alerts else None
+
+    def set_alert(
+        self, crypto: str, user: str, above: Optional[float], below: Optional[float]
+    ) -> None:
+        self.coins.setdefault(crypto, CoinAlerts()).set(user, above, below)
+
+    def load(
+        self, alerts: Iterable[Tuple[str, str, Optional[float], Optional[float]]]
+    ) -> int:
+        """Bulk loads (crypto, user, above, below) rows, returning how many."""
+        by_crypto: Dict[str, List[Tuple[str, Optional[float], Optional[float]]]] = {}
+        count = 0
+        for crypto, user, above, below in alerts:
+            by_crypto.setdefault(crypto, []).append((user, above, below))
+            count += 1
+        for crypto, rows in by_crypto.items():
+            self.coins.setdefault(crypto, CoinAlerts()).set_many(rows)
+        return count
+
+    def remove_alert(self, crypto: str, user: str) -> None:
+        alerts = self.coins.get(crypto)
+        if alerts is None:
+            return
+        alerts.remove(user)
+        if not alerts:
+            del self.coins[crypto]
+
+    def evaluate(self, crypto: str, price: float) -> List[Tuple[str, str]]:
+        alerts = self.coins.get(crypto)
+        return alerts.evaluate(price) if alerts else []
+
+    def clear(self) -> None:
+        self.coins.clear()
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from .utils import format_crypto_price
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT = "🔔 Checking alerts..."
+_HEARTBEAT_KEY = ""
+
+
+def price_message(crypto: str, price: float) -> str:
+    return f"🔔 {crypto}: {format_crypto_price(price)} USD"
+
+
+class Subscription:
+    """
+    One websocket client's mailbox.
+
+    Pending messages are kept per coin, so a client that falls behind gets
+    the latest price of each coin instead of a growing backlog; the mailbox
+    never holds more than one message per coin plus the heartbeat. ``coins``
+    of None follows every coin that has an alert.
+    """
+
+    def __init__(self, coins: Optional[Set[str]] = None):
+        self.coins = coins
+        self.closed = False
+        self.coalesced = 0
+        self.lag = 0
+        self._pending: Dict[str, str] = {}
+        self._ready = asyncio.Event()
+
+    def wants(self, crypto: str, watched: Set[str]) -> bool:
+        return crypto in (watched if self.coins is None else self.coins)
+
+    def push(self, messages: Dict[str, str]) -> None:
+        """Queues one tick of messages, replacing undelivered older ones."""
+        if self._pending:
+            self.lag += 1
+            self.coalesced += len(self._pending.keys() & messages.keys())
+        # Re-inserting keeps the heartbeat after the prices of the same tick
+        for key, message in messages.items():
+            self._pending.pop(key, None)
+            self._pending[key] = message
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def get(self) -> List[str]:
+        """Waits for and returns the pending messages; empty once closed."""
+        await self._ready.wait()
+        self._ready.clear()
+        if self.closed:
+            return []
+        messages = list(self._pending.values())
+        self._pending.clear()
+        self.lag = 0
+        return messages
+
+
+class PriceHub:
+    """
+    Fans price updates out to websocket subscribers.
+
+    A single producer task fetches the prices of every subscribed coin once
+    per ``interval``, formats each message once and hands it to the matching
+    subscriptions. The producer is started with ``start`` and stops once the
+    last subscriber leaves. Subscribers that have not drained their
+    mailbox for ``max_lag`` ticks are dropped.
+    """
+
+    def __init__(
+        self,
+        fetch_prices: Callable[[List[str]], Dict[str, float]],
+        watched: Callable[[], Iterable[str]],
+        interval: float = 30.0,
+        max_lag: int = 10,
+    ):
+        self.fetch_prices = fetch_prices
+        self.watched = watched
+        self.interval = interval
+        self.max_lag = max_lag
+        self.subscriptions: Set[Subscription] = set()
+        self.ticks = 0
+        self.dropped = 0
+        self._latest: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, coins: Optional[Iterable[str]] = None) -> Subscription:
+        """Registers a subscriber, primed with the last known prices."""
+        subscription = Subscription(set(coins) if coins is not None else None)
+        watched = set(self.watched())
+        latest = {
+            crypto: message
+            for crypto, message in self._latest.items()
+            if subscription.wants(crypto, watched)
+        }
+        if latest:
+            subscription.push(latest)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        self.subscriptions.discard(subscription)
+        if not self.subscriptions and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def start(self) -> None:
+        """Starts the producer on the running loop unless it is already running."""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.publish()
+            except Exception as e:
+                logger.error(f"Price broadcast failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def publish(self) -> None:
+        """Fetches the subscribed coins once and delivers one tick to everyone."""
+        watched = set(self.watched())
+        wanted: Set[str] = set()
+        for subscription in self.subscriptions:
+            wanted |= watched if subscription.coins is None else subscription.coins
+        prices = (
+            await asyncio.to_thread(self.fetch_prices, sorted(wanted)) if wanted else {}
+        )
+
+        messages = {
+            crypto: price_message(crypto, price)
+            for crypto, price in sorted(prices.items())
+            if price
+        }
+        self._latest.update(messages)
+        self.ticks += 1
+
+        for subscription in list(self.subscriptions):
+            if subscription.lag >= self.max_lag:
+                logger.warning("Dropping a websocket subscriber that stopped reading")
+                self.dropped += 1
+                self.unsubscribe(subscription)
+                continue
+            tick = {
+                crypto: message
+                for crypto, message in messages.items()
+                if subscription.wants(crypto, watched)
+            }
+            tick[_HEARTBEAT_KEY] = HEARTBEAT
+            subscription.push(tick)
+
+    async def aclose(self) -> None:
+        for subscription in list(self.subscriptions):
+            self.unsubscribe(subscription)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": len(self.subscriptions),
+            "ticks": self.ticks,
+            "dropped": self.dropped,
+            "coalesced": sum(s.coalesced for s in self.subscriptions),
+        }
@@ -0,0 +1,138 @@
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FetchMany = Callable[[List[str], str], Dict[str, float]]
+Key = Tuple[str, str]
+
+
+class PriceCache:
+    """
+    In-process cache of coin prices keyed by (coin, currency).
+
+    Fresh entries (younger than ``ttl``) are served without an upstream call.
+    Concurrent misses for the same key are coalesced into a single fetch, and
+    all misses of one ``get_many`` call are fetched in one batch. With
+    ``allow_stale`` an expired entry younger than ``ttl + stale_ttl`` is
+    returned immediately while a background refresh updates it.
+    """
+
+    def __init__(
+        self,
+        fetch_many: FetchMany,
+        ttl: float = 30.0,
+        stale_ttl: float = 300.0,
+        fetch_timeout: float = 60.0,
+    ):
+        self.fetch_many = fetch_many
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.fetch_timeout = fetch_timeout
+        self._entries: Dict[Key, Tuple[float, float]] = {}
+        self._inflight: Dict[Key, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+
+    def get(
+        self, coin: str, currency: str = "usd", allow_stale: bool = False
+    ) -> Optional[float]:
+        return self.get_many([coin], currency, allow_stale).get(coin)
+
+    def get_many(
+        self, coins: Iterable[str], currency: str = "usd", allow_stale: bool = False
+    ) -> Dict[str, float]:
+        """Returns the prices that could be found; unknown coins are left out."""
+        now = time.monotonic()
+        prices: Dict[str, Optional[float]] = {}
+        to_fetch: List[str] = []
+        to_refresh: List[str] = []
+        waiting: Dict[str, Future] = {}
+
+        with self._lock:
+            for coin in dict.fromkeys(coins):
+                key = (coin, currency)
+                entry = self._entries.get(key)
+                # A missing entry is infinitely old, so no freshness check passes
+                age = now - entry[1] if entry else math.inf
+                if entry and age < self.ttl:
+                    self.hits += 1
+                    prices[coin] = entry[0]
+                    continue
+                inflight = self._inflight.get(key)
+                if entry and allow_stale and age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    prices[coin] = entry[0]
+                    if inflight is None:
+                        self._inflight[key] = Future()
+                        to_refresh.append(coin)
+                    continue
+                if inflight is not None:
+                    self.coalesced += 1
+                    waiting[coin] = inflight
+                    continue
+                self.misses += 1
+                self._inflight[key] = Future()
+                to_fetch.append(coin)
+
+        if to_refresh:
+            threading.Thread(
+                target=self._fetch, args=(to_refresh, currency), daemon=True
+            ).start()
+        if to_fetch:
+            prices.update(self._fetch(to_fetch, currency))
+        for coin, future in waiting.items():
+            try:
+                prices[coin] = future.result(timeout=self.fetch_timeout)
+            except TimeoutError:
+                logger.warning(f"Timed out waiting for the {coin} price")
+        return {coin: price for coin, price in prices.items() if price is not None}
+
+    def _fetch(self, coins: List[str], currency: str) -> Dict[str, Optional[float]]:
+        try:
+            fetched = self.fetch_many(coins, currency)
+        except Exception as e:
+            logger.error(f"Price fetch failed for {', '.join(coins)}: {e}")
+            fetched = {}
+
+        now = time.monotonic()
+        results: Dict[str, Optional[float]] = {}
+        futures: List[Tuple[Future, Optional[float]]] = []
+        with self._lock:
+            for coin in coins:
+                key = (coin, currency)
+                price = fetched.get(coin)
+                if price is not None:
+                    self._entries[key] = (price, now)
+                results[coin] = price
+                future = self._inflight.pop(key, None)
+                if future is not None:
+                    futures.append((future, price))
+        for future, price in futures:
+            future.set_result(price)
+        return results
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced + self.stale_hits
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "stale_hits": self.stale_hits,
+                "hit_rate": round(
+                    (self.hits + self.stale_hits) / lookups if lookups else 0.0, 3
+                ),
+            }
@@ -1,47 +1,113 @@
-from fastapi import FastAPI, WebSocket, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from apscheduler.schedulers.background import BackgroundScheduler
 from threading import Lock
 from contextlib import asynccontextmanager
+from .alerts import AlertBook
+from .broadcast import PriceHub
+from .cache import PriceCache
 from .models import PriceAlertRequest, PriceResponse
-from .utils import get_crypto_price, format_crypto_price
+from .store import AlertStore, SQLiteAlertStore
+from .utils import get_crypto_prices, format_crypto_price
 import asyncio
-from typing import Dict, Any
+import os
+import socket
+from typing import Optional
 
 scheduler = BackgroundScheduler()
-scheduler.start()
 lock = Lock()
-price_alerts: Dict[str, Dict[str, Dict[str, Any]]] = {}
+price_alerts = AlertBook()
+# Alerts survive restarts and are shared by workers when CRYPTO_ALERT_DB is set
+ALERT_DB = os.getenv("CRYPTO_ALERT_DB")
+alert_store = SQLiteAlertStore(ALERT_DB) if ALERT_DB else AlertStore()
+alerts_version = 0
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+CHECK_INTERVAL = 30
+# One cache for the HTTP endpoint, websocket clients and the scheduler job, so
+# each coin is fetched from CoinGecko at most once per TTL
+price_cache = PriceCache(
+    lambda cryptos, currency: get_crypto_prices(cryptos, currency),
+    ttl=float(os.getenv("CRYPTO_PRICE_TTL", "30")),
+    stale_ttl=float(os.getenv("CRYPTO_PRICE_STALE_TTL", "300")),
+)
+
+
+def watched_cryptos():
+    with lock:
+        return price_alerts.cryptos()
+
+
+price_hub = PriceHub(
+    price_cache.get_many,
+    watched_cryptos,
+    interval=float(os.getenv("CRYPTO_WS_INTERVAL", "30")),
+)
+
+
+def load_alerts():
+    """Streams the stored alerts into the in-memory alert book."""
+    global alerts_version
+    # Read the version first: writes racing the load are replayed by sync
+    version = alert_store.version()
+    with lock:
+        count = price_alerts.load(alert_store.iter_alerts())
+        alerts_version = version
+    return count
+
+
+def sync_alerts():
+    """Applies alerts written by other workers since the last sync."""
+    global alerts_version
+    version, changes = alert_store.changes_since(alerts_version)
+    with lock:
+        for crypto, user, above, below, deleted in changes:
+            if deleted:
+                price_alerts.remove_alert(crypto, user)
+            elif price_alerts.get(crypto, user) != (above, below):
+                price_alerts.set_alert(crypto, user, above, below)
+        alerts_version = version
 
 
 def check_price_alerts():
     """Checks if the prices have reached the limits set by users."""
+    sync_alerts()
+    # With several workers on one database only the lease holder evaluates
+    if not alert_store.acquire_lease(WORKER_ID, ttl=CHECK_INTERVAL * 3):
+        return
+    with lock:
+        cryptos = price_alerts.cryptos()
+    # Fetch without holding the lock so set_price_alert is never blocked on I/O
+    prices = price_cache.get_many(cryptos)
+
+    triggered = []
     with lock:
-        for crypto, alert_data in price_alerts.items():
-            current_price = get_crypto_price(crypto)
-            if current_price:
-                formatted_price = format_crypto_price(current_price)
-                for user, alert_price in alert_data.items():
-                    if (
-                        alert_price["above"] and current_price >= alert_price["above"]
-                    ) or (
-                        alert_price["below"] and current_price <= alert_price["below"]
-                    ):
-                        print(
-                            f"🔔 Alert for {user}: {crypto} has reached "
-                            f"{formatted_price} USD!"
-                        )
+        for crypto, current_price in prices.items():
+            formatted_price = format_crypto_price(current_price)
+            for user, _direction in price_alerts.evaluate(crypto, current_price):
+                triggered.append(
+                    f"🔔 Alert for {user}: {crypto} has reached "
+                    f"{formatted_price} USD!"
+                )
+    for message in triggered:
+        print(message)
 
 
-scheduler.add_job(check_price_alerts, "interval", seconds=30)
+scheduler.add_job(check_price_alerts, "interval", seconds=CHECK_INTERVAL)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handles startup and shutdown events."""
+    count = await asyncio.to_thread(load_alerts)
+    if count:
+        print(f"Loaded {count} price alerts")
+    scheduler.start()
     try:
         yield
     finally:
+        await price_hub.aclose()
         scheduler.shutdown()
+        # The store stays open: every accepted write has already been committed
+        alert_store.release_lease(WORKER_ID)
 
 
 app = FastAPI(lifespan=lifespan)
@@ -50,13 +116,26 @@ app = FastAPI(lifespan=lifespan)
 @app.get("/price/{crypto}", response_model=PriceResponse)
 def get_price(crypto: str):
     """Returns the current price of the cryptocurrency."""
-    price = get_crypto_price(crypto)
+    price = price_cache.get(crypto, allow_stale=True)
     if price is not None:
         formatted_price = format_crypto_price(price)
         return {"crypto": crypto, "price": formatted_price}
     raise HTTPException(status_code=404, detail="Failed to retrieve the price")
 
 
+def crypto_price_alert_service(crypto: str, target_price: float):
+    """Gateway entrypoint: the current price and whether it has reached the target."""
+    price = price_cache.get(crypto, allow_stale=True)
+    if price is None:
+        raise HTTPException(status_code=404, detail="Failed to retrieve the price")
+    return {
+        "crypto": crypto,
+        "price": format_crypto_price(price),
+        "target_price": target_price,
+        "reached": price >= target_price,
+    }
+
+
 @app.post("/set_alert/")
 def set_price_alert(request: PriceAlertRequest):
     """Sets a price alert for the user."""
@@ -65,33 +144,61 @@ def set_price_alert(request: PriceAlertRequest):
             status_code=400,
             detail="At least one of 'above' or 'below' must be provided.",
         )
+    # Waits for the write to be committed together with concurrent ones
+    alert_store.save(
+        request.crypto, request.user, request.above, request.below
+    ).result()
     with lock:
-        if request.crypto not in price_alerts:
-            price_alerts[request.crypto] = {}
-        price_alerts[request.crypto][request.user] = {
-            "above": request.above,
-            "below": request.below,
-        }
+        price_alerts.set_alert(
+            request.crypto, request.user, request.above, request.below
+        )
     return {"message": f"Alert for {request.crypto} has been set!"}
 
 
 @app.websocket("/ws")
-async def websocket_alerts(websocket: WebSocket):
-    """WebSocket for sending real-time alerts."""
+async def websocket_alerts(websocket: WebSocket, coins: Optional[str] = None):
+    """
+    WebSocket for sending real-time alerts.
+
+    ``coins`` is a comma separated list of coins to follow; without it the
+    client receives every coin that has an alert.
+    """
     await websocket.accept()
+    selected = (
+        [crypto.strip() for crypto in coins.split(",") if crypto.strip()]
+        if coins
+        else None
+    )
+    subscription = price_hub.subscribe(selected)
+    price_hub.start()
     try:
         while True:
-            with lock:
-                for crypto, _alert_data in price_alerts.items():
-                    price = get_crypto_price(crypto)
-                    if price:
-                        formatted_price = format_crypto_price(price)
-                        await websocket.send_text(f"🔔 {crypto}: {formatted_price} USD")
-            await websocket.send_text("🔔 Checking alerts...")
-            await asyncio.sleep(30)
+            messages = await subscription.get()
+            if not messages:
+                # Dropped by the hub for falling too far behind
+                await websocket.close(code=1013)
+                break
+            for message in messages:
+                await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
         print(f"WebSocket error: {e}")
         await websocket.close()
+    finally:
+        price_hub.unsubscribe(subscription)
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Returns hit, miss and coalescing counters of the price cache."""
+    return price_cache.stats()
+
+
+@app.get("/ws/stats")
+def websocket_stats():
+    """Returns subscriber and delivery counters of the websocket broadcaster."""
+    return price_hub.stats()
 
 
 @app.get("/")
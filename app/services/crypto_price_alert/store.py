@@ -0,0 +1,241 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+AlertRow = Tuple[str, str, Optional[float], Optional[float]]
+# (crypto, user, above, below, deleted)
+ChangeRow = Tuple[str, str, Optional[float], Optional[float], bool]
+
+
+class AlertStore:
+    """
+    Where price alerts are persisted.
+
+    This base class keeps nothing: alerts live only in the process' AlertBook,
+    and the single process is always the evaluator. Backends override the
+    methods below to make alerts survive restarts and to share them between
+    workers.
+    """
+
+    def save(
+        self, crypto: str, user: str, above: Optional[float], below: Optional[float]
+    ) -> "Future[None]":
+        """Queues an alert write; the future completes once it is durable."""
+        future: "Future[None]" = Future()
+        future.set_result(None)
+        return future
+
+    def delete(self, crypto: str, user: str) -> "Future[None]":
+        return self.save(crypto, user, None, None)
+
+    def iter_alerts(self) -> Iterator[AlertRow]:
+        """Yields every stored (crypto, user, above, below) alert."""
+        return iter(())
+
+    def version(self) -> int:
+        """Version of the latest write; see ``changes_since``."""
+        return 0
+
+    def changes_since(self, version: int) -> Tuple[int, List[ChangeRow]]:
+        """Returns the current version and the alerts written after ``version``."""
+        return version, []
+
+    def acquire_lease(self, owner: str, ttl: float) -> bool:
+        """Claims or renews the right to evaluate alerts for ``ttl`` seconds."""
+        return True
+
+    def release_lease(self, owner: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteAlertStore(AlertStore):
+    """
+    Alerts in a SQLite database in WAL mode.
+
+    Writes are handed to one writer thread, which commits everything queued
+    at that moment in a single transaction (group commit), so concurrent
+    ``set_alert`` calls share one fsync. WAL lets any number of workers read
+    the file while one of them writes. Each write stamps rows with a
+    monotonically increasing version, which other workers poll through
+    ``changes_since``; deletions are kept as tombstones for that reason. A
+    lease row elects the single worker that evaluates alerts.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS alerts (
+            crypto TEXT NOT NULL,
+            user TEXT NOT NULL,
+            above REAL,
+            below REAL,
+            deleted INTEGER NOT NULL DEFAULT 0,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (crypto, user)
+        );
+        CREATE INDEX IF NOT EXISTS alerts_above ON alerts (crypto, above);
+        CREATE INDEX IF NOT EXISTS alerts_below ON alerts (crypto, below);
+        CREATE INDEX IF NOT EXISTS alerts_version ON alerts (version);
+        CREATE TABLE IF NOT EXISTS evaluator_lease (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            owner TEXT NOT NULL,
+            expires REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, fetch_size: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.fetch_size = fetch_size
+        self._conn = self._connect()
+        self._conn.executescript(self.SCHEMA)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._queue: "queue.Queue[Optional[Tuple[ChangeRow, Future]]]" = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="alert-store-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only risks the last transactions on power loss,
+        # never corruption
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def save(self, crypto, user, above, below):
+        if self._closed:
+            raise RuntimeError("Alert store is closed")
+        future: "Future[None]" = Future()
+        deleted = above is None and below is None
+        self._queue.put(((crypto, user, above, below, deleted), future))
+        return future
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._write(batch)
+                    return
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch: List[Tuple[ChangeRow, Future]]) -> None:
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    (latest,) = self._conn.execute(
+                        "SELECT COALESCE(MAX(version), 0) FROM alerts"
+                    ).fetchone()
+                    self._conn.executemany(
+                        "INSERT INTO alerts (crypto, user, above, below, deleted, "
+                        "version) VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (crypto, user) DO UPDATE SET "
+                        "above = excluded.above, below = excluded.below, "
+                        "deleted = excluded.deleted, version = excluded.version",
+                        [(*row[:4], int(row[4]), latest + 1) for row, _ in batch],
+                    )
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} alerts: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for _, future in batch:
+            future.set_result(None)
+
+    def iter_alerts(self) -> Iterator[AlertRow]:
+        # A connection of its own, so a long load never blocks the writer
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "SELECT crypto, user, above, below FROM alerts "
+                "WHERE deleted = 0 ORDER BY crypto"
+            )
+            while True:
+                rows = cursor.fetchmany(self.fetch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            conn.close()
+
+    def version(self) -> int:
+        with self._lock:
+            (latest,) = self._conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM alerts"
+            ).fetchone()
+        return latest
+
+    def changes_since(self, version):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT crypto, user, above, below, deleted, version FROM alerts "
+                "WHERE version > ? ORDER BY version",
+                (version,),
+            ).fetchall()
+        if not rows:
+            return version, []
+        return rows[-1][5], [
+            (crypto, user, above, below, bool(deleted))
+            for crypto, user, above, below, deleted, _ in rows
+        ]
+
+    def acquire_lease(self, owner, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT owner, expires FROM evaluator_lease WHERE id = 1"
+                ).fetchone()
+                acquired = row is None or row[0] == owner or row[1] < now
+                if acquired:
+                    self._conn.execute(
+                        "INSERT INTO evaluator_lease (id, owner, expires) "
+                        "VALUES (1, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                        "owner = excluded.owner, expires = excluded.expires",
+                        (owner, now + ttl),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return acquired
+
+    def release_lease(self, owner: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM evaluator_lease WHERE owner = ?", (owner,))
+
+    def close(self) -> None:
+        """Writes everything still queued, then closes the database."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
@@ -1,19 +1,49 @@
 import requests
+from typing import Dict, Iterable
+
+from ..http_client import get_client
 
 COIN_API_URL = "https://api.coingecko.com/api/v3/simple/price"
 
+# Keeps the query string of one simple/price request within URL length limits
+MAX_IDS_PER_REQUEST = 250
+
 
 def get_crypto_price(crypto: str, currency: str = "usd"):
     """Fetches the current price of the cryptocurrency."""
-    try:
-        response = requests.get(
-            COIN_API_URL, params={"ids": crypto, "vs_currencies": currency}, timeout=10
-        )
-        response.raise_for_status()
-        return response.json().get(crypto, {}).get(currency)
-    except requests.RequestException as e:
-        print(f"Error fetching price for {crypto}: {e}")
-        return None
+    return get_crypto_prices([crypto], currency).get(crypto)
+
+
+def get_crypto_prices(
+    cryptos: Iterable[str],
+    currency: str = "usd",
+    chunk_size: int = MAX_IDS_PER_REQUEST,
+) -> Dict[str, float]:
+    """
+    Fetches the current prices of many cryptocurrencies at once.
+
+    Coins are requested with one simple/price call per chunk of ``chunk_size``
+    ids. Coins that are unknown or whose chunk failed are left out of the result.
+    """
+    ids = list(dict.fromkeys(cryptos))
+    prices: Dict[str, float] = {}
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start : start + chunk_size]
+        try:
+            response = get_client().get(
+                COIN_API_URL,
+                params={"ids": ",".join(chunk), "vs_currencies": currency},
+            )
+            response.raise_for_status()
+            data = response.json()
+        except requests.RequestException as e:
+            print(f"Error fetching prices for {', '.join(chunk)}: {e}")
+            continue
+        for crypto in chunk:
+            price = data.get(crypto, {}).get(currency)
+            if price is not None:
+                prices[crypto] = price
+    return prices
 
 
 def format_crypto_price(price):
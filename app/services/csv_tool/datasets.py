@@ -0,0 +1,304 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from .ingest import arrow_types, read_csv_parallel, read_upload_parallel
+from .reader import CHUNK_ROWS
+
+logger = logging.getLogger(__name__)
+
+# Bytes of CSV parsed per Arrow record batch while converting
+BLOCK_BYTES = 16 * 1024 * 1024
+
+
+class DatasetNotFoundError(LookupError):
+    """Raised for a dataset id that is not (or no longer) stored."""
+
+
+class DatasetPathError(PermissionError):
+    """Raised for a server-side path outside the allowed data directory."""
+
+
+class DatasetRegistry:
+    """
+    CSV files converted once to Arrow and queried many times.
+
+    Each dataset is an uncompressed Arrow IPC file (Feather v2) under
+    ``root``, so reads memory-map it and only touch the pages of the
+    columns they use; nothing is parsed again. An SQLite index in the same
+    directory keeps names, schemas and sizes across restarts. Once the
+    files add up to more than ``max_bytes`` the least recently used
+    datasets are deleted, never the one just added.
+
+    Server-side paths are resolved inside ``data_dir``; without one they
+    are refused.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int = 1024 * 1024 * 1024,
+        data_dir: Optional[str] = None,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.data_dir = os.path.realpath(data_dir) if data_dir else None
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(root, "datasets.db"),
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS datasets ("
+            "id TEXT PRIMARY KEY, name TEXT, rows INTEGER NOT NULL, "
+            "columns TEXT NOT NULL, bytes INTEGER NOT NULL, "
+            "created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        # Files lost while the service was down
+        for (dataset_id,) in self._db.execute("SELECT id FROM datasets").fetchall():
+            if not os.path.exists(self._path(dataset_id)):
+                self._db.execute("DELETE FROM datasets WHERE id = ?", (dataset_id,))
+        self.evicted = 0
+
+    @classmethod
+    def from_env(cls) -> "DatasetRegistry":
+        return cls(
+            root=os.getenv(
+                "CSV_TOOL_DATASET_DIR",
+                os.path.join(tempfile.gettempdir(), "csv_tool_datasets"),
+            ),
+            max_bytes=int(
+                os.getenv("CSV_TOOL_DATASET_MAX_BYTES", str(1024 * 1024 * 1024))
+            ),
+            data_dir=os.getenv("CSV_TOOL_DATA_DIR"),
+        )
+
+    def _path(self, dataset_id: str) -> str:
+        return os.path.join(self.root, f"{dataset_id}.arrow")
+
+    def resolve_path(self, path: str) -> str:
+        """
+        Returns the real path of a server-side file inside ``data_dir``.
+
+        Raises:
+            DatasetPathError: no data directory is set or the path leaves it
+            FileNotFoundError: the file does not exist
+        """
+        if self.data_dir is None:
+            raise DatasetPathError("Server-side paths are disabled")
+        resolved = os.path.realpath(os.path.join(self.data_dir, path))
+        if os.path.commonpath([resolved, self.data_dir]) != self.data_dir:
+            raise DatasetPathError(f"Path is outside the data directory: {path}")
+        if not os.path.isfile(resolved):
+            raise FileNotFoundError(f"No such file: {path}")
+        return resolved
+
+    def add_path(
+        self,
+        path: str,
+        schema: Optional[Dict[str, str]] = None,
+        parallel: bool = False,
+    ) -> Dict[str, Any]:
+        """Converts a server-side CSV file; see ``resolve_path`` and ``add``."""
+        resolved = self.resolve_path(path)
+        name = os.path.basename(resolved)
+        if parallel:
+            return self.add_frame(read_csv_parallel(resolved, schema=schema), name)
+        with open(resolved, "rb") as fileobj:
+            return self.add(fileobj, name, schema)
+
+    def add(
+        self,
+        fileobj: BinaryIO,
+        name: Optional[str] = None,
+        schema: Optional[Dict[str, str]] = None,
+        parallel: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Converts a CSV file object to Arrow and returns the new dataset's info.
+
+        The CSV is parsed one block at a time by pyarrow's streaming reader
+        and written batch by batch, so memory does not grow with the file.
+        With ``parallel`` it is parsed on all cores by read_csv_parallel
+        instead, which holds the parsed table in memory. Columns named in
+        ``schema`` get those types rather than inferred ones.
+
+        Raises:
+            ValueError: the CSV cannot be parsed or does not fit ``schema``
+        """
+        import pyarrow.csv as pacsv
+
+        if parallel:
+            frame = read_upload_parallel(fileobj, schema=schema, tmp_dir=self.root)
+            return self.add_frame(frame, name)
+        reader = pacsv.open_csv(
+            fileobj,
+            read_options=pacsv.ReadOptions(block_size=BLOCK_BYTES),
+            convert_options=pacsv.ConvertOptions(
+                column_types=arrow_types(schema or {})
+            ),
+        )
+        return self._store(reader.schema, reader, name)
+
+    def add_frame(self, frame: pd.DataFrame, name: Optional[str] = None):
+        """Stores an already parsed DataFrame as a dataset."""
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        return self._store(table.schema, table.to_batches(), name)
+
+    def _store(self, schema, batches, name: Optional[str]) -> Dict[str, Any]:
+        import pyarrow as pa
+
+        dataset_id = uuid.uuid4().hex
+        path = self._path(dataset_id)
+        partial = path + ".tmp"
+        rows = 0
+        try:
+            with pa.OSFile(partial, "wb") as sink:
+                with pa.ipc.new_file(sink, schema) as writer:
+                    for batch in batches:
+                        writer.write_batch(batch)
+                        rows += batch.num_rows
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+        columns = [{"name": field.name, "type": str(field.type)} for field in schema]
+        size = os.path.getsize(path)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (dataset_id, name, rows, json.dumps(columns), size, now, now),
+            )
+            self._evict(keep=dataset_id)
+        logger.info(f"Stored dataset {dataset_id} ({rows} rows, {size} bytes)")
+        return self.info(dataset_id)
+
+    def _evict(self, keep: str) -> None:
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(bytes), 0) FROM datasets"
+        ).fetchone()
+        while total > self.max_bytes:
+            row = self._db.execute(
+                "SELECT id, bytes FROM datasets WHERE id != ? ORDER BY used LIMIT 1",
+                (keep,),
+            ).fetchone()
+            if row is None:
+                return
+            self._remove(row[0])
+            self.evicted += 1
+            total -= row[1]
+            logger.info(f"Evicted dataset {row[0]}")
+
+    def _remove(self, dataset_id: str) -> None:
+        self._db.execute("DELETE FROM datasets WHERE id = ?", (dataset_id,))
+        try:
+            # Readers that still map the file keep their pages until they finish
+            os.remove(self._path(dataset_id))
+        except FileNotFoundError:
+            pass
+
+    def info(self, dataset_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, name, rows, columns, bytes, created, used "
+                "FROM datasets WHERE id = ?",
+                (dataset_id,),
+            ).fetchone()
+        if row is None:
+            raise DatasetNotFoundError(dataset_id)
+        return self._row_info(row)
+
+    @staticmethod
+    def _row_info(row: tuple) -> Dict[str, Any]:
+        return {
+            "id": row[0],
+            "name": row[1],
+            "rows": row[2],
+            "columns": json.loads(row[3]),
+            "bytes": row[4],
+            "created": row[5],
+            "used": row[6],
+        }
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, name, rows, columns, bytes, created, used "
+                "FROM datasets ORDER BY created"
+            ).fetchall()
+        return [self._row_info(row) for row in rows]
+
+    def open(self, dataset_id: str, columns: Optional[List[str]] = None):
+        """
+        Returns the dataset as a memory-mapped pyarrow Table.
+
+        With ``columns`` only those are selected; the pages of the others
+        are never read.
+
+        Raises:
+            DatasetNotFoundError: unknown id
+            KeyError: a column is not in the dataset
+        """
+        import pyarrow as pa
+
+        with self._lock:
+            updated = self._db.execute(
+                "UPDATE datasets SET used = ? WHERE id = ?", (time.time(), dataset_id)
+            ).rowcount
+            if not updated:
+                raise DatasetNotFoundError(dataset_id)
+            source = pa.memory_map(self._path(dataset_id), "r")
+        table = pa.ipc.open_file(source).read_all()
+        return table.select(columns) if columns is not None else table
+
+    def chunks(
+        self,
+        dataset_id: str,
+        columns: Optional[List[str]] = None,
+        chunk_rows: int = CHUNK_ROWS,
+    ) -> Iterator[pd.DataFrame]:
+        """The dataset as DataFrame chunks, for run_query."""
+        table = self.open(dataset_id, columns)
+        for batch in table.to_batches(max_chunksize=chunk_rows):
+            yield batch.to_pandas()
+
+    def delete(self, dataset_id: str) -> None:
+        with self._lock:
+            if (
+                self._db.execute(
+                    "SELECT 1 FROM datasets WHERE id = ?", (dataset_id,)
+                ).fetchone()
+                is None
+            ):
+                raise DatasetNotFoundError(dataset_id)
+            self._remove(dataset_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM datasets"
+            ).fetchone()
+        return {
+            "count": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "evicted": self.evicted,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
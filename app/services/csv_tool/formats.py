@@ -0,0 +1,93 @@
+import json
+from typing import Literal, Tuple, get_args
+
+import pandas as pd
+from fastapi import Response
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+NDJSON = "application/x-ndjson"
+
+OutputFormat = Literal["records", "columns", "ndjson", "arrow", "parquet"]
+OUTPUT_FORMATS = get_args(OutputFormat)
+
+# Checked in order against the Accept header; records is the fallback
+ACCEPTED_TYPES: Tuple[Tuple[str, OutputFormat], ...] = (
+    (ARROW_STREAM, "arrow"),
+    (PARQUET, "parquet"),
+    (NDJSON, "ndjson"),
+)
+
+
+def negotiate(accept: str) -> OutputFormat:
+    """Picks the output format from an Accept header"""
+    for media_type, output_format in ACCEPTED_TYPES:
+        if media_type in accept:
+            return output_format
+    return "records"
+
+
+def to_columns_json(df: pd.DataFrame) -> bytes:
+    """
+    Serializes ``{"col": [values]}`` with one vectorized encode per column.
+
+    Column names are written once instead of once per row, and missing
+    values become null.
+    """
+    parts = [
+        f"{json.dumps(str(name))}:{df[name].to_json(orient='values')}"
+        for name in df.columns
+    ]
+    return ("{" + ",".join(parts) + "}").encode()
+
+
+def _arrow_table(df):
+    import pyarrow as pa
+
+    if isinstance(df, pa.Table):
+        return df
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def to_arrow(df) -> memoryview:
+    """Arrow IPC stream of a DataFrame or Table, keeping the column types"""
+    import pyarrow as pa
+
+    table = _arrow_table(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    # A view of the Arrow buffer, so the payload is not copied into bytes
+    return memoryview(sink.getvalue())
+
+
+def to_parquet(df) -> memoryview:
+    """Parquet file of a DataFrame or Table, keeping the column types"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = pa.BufferOutputStream()
+    pq.write_table(_arrow_table(df), sink)
+    return memoryview(sink.getvalue())
+
+
+def write_frame(df, output_format: OutputFormat) -> Response:
+    """
+    Serializes a DataFrame or pyarrow Table in any of the output formats.
+
+    Tables are written to Arrow and Parquet without a pandas round trip.
+    """
+    if output_format == "arrow":
+        return Response(to_arrow(df), media_type=ARROW_STREAM)
+    if output_format == "parquet":
+        return Response(to_parquet(df), media_type=PARQUET)
+    if not isinstance(df, pd.DataFrame):
+        df = df.to_pandas()
+    if output_format == "columns":
+        return Response(to_columns_json(df), media_type="application/json")
+    if output_format == "ndjson":
+        content = df.to_json(orient="records", lines=True) if len(df) else ""
+        return Response(content, media_type=NDJSON)
+    if output_format == "records":
+        return Response(df.to_json(orient="records"), media_type="application/json")
+    raise ValueError(f"Unsupported output format: {output_format}")
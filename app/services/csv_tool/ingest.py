@@ -0,0 +1,234 @@
+import io
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Explicit schema types, as the pandas dtypes they are parsed to. NumPy
+# dtypes parse several times faster than the nullable ones, which are only
+# used for partitions where a column has missing values
+SCHEMA_TYPES = {
+    "int64": "int64",
+    "float64": "float64",
+    "string": "object",
+    "bool": "bool",
+}
+NULLABLE_TYPES = {"int64": "Int64", "bool": "boolean"}
+ARROW_TYPES = {
+    "int64": "int64",
+    "float64": "float64",
+    "string": "string",
+    "bool": "bool_",
+}
+SAMPLE_ROWS = 10000
+INGEST_WORKERS = int(os.getenv("CSV_TOOL_INGEST_WORKERS", "0")) or None
+# Partitions smaller than this are not worth a process of their own
+MIN_PARTITION_BYTES = 8 * 1024 * 1024
+# mmap has no count(), so quotes are counted in slices of this size
+COUNT_BLOCK = 16 * 1024 * 1024
+
+
+def parse_schema(schema: Optional[str]) -> Dict[str, str]:
+    """
+    Parses an explicit ``{"column": type}`` schema sent as JSON.
+
+    Raises:
+        ValueError: the JSON is malformed or a type is not one of SCHEMA_TYPES
+    """
+    if not schema:
+        return {}
+    parsed = json.loads(schema)
+    if not isinstance(parsed, dict):
+        raise ValueError("The schema must be a JSON object of column types")
+    unknown = {name: kind for name, kind in parsed.items() if kind not in SCHEMA_TYPES}
+    if unknown:
+        raise ValueError(
+            f"Unknown column types {unknown}; use one of {sorted(SCHEMA_TYPES)}"
+        )
+    return parsed
+
+
+def pandas_dtypes(schema: Dict[str, str], nullable: bool = False) -> Dict[str, str]:
+    types = {**SCHEMA_TYPES, **NULLABLE_TYPES} if nullable else SCHEMA_TYPES
+    return {name: types[kind] for name, kind in schema.items()}
+
+
+def arrow_types(schema: Dict[str, str]) -> dict:
+    import pyarrow as pa
+
+    return {name: getattr(pa, ARROW_TYPES[kind])() for name, kind in schema.items()}
+
+
+def _count_quotes(data, start: int, end: int) -> int:
+    count = 0
+    while start < end:
+        stop = min(start + COUNT_BLOCK, end)
+        count += data[start:stop].count(b'"')
+        start = stop
+    return count
+
+
+def _record_end(data, start: int, quotes: int) -> Tuple[int, int]:
+    """
+    Offset just past the first newline at or after ``start`` that ends a record.
+
+    ``quotes`` is the number of quote characters before ``start``; a
+    newline with an odd count before it is inside a quoted field. Escaped
+    quotes ("") count twice and so do not change the parity. Returns the
+    offset and the quote count up to it.
+    """
+    size = len(data)
+    while start < size:
+        newline = data.find(b"\n", start)
+        if newline < 0:
+            return size, quotes + _count_quotes(data, start, size)
+        quotes += _count_quotes(data, start, newline)
+        start = newline + 1
+        if quotes % 2 == 0:
+            return start, quotes
+    return size, quotes
+
+
+def split_records(data, parts: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Splits CSV bytes into about ``parts`` byte ranges of whole records.
+
+    Returns the end of the header line and the (start, end) ranges of the
+    rows after it. ``data`` may be bytes or an mmap. Quote characters are
+    counted once, left to right, so finding the boundaries costs a small
+    fraction of parsing.
+    """
+    header_end, quotes = _record_end(data, 0, 0)
+    size = len(data)
+    step = max((size - header_end) // max(parts, 1), 1)
+    ranges = []
+    start = header_end
+    while start < size:
+        target = min(start + step, size)
+        quotes += _count_quotes(data, start, target)
+        end, quotes = _record_end(data, target, quotes) if target < size else (size, 0)
+        ranges.append((start, end))
+        start = end
+    return header_end, ranges
+
+
+def infer_dtypes(path: str, sample_rows: int = SAMPLE_ROWS) -> Dict[str, str]:
+    """Column dtypes pandas infers from the first ``sample_rows`` rows."""
+    sample = pd.read_csv(path, nrows=sample_rows, encoding="utf-8")
+    return {name: str(dtype) for name, dtype in sample.dtypes.items()}
+
+
+def _parse_range(
+    path: str,
+    start: int,
+    end: int,
+    names: List[str],
+    dtypes: Dict[str, str],
+    required: Dict[str, str],
+) -> pd.DataFrame:
+    with open(path, "rb") as fileobj:
+        fileobj.seek(start)
+        data = fileobj.read(end - start)
+    try:
+        return pd.read_csv(
+            io.BytesIO(data), header=None, names=names, dtype=dtypes, encoding="utf-8"
+        )
+    except (ValueError, TypeError):
+        # The sampled types do not fit this partition, or a schema column
+        # has missing values; keep only the schema types, nullable, and let
+        # pandas infer the rest, leaving their promotion to the merge
+        pass
+    try:
+        return pd.read_csv(
+            io.BytesIO(data), header=None, names=names, dtype=required, encoding="utf-8"
+        )
+    except (ValueError, TypeError) as e:
+        raise ValueError(
+            f"Rows at bytes {start}-{end} do not fit the schema: {e}"
+        ) from e
+
+
+def read_csv_parallel(
+    path: str,
+    workers: Optional[int] = None,
+    schema: Optional[Dict[str, str]] = None,
+    sample_rows: int = SAMPLE_ROWS,
+) -> pd.DataFrame:
+    """
+    Parses a CSV file on ``workers`` processes (CSV_TOOL_INGEST_WORKERS or
+    one per core by default).
+
+    The file is split at record boundaries (newlines outside quoted fields)
+    and each range is parsed by pandas in a worker. Column types come from
+    the explicit ``schema`` (column name to a SCHEMA_TYPES key) or are
+    inferred once from the first ``sample_rows`` rows, so no partition runs
+    its own inference pass. A partition whose values do not fit the sampled
+    types is parsed again with its own; pd.concat then promotes the merged
+    columns (integers and floats to float, anything mixed with text to
+    object).
+    Columns missing from ``schema`` are inferred from the sample.
+
+    Raises:
+        ValueError: the file cannot be parsed, or does not fit ``schema``
+    """
+    workers = workers or INGEST_WORKERS or os.cpu_count() or 1
+    schema = schema or {}
+    required = pandas_dtypes(schema, nullable=True)
+    dtypes = infer_dtypes(path, sample_rows)
+    missing = set(schema) - set(dtypes)
+    if missing:
+        raise ValueError(f"Schema columns not in the file: {sorted(missing)}")
+    dtypes.update(pandas_dtypes(schema))
+
+    with open(path, "rb") as fileobj:
+        with mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = len(data)
+            parts = min(workers * 4, max(size // MIN_PARTITION_BYTES, 1))
+            _, ranges = split_records(data, parts)
+
+    names = list(dtypes)
+    if len(ranges) <= 1 or workers == 1:
+        frames = [
+            _parse_range(path, start, end, names, dtypes, required)
+            for start, end in ranges
+        ]
+    else:
+        logger.info(f"Parsing {path} as {len(ranges)} partitions on {workers} workers")
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(ranges)),
+            mp_context=multiprocessing.get_context("forkserver"),
+        ) as pool:
+            futures = [
+                pool.submit(_parse_range, path, start, end, names, dtypes, required)
+                for start, end in ranges
+            ]
+            frames = [future.result() for future in futures]
+
+    if not frames:
+        return pd.DataFrame({name: pd.Series(dtype=dtypes[name]) for name in names})
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_upload_parallel(
+    fileobj: BinaryIO,
+    workers: Optional[int] = None,
+    schema: Optional[Dict[str, str]] = None,
+    tmp_dir: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    ``read_csv_parallel`` over a file object without a path, like a spooled
+    upload, which is first copied to a named temporary file.
+    """
+    with tempfile.NamedTemporaryFile(dir=tmp_dir, suffix=".csv") as copy:
+        shutil.copyfileobj(fileobj, copy, 1024 * 1024)
+        copy.flush()
+        return read_csv_parallel(copy.name, workers, schema)
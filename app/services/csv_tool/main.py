@@ -1,34 +1,280 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, Header, UploadFile, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager, contextmanager
+from pydantic import ValidationError
+from typing import Any, Dict, Iterator, Optional
 import uvicorn
 import os
+import threading
 import pandas as pd
 import io
 
-app = FastAPI()
+from .datasets import DatasetNotFoundError, DatasetPathError, DatasetRegistry
+from .ingest import pandas_dtypes, parse_schema, read_upload_parallel
+from .formats import NDJSON, OutputFormat, negotiate, write_frame
+from .query import Query, QueryError, run_query
+from .reader import CSVStream
+
+_datasets: Optional[DatasetRegistry] = None
+_datasets_lock = threading.Lock()
+
+
+def get_datasets() -> DatasetRegistry:
+    """Returns the dataset store, opening it on first use."""
+    global _datasets
+    with _datasets_lock:
+        if _datasets is None:
+            _datasets = DatasetRegistry.from_env()
+        return _datasets
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Handles startup and shutdown events."""
+    global _datasets
+    yield
+    with _datasets_lock:
+        if _datasets is not None:
+            _datasets.close()
+            _datasets = None
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(DatasetNotFoundError)
+async def dataset_not_found_handler(request: Request, exc: DatasetNotFoundError):
+    return JSONResponse(status_code=404, content={"detail": "Dataset not found"})
 
 
 default_file = File(...)
+accept_header = Header(default="application/json")
+query_form = Form(...)
+optional_file = File(None)
+path_form = Form(None)
+column_types_form = Form(None)
+parallel_form = Form(False)
+
+
+async def write_result(data, output_format: OutputFormat):
+    try:
+        return await run_in_threadpool(write_frame, data, output_format)
+    except ImportError as e:
+        raise HTTPException(
+            status_code=415, detail="Arrow and Parquet output require pyarrow"
+        ) from e
 
 
 @app.post("/upload-csv/")
-async def upload_csv(file: UploadFile = default_file):
+async def upload_csv(
+    file: UploadFile = default_file,
+    stream: bool = False,
+    format: Optional[OutputFormat] = None,
+    accept: str = accept_header,
+    parallel: bool = False,
+    column_types: Optional[str] = None,
+):
     """
     Endpoint for uploading a CSV file and returning its contents as JSON.
+
+    The output format is taken from ``format`` or else the Accept header:
+    JSON records (the default), column-oriented JSON, NDJSON, an Arrow IPC
+    stream or Parquet. The binary formats keep the parsed column types.
+
+    With ``stream=true`` (or NDJSON output) the rows are parsed in chunks
+    straight from the spooled upload, so memory use is bounded by the chunk
+    size rather than the file size. With ``parallel=true`` the file is
+    parsed on all cores instead (see ingest.read_csv_parallel).
+    ``column_types`` is a JSON schema of the columns that skips their type
+    inference, e.g.
+    ``{"id": "int64", "name": "string"}``.
     """
     if not file.filename or not file.filename.endswith(".csv"):
         raise HTTPException(
             status_code=400, detail="The file must be a CSV with a valid filename"
         )
 
+    output_format = format or negotiate(accept)
+    if stream or output_format == "ndjson":
+        return await stream_csv(file)
+
     try:
-        contents = await file.read()
-        df = pd.read_csv(io.StringIO(contents.decode("utf-8")))
+        columns = parse_schema(column_types)
+        if parallel:
+            df = await run_in_threadpool(
+                read_upload_parallel, file.file, schema=columns
+            )
+        else:
+            # Parsed from the spooled file, without reading it into one string
+            df = await run_in_threadpool(
+                pd.read_csv,
+                file.file,
+                encoding="utf-8",
+                dtype=pandas_dtypes(columns, nullable=True),
+            )
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Error reading CSV file: {str(e)}"
         ) from e
 
-    return df.to_dict(orient="records")
+    if output_format == "records":
+        return df.to_dict(orient="records")
+    return await write_result(df, output_format)
+
+
+async def stream_csv(file: UploadFile) -> StreamingResponse:
+    # FastAPI closes uploads once the handler returns, before the response
+    # body is streamed, so the stream takes over the spooled file
+    fileobj, file.file = file.file, io.BytesIO()
+    try:
+        rows = await run_in_threadpool(CSVStream, fileobj)
+    except Exception as e:
+        fileobj.close()
+        raise HTTPException(
+            status_code=400, detail=f"Error reading CSV file: {str(e)}"
+        ) from e
+    return StreamingResponse(rows.ndjson(), media_type=NDJSON)
+
+
+@app.post("/query")
+async def query_csv(
+    file: UploadFile = default_file,
+    query: str = query_form,
+    format: Optional[OutputFormat] = None,
+    accept: str = accept_header,
+):
+    """
+    Runs a query over an uploaded CSV and returns only the result rows.
+
+    ``query`` is a JSON object with ``select``, ``where``, ``group_by``,
+    ``aggregates``, ``order_by`` and ``limit`` (see query.Query). The file
+    is read in chunks and only the columns the query uses are parsed.
+    """
+    if not file.filename or not file.filename.endswith(".csv"):
+        raise HTTPException(
+            status_code=400, detail="The file must be a CSV with a valid filename"
+        )
+    try:
+        parsed = Query.model_validate_json(query)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query: {e}") from e
+
+    def run():
+        rows = CSVStream(file.file, usecols=parsed.columns())
+        return run_query(rows.chunks(), parsed)
+
+    try:
+        result = await run_in_threadpool(run)
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail=f"Error reading CSV file: {str(e)}"
+        ) from e
+    return await write_result(result, format or negotiate(accept))
+
+
+@contextmanager
+def dataset_errors() -> Iterator[None]:
+    """Turns errors of storing a dataset into their HTTP responses."""
+    try:
+        yield
+    except DatasetPathError as e:
+        raise HTTPException(status_code=403, detail=str(e)) from e
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail="Datasets require pyarrow") from e
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400, detail=f"Error reading CSV file: {str(e)}"
+        ) from e
+
+
+@app.post("/datasets", status_code=201)
+async def create_dataset(
+    file: Optional[UploadFile] = optional_file,
+    path: Optional[str] = path_form,
+    column_types: Optional[str] = column_types_form,
+    parallel: bool = parallel_form,
+):
+    """
+    Stores a CSV, uploaded or read from the server, as a queryable dataset.
+
+    ``column_types`` and ``parallel`` work as for ``/upload-csv/``.
+
+    Server-side ``path`` values are relative to CSV_TOOL_DATA_DIR.
+    """
+    if (file is None) == (path is None):
+        raise HTTPException(
+            status_code=400, detail="Send either a CSV file or a server-side path"
+        )
+    if file is not None and (not file.filename or not file.filename.endswith(".csv")):
+        raise HTTPException(
+            status_code=400, detail="The file must be a CSV with a valid filename"
+        )
+    with dataset_errors():
+        columns = parse_schema(column_types)
+        if file is not None:
+            return await run_in_threadpool(
+                get_datasets().add, file.file, file.filename, columns, parallel
+            )
+        assert path is not None
+        return await run_in_threadpool(get_datasets().add_path, path, columns, parallel)
+
+
+@app.get("/datasets")
+def list_datasets() -> Dict[str, Any]:
+    """Lists stored datasets with the store's size and eviction counters."""
+    datasets = get_datasets()
+    return {"datasets": datasets.list(), **datasets.stats()}
+
+
+@app.get("/datasets/{dataset_id}")
+def get_dataset(dataset_id: str):
+    return get_datasets().info(dataset_id)
+
+
+@app.delete("/datasets/{dataset_id}", status_code=204)
+def delete_dataset(dataset_id: str):
+    get_datasets().delete(dataset_id)
+
+
+@app.get("/datasets/{dataset_id}/rows")
+async def export_dataset(
+    dataset_id: str,
+    format: Optional[OutputFormat] = None,
+    accept: str = accept_header,
+):
+    """Returns every row of a dataset, read from its memory-mapped columns."""
+    table = await run_in_threadpool(get_datasets().open, dataset_id)
+    return await write_result(table, format or negotiate(accept))
+
+
+@app.post("/datasets/{dataset_id}/query")
+async def query_dataset(
+    dataset_id: str,
+    query: Query,
+    format: Optional[OutputFormat] = None,
+    accept: str = accept_header,
+):
+    """Runs a query (see ``/query``) over a stored dataset."""
+
+    def run():
+        return run_query(get_datasets().chunks(dataset_id, query.columns()), query)
+
+    try:
+        result = await run_in_threadpool(run)
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return await write_result(result, format or negotiate(accept))
+
+
+def csv_tool(file_path: str) -> Dict[str, Any]:
+    """Gateway entrypoint: stores a server-side CSV and returns its dataset info."""
+    with dataset_errors():
+        return get_datasets().add_path(file_path)
 
 
 @app.get("/")
@@ -0,0 +1,252 @@
+import operator
+from typing import Any, Dict, Iterable, List, Literal, Optional, Tuple
+
+import pandas as pd
+from pydantic import BaseModel, Field, model_validator
+
+# Stands in for the group key of queries that aggregate the whole file
+_ALL = "__all__"
+
+COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+# How the partial result of each chunk is merged with the running one
+MERGE = {"count": "sum", "sum": "sum", "min": "min", "max": "max"}
+
+
+class QueryError(ValueError):
+    """Raised for a query that does not fit the data it runs on."""
+
+
+class Filter(BaseModel):
+    column: str
+    op: Literal["==", "!=", "<", "<=", ">", ">=", "in", "not_in", "is_null", "not_null"]
+    value: Any = None
+
+    def mask(self, frame: pd.DataFrame) -> pd.Series:
+        column = frame[self.column]
+        if self.op in COMPARISONS:
+            return COMPARISONS[self.op](column, self.value)
+        if self.op == "in":
+            return column.isin(self.value)
+        if self.op == "not_in":
+            return ~column.isin(self.value)
+        if self.op == "is_null":
+            return column.isna()
+        return column.notna()
+
+
+class Aggregate(BaseModel):
+    func: Literal["count", "sum", "min", "max", "mean"]
+    # count without a column counts rows, with one its non-null values
+    column: Optional[str] = None
+    alias: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_column(self) -> "Aggregate":
+        if self.column is None and self.func != "count":
+            raise ValueError(f"{self.func} needs a column")
+        return self
+
+    @property
+    def name(self) -> str:
+        if self.alias:
+            return self.alias
+        return f"{self.func}_{self.column}" if self.column else self.func
+
+
+class Sort(BaseModel):
+    column: str
+    descending: bool = False
+
+
+class Query(BaseModel):
+    """
+    A query over the rows of a CSV file.
+
+    Rows are filtered by ``where`` (all filters must match), then either
+    projected to ``select`` or, with ``aggregates``, grouped by ``group_by``.
+    ``order_by`` and ``limit`` apply to the result; in aggregate queries
+    they refer to the group keys and aggregate names.
+    """
+
+    select: Optional[List[str]] = None
+    where: List[Filter] = []
+    group_by: List[str] = []
+    aggregates: List[Aggregate] = []
+    order_by: List[Sort] = []
+    limit: Optional[int] = Field(default=None, ge=0)
+
+    @model_validator(mode="after")
+    def check_shape(self) -> "Query":
+        if self.group_by and not self.aggregates:
+            raise ValueError("group_by needs at least one aggregate")
+        if self.select is not None and self.aggregates:
+            raise ValueError("select cannot be combined with aggregates")
+        return self
+
+    def columns(self) -> Optional[List[str]]:
+        """
+        Columns the query reads, or None when it needs all of them.
+
+        A bare row count reads no column, but the reader still needs one
+        to count rows by, so it gets None as well.
+        """
+        if self.select is None and not self.aggregates:
+            return None
+        names = list(self.select or []) + list(self.group_by)
+        names += [f.column for f in self.where]
+        names += [a.column for a in self.aggregates if a.column]
+        if not self.aggregates:
+            names += [s.column for s in self.order_by]
+        return list(dict.fromkeys(names)) or None
+
+    def filter(self, frame: pd.DataFrame) -> pd.DataFrame:
+        for condition in self.where:
+            frame = frame[condition.mask(frame)]
+        return frame
+
+
+def _partial_spec(query: Query, key: str) -> Dict[str, Tuple[str, str]]:
+    spec = {}
+    for i, agg in enumerate(query.aggregates):
+        column = agg.column or key
+        if agg.func == "count":
+            spec[f"p{i}"] = (column, "count" if agg.column else "size")
+        elif agg.func == "mean":
+            spec[f"p{i}"] = (column, "sum")
+            spec[f"p{i}_n"] = (column, "count")
+        else:
+            spec[f"p{i}"] = (column, agg.func)
+    return spec
+
+
+def _merge_spec(query: Query) -> Dict[str, str]:
+    spec = {}
+    for i, agg in enumerate(query.aggregates):
+        if agg.func == "mean":
+            spec[f"p{i}"] = "sum"
+            spec[f"p{i}_n"] = "sum"
+        else:
+            spec[f"p{i}"] = MERGE[agg.func]
+    return spec
+
+
+def _aggregate(chunks: Iterable[pd.DataFrame], query: Query) -> pd.DataFrame:
+    """
+    Aggregates chunk by chunk, keeping one row of partials per group.
+
+    Means are carried as sums and counts, so merging partials gives the
+    same result as aggregating the whole file at once.
+    """
+    keys = query.group_by or [_ALL]
+    partial_spec = _partial_spec(query, keys[0])
+    merge_spec = _merge_spec(query)
+    merged: Optional[pd.DataFrame] = None
+    for chunk in chunks:
+        chunk = query.filter(chunk)
+        if not query.group_by:
+            chunk = chunk.assign(**{_ALL: 0})
+        partial = chunk.groupby(keys, dropna=False, sort=False).agg(**partial_spec)
+        if merged is None:
+            merged = partial
+        else:
+            merged = (
+                pd.concat([merged, partial])
+                .groupby(level=keys, dropna=False, sort=False)
+                .agg(merge_spec)
+            )
+
+    names = [agg.name for agg in query.aggregates]
+    if not query.group_by and (merged is None or merged.empty):
+        # Like SQL, aggregating no rows gives one row, with zero counts
+        return pd.DataFrame(
+            {agg.name: [0 if agg.func == "count" else None] for agg in query.aggregates}
+        )
+    if merged is None:
+        return pd.DataFrame(columns=query.group_by + names)
+
+    result = pd.DataFrame(index=merged.index)
+    for i, agg in enumerate(query.aggregates):
+        if agg.func == "mean":
+            result[agg.name] = merged[f"p{i}"] / merged[f"p{i}_n"]
+        else:
+            result[agg.name] = merged[f"p{i}"]
+    result = result.reset_index()
+    return result.drop(columns=_ALL) if not query.group_by else result
+
+
+def _select(chunks: Iterable[pd.DataFrame], query: Query) -> pd.DataFrame:
+    """
+    Filters and projects chunk by chunk.
+
+    With a limit only ``limit`` rows are kept between chunks: the first
+    ones when unsorted, which also stops reading early, or the top ones of
+    the sort order so far.
+    """
+    kept: List[pd.DataFrame] = []
+    rows = 0
+    for chunk in chunks:
+        chunk = query.filter(chunk)
+        if query.select is not None:
+            chunk = chunk[query.select + _sort_only(query.select, query)]
+        kept.append(chunk)
+        rows += len(chunk)
+        if query.limit is None:
+            continue
+        if not query.order_by:
+            if rows >= query.limit:
+                break
+        elif rows > query.limit:
+            kept = [_sort(pd.concat(kept), query).head(query.limit)]
+            rows = len(kept[0])
+    if not kept:
+        return pd.DataFrame(columns=query.select or [])
+    return pd.concat(kept, ignore_index=True)
+
+
+def _sort_only(select: List[str], query: Query) -> List[str]:
+    # Sort columns left out of select are kept until the result is sorted
+    return [s.column for s in query.order_by if s.column not in select]
+
+
+def _sort(frame: pd.DataFrame, query: Query) -> pd.DataFrame:
+    if not query.order_by:
+        return frame
+    return frame.sort_values(
+        [s.column for s in query.order_by],
+        ascending=[not s.descending for s in query.order_by],
+        kind="stable",
+    )
+
+
+def run_query(chunks: Iterable[pd.DataFrame], query: Query) -> pd.DataFrame:
+    """
+    Runs ``query`` over a file read as DataFrame chunks.
+
+    Only the result rows are returned; the chunks are never concatenated.
+
+    Raises:
+        QueryError: a column is missing or a filter does not fit its type
+    """
+    try:
+        if query.aggregates:
+            result = _aggregate(chunks, query)
+        else:
+            result = _select(chunks, query)
+        result = _sort(result, query)
+    except KeyError as e:
+        raise QueryError(f"Unknown column: {e}") from e
+    except TypeError as e:
+        raise QueryError(f"Invalid query: {e}") from e
+    if query.select is not None:
+        result = result[query.select]
+    if query.limit is not None:
+        result = result.head(query.limit)
+    return result.reset_index(drop=True)
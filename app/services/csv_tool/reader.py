@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+from typing import BinaryIO, Iterator, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = int(os.getenv("CSV_TOOL_CHUNK_ROWS", "10000"))
+
+
+class CSVStream:
+    """
+    CSV rows read from a binary file object in chunks of ``chunk_rows``.
+
+    With ``usecols`` only those columns are parsed; the others are skipped
+    by the parser and never materialized.
+
+    The file is decoded as UTF-8 by the parser as it goes, so only the rows
+    of one chunk are in memory at a time. The first chunk is parsed when
+    the stream is opened, which surfaces a bad header or an empty file
+    before a response has been started.
+    """
+
+    def __init__(
+        self,
+        fileobj: BinaryIO,
+        chunk_rows: int = CHUNK_ROWS,
+        usecols: Optional[List[str]] = None,
+    ):
+        self.fileobj = fileobj
+        self._reader = pd.read_csv(
+            fileobj, chunksize=chunk_rows, encoding="utf-8", usecols=usecols
+        )
+        self._first = next(self._reader, None)
+
+    @property
+    def columns(self) -> list:
+        return [] if self._first is None else list(self._first.columns)
+
+    def chunks(self) -> Iterator[pd.DataFrame]:
+        if self._first is not None:
+            first, self._first = self._first, None
+            yield first
+        yield from self._reader
+
+    def ndjson(self) -> Iterator[bytes]:
+        """
+        Yields the rows as NDJSON, one encoded chunk at a time.
+
+        Missing values become null. A parse error past the first chunk ends
+        the stream with an ``{"error": ...}`` line, as the status code has
+        already been sent by then.
+        """
+        try:
+            for chunk in self.chunks():
+                yield chunk.to_json(orient="records", lines=True).encode()
+        except ValueError as e:  # includes parser and decoding errors
+            logger.warning(f"CSV stream stopped: {e}")
+            yield (
+                json.dumps({"error": f"Error reading CSV file: {e}"}) + "\n"
+            ).encode()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._reader.close()
+        self.fileobj.close()
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import WebSocket
+
+from .spatial import haversine_km
+
+if TYPE_CHECKING:
+    from .main import Earthquake
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    """
+    One websocket client with its filters and a bounded outbox.
+
+    ``min_magnitude`` and the circle of ``radius_km`` around ``latitude`` and
+    ``longitude`` are optional; events failing either are never queued.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        min_magnitude: Optional[float] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius_km: Optional[float] = None,
+        max_queue: int = 100,
+    ):
+        self.websocket = websocket
+        self.min_magnitude = min_magnitude
+        self.center: Optional[Tuple[float, float]] = None
+        if latitude is not None and longitude is not None and radius_km is not None:
+            self.center = (latitude, longitude)
+        self.radius_km = radius_km
+        self.closed = False
+        self.sent = 0
+        self._queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self._sender: Optional[asyncio.Task] = None
+
+    def wants(self, earthquake: "Earthquake") -> bool:
+        if self.min_magnitude is not None and earthquake.magnitude < self.min_magnitude:
+            return False
+        if self.center is not None and self.radius_km is not None:
+            distance = haversine_km(
+                *self.center, earthquake.latitude, earthquake.longitude
+            )
+            return bool(distance <= self.radius_km)
+        return True
+
+    def offer(self, message: str) -> bool:
+        """Queues a message; False if the outbox is full."""
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self) -> None:
+        """Stops sending, abandoning queued messages and any send in flight."""
+        self.closed = True
+        if self._sender is not None:
+            self._sender.cancel()
+
+    async def _send_all(self, timeout: float) -> None:
+        while True:
+            message = await self._queue.get()
+            await asyncio.wait_for(self.websocket.send_text(message), timeout)
+            self.sent += 1
+
+
+class EarthquakeBroadcaster:
+    """
+    Fans earthquakes out to websocket subscribers.
+
+    Each event is serialized once and offered to the subscribers whose
+    filters it passes. Offers never block: every connection drains its own
+    queue of at most ``max_queue`` messages in its ``serve`` task, so a slow
+    client only delays itself. A client whose queue fills up, or whose send
+    fails or takes longer than ``send_timeout``, is evicted.
+    """
+
+    def __init__(self, max_queue: int = 100, send_timeout: float = 10.0):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.subscribers: List[Subscriber] = []
+        self.published = 0
+        self.evicted = 0
+
+    def subscribe(self, websocket: WebSocket, **filters: Optional[float]) -> Subscriber:
+        subscriber = Subscriber(websocket, max_queue=self.max_queue, **filters)
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscriber.close()
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+
+    def evict(self, subscriber: Subscriber, reason: str) -> None:
+        if subscriber not in self.subscribers:
+            return
+        logger.warning(f"Dropping an earthquake alert subscriber: {reason}")
+        self.evicted += 1
+        self.unsubscribe(subscriber)
+
+    def publish(self, earthquakes: Iterable["Earthquake"]) -> None:
+        """Queues each earthquake for the subscribers that want it."""
+        for earthquake in earthquakes:
+            message = earthquake.model_dump_json()
+            self.published += 1
+            for subscriber in list(self.subscribers):
+                if subscriber.wants(earthquake) and not subscriber.offer(message):
+                    self.evict(subscriber, "its queue is full")
+
+    async def serve(self, subscriber: Subscriber) -> None:
+        """
+        Sends the subscriber's alerts while reading from the socket, until the
+        client disconnects or is evicted.
+        """
+        websocket = subscriber.websocket
+        sender = asyncio.create_task(subscriber._send_all(self.send_timeout))
+        receiver = asyncio.create_task(_receive_until_closed(websocket))
+        subscriber._sender = sender
+        if subscriber.closed:
+            sender.cancel()
+        try:
+            await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if sender.done() and not sender.cancelled() and sender.exception():
+                self.evict(subscriber, repr(sender.exception()))
+            if subscriber.closed and not receiver.done():
+                # Evicted or shutting down: tell the client to retry later
+                try:
+                    await asyncio.wait_for(websocket.close(code=1013), 1.0)
+                except Exception:
+                    pass
+        finally:
+            sender.cancel()
+            receiver.cancel()
+            self.unsubscribe(subscriber)
+
+    async def aclose(self) -> None:
+        for subscriber in list(self.subscribers):
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "evicted": self.evicted,
+            "sent": sum(s.sent for s in self.subscribers),
+        }
+
+
+async def _receive_until_closed(websocket: WebSocket) -> None:
+    try:
+        while True:
+            await websocket.receive_text()
+    except Exception:
+        # WebSocketDisconnect, or the socket closed by an eviction
+        return
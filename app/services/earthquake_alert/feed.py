@@ -0,0 +1,61 @@
+from typing import Dict, List, Optional, Tuple
+
+from ..http_client import OutboundClient, get_client
+
+FEED_URL = "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/all_{}.geojson"
+FEEDS = ("hour", "day", "week", "month")
+
+
+class FeedPoller:
+    """
+    Polls USGS summary feeds, returning only new or updated features.
+
+    Each request carries the ETag and Last-Modified of the previous response
+    for that feed, so an unchanged feed costs a 304 without a body to parse.
+    Features are filtered on a high-water mark of ``properties.updated``,
+    which is shared by every feed: after a backfill from a larger feed the
+    hourly feed only yields what changed since.
+    """
+
+    def __init__(self, feed: str = "hour", client: Optional[OutboundClient] = None):
+        if feed not in FEEDS:
+            raise ValueError(f"Unknown feed {feed!r}, expected one of {FEEDS}")
+        self.feed = feed
+        self.client = client
+        self.updated = 0
+        self.not_modified = 0
+        self._validators: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    async def poll(self, feed: Optional[str] = None) -> List[dict]:
+        """Fetches ``feed`` (default: the poller's) and returns what changed."""
+        feed = feed or self.feed
+        if feed not in FEEDS:
+            raise ValueError(f"Unknown feed {feed!r}, expected one of {FEEDS}")
+        url = FEED_URL.format(feed)
+        headers = {}
+        etag, last_modified = self._validators.get(url, (None, None))
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        response = await (self.client or get_client()).aget(url, headers=headers)
+        if response.status_code == 304:
+            self.not_modified += 1
+            return []
+        if response.status_code != 200:
+            print(f"Failed to fetch data: {response.status_code}")
+            return []
+        self._validators[url] = (
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+
+        mark = self.updated
+        changed = []
+        for feature in response.json().get("features", []):
+            updated = (feature.get("properties") or {}).get("updated") or 0
+            if updated > mark:
+                changed.append(feature)
+                self.updated = max(self.updated, updated)
+        return changed
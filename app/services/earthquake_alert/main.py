@@ -1,14 +1,17 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, HTTPException
+from fastapi import FastAPI, WebSocket, Query, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional, cast
 from datetime import datetime, timedelta
 import uuid
-import httpx
 import asyncio
 from math import radians, sin, cos, sqrt, asin
 import os
 import uvicorn
 
+from .broadcast import EarthquakeBroadcaster
+from .feed import FeedPoller
+from .store import EarthquakeStore
+
 app = FastAPI()
 
 
@@ -27,8 +30,18 @@ class Earthquake(BaseModel):
     location_description: str
 
 
-db: List[Earthquake] = []
-active_connections: List[WebSocket] = []
+db = EarthquakeStore(Earthquake)
+# Slow or dead sockets are evicted rather than holding up everyone's alerts
+broadcaster = EarthquakeBroadcaster(
+    max_queue=int(os.getenv("EARTHQUAKE_WS_QUEUE", "100")),
+    send_timeout=float(os.getenv("EARTHQUAKE_WS_SEND_TIMEOUT", "10")),
+)
+active_connections = broadcaster.subscribers
+# Polled every EARTHQUAKE_POLL_INTERVAL seconds; on startup the larger
+# EARTHQUAKE_BACKFILL feed (day, week or month), if set, fills the history
+poller = FeedPoller(os.getenv("EARTHQUAKE_FEED", "hour"))
+POLL_INTERVAL = float(os.getenv("EARTHQUAKE_POLL_INTERVAL", "60"))
+BACKFILL_FEED = os.getenv("EARTHQUAKE_BACKFILL")
 
 
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -45,38 +58,56 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return c * r
 
 
+# Define Query objects as module-level variables
+min_magnitude_query = Query(None, ge=0, le=10)
+max_magnitude_query = Query(None, ge=0, le=10)
+latitude_query = Query(None, ge=-90, le=90)
+longitude_query = Query(None, ge=-180, le=180)
+radius_km_query = Query(None, ge=0)
+days_query = Query(30, gt=0)
+
+
 @app.websocket("/ws/earthquake-alerts")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    min_magnitude: Optional[float] = min_magnitude_query,
+    latitude: Optional[float] = latitude_query,
+    longitude: Optional[float] = longitude_query,
+    radius_km: Optional[float] = radius_km_query,
+):
     """
     WebSocket endpoint for sending real-time earthquake alerts.
+
+    Only earthquakes of at least ``min_magnitude`` and, given a point and
+    ``radius_km``, within that distance of it are sent.
     """
     await websocket.accept()
-    active_connections.append(websocket)
-    try:
-        while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        active_connections.remove(websocket)
+    subscriber = broadcaster.subscribe(
+        websocket,
+        min_magnitude=min_magnitude,
+        latitude=latitude,
+        longitude=longitude,
+        radius_km=radius_km,
+    )
+    await broadcaster.serve(subscriber)
+
 
+@app.get("/ws/stats")
+async def websocket_stats() -> dict:
+    """Returns subscriber and delivery counters of the alert broadcaster."""
+    return broadcaster.stats()
 
-async def fetch_usgs_earthquakes() -> List[dict]:
+
+async def fetch_usgs_earthquakes(feed: Optional[str] = None) -> List[dict]:
     """
-    Fetches earthquake data from the USGS API for the last hour.
-    Returns a list of GeoJSON features.
+    Fetches the USGS feed (default: EARTHQUAKE_FEED) and returns the GeoJSON
+    features that are new or updated since the last poll.
     """
-    url = "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/all_hour.geojson"
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("features", [])
-            else:
-                print(f"Failed to fetch data: {response.status_code}")
-                return []
-        except Exception as e:
-            print(f"Error fetching data from USGS API: {e}")
-            return []
+    try:
+        return await poller.poll(feed)
+    except Exception as e:
+        print(f"Error fetching data from USGS API: {e}")
+        return []
 
 
 def convert_usgs_to_earthquake(feature: dict) -> Earthquake:
@@ -96,24 +127,37 @@ def convert_usgs_to_earthquake(feature: dict) -> Earthquake:
     )
 
 
+def store_features(features: List[dict]) -> List[Earthquake]:
+    """
+    Converts USGS features and upserts them into the database.
+    Returns the earthquakes that were not stored before.
+    """
+    added = []
+    for feature in features:
+        try:
+            earthquake = convert_usgs_to_earthquake(feature)
+        except KeyError as e:
+            print(f"Invalid data from USGS API: Missing key {e}")
+            continue
+        except ValueError as e:
+            print(f"Invalid data from USGS API: {e}")
+            continue
+        if db.upsert(earthquake):
+            added.append(earthquake)
+    return added
+
+
 async def update_earthquake_data():
     """
     Periodically fetches earthquake data from the USGS API and updates the database.
     Sends notifications to active WebSocket connections.
     """
+    if BACKFILL_FEED:
+        print(f"Backfilling earthquake data from the USGS {BACKFILL_FEED} feed...")
+        store_features(await fetch_usgs_earthquakes(BACKFILL_FEED))
     while True:
-        print("Fetching earthquake data from USGS...")
-        features = await fetch_usgs_earthquakes()
-        for feature in features:
-            try:
-                earthquake = convert_usgs_to_earthquake(feature)
-                if all(eq.id != earthquake.id for eq in db):  # Check for duplicates
-                    db.append(earthquake)
-                    for connection in active_connections:
-                        await connection.send_json(earthquake.dict())
-            except KeyError as e:
-                print(f"Invalid data from USGS API: Missing key {e}")
-        await asyncio.sleep(3600)
+        broadcaster.publish(store_features(await fetch_usgs_earthquakes()))
+        await asyncio.sleep(POLL_INTERVAL)
 
 
 @app.on_event("startup")
@@ -121,27 +165,22 @@ async def startup_event():
     asyncio.create_task(update_earthquake_data())
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await broadcaster.aclose()
+
+
 @app.post("/earthquakes", response_model=Earthquake)
 async def create_earthquake(earthquake: Earthquake):
     """
     Creates a new earthquake record and broadcasts it via WebSocket.
     """
     earthquake.id = str(uuid.uuid4())
-    db.append(earthquake)
-    for connection in active_connections:
-        await connection.send_json(earthquake.dict())
+    db.add(earthquake)
+    broadcaster.publish([earthquake])
     return earthquake
 
 
-# Define Query objects as module-level variables
-min_magnitude_query = Query(None, ge=0, le=10)
-max_magnitude_query = Query(None, ge=0, le=10)
-latitude_query = Query(None, ge=-90, le=90)
-longitude_query = Query(None, ge=-180, le=180)
-radius_km_query = Query(None, ge=0)
-days_query = Query(30, gt=0)
-
-
 @app.get("/earthquakes", response_model=List[Earthquake])
 async def get_earthquakes(
     min_magnitude: Optional[float] = min_magnitude_query,
@@ -155,23 +194,15 @@ async def get_earthquakes(
     """
     Returns a filtered list of earthquakes based on query parameters.
     """
-    filtered = db.copy()
-    if min_magnitude is not None:
-        filtered = [eq for eq in filtered if eq.magnitude >= min_magnitude]
-    if max_magnitude is not None:
-        filtered = [eq for eq in filtered if eq.magnitude <= max_magnitude]
-    if start_time is not None:
-        filtered = [eq for eq in filtered if eq.time >= start_time]
-    if end_time is not None:
-        filtered = [eq for eq in filtered if eq.time <= end_time]
-    if latitude is not None and longitude is not None and radius_km is not None:
-        filtered = [
-            eq
-            for eq in filtered
-            if calculate_distance(eq.latitude, eq.longitude, latitude, longitude)
-            <= radius_km
-        ]
-    return filtered
+    return db.query(
+        start_time,
+        end_time,
+        min_magnitude,
+        max_magnitude,
+        latitude,
+        longitude,
+        radius_km,
+    )
 
 
 @app.get("/earthquakes/recent", response_model=List[Earthquake])
@@ -181,7 +212,17 @@ async def get_recent_earthquakes(days: Optional[int] = days_query):
     """
     days = cast(int, days or 30)
     start_time = datetime.utcnow() - timedelta(days=days)
-    return [eq for eq in db if eq.time >= start_time]
+    return db.between(start_time)
+
+
+def earthquake_alert(location: str) -> List[Earthquake]:
+    """Gateway entrypoint: stored earthquakes whose place mentions ``location``."""
+    needle = location.lower()
+    return [
+        earthquake
+        for earthquake in db
+        if needle in earthquake.location_description.lower()
+    ]
 
 
 @app.get("/earthquakes/{earthquake_id}", response_model=Optional[Earthquake])
@@ -190,9 +231,9 @@ async def get_earthquake(earthquake_id: str):
     Returns data for a specific earthquake by ID.
     Raises a 404 error if the earthquake is not found.
     """
-    for eq in db:
-        if eq.id == earthquake_id:
-            return eq
+    earthquake = db.get(earthquake_id)
+    if earthquake is not None:
+        return earthquake
     raise HTTPException(status_code=404, detail="Earthquake not found")
 
 
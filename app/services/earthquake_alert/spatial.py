@@ -0,0 +1,107 @@
+import math
+from collections import defaultdict
+from typing import Dict, Generic, Iterator, List, Tuple, TypeVar, Union
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+T = TypeVar("T")
+
+
+def haversine_km(
+    latitude: float,
+    longitude: float,
+    latitudes: Union[float, np.ndarray],
+    longitudes: Union[float, np.ndarray],
+) -> Union[float, np.ndarray]:
+    """
+    Distances in km from one point to arrays of points, in one vectorized
+    pass; given single coordinates, the one distance.
+    """
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex(Generic[T]):
+    """
+    Items bucketed by cells of ``cell_degrees`` of latitude and longitude.
+
+    A radius query visits only the cells that can hold points within the
+    radius: a latitude band of the radius' angular size and, per band, the
+    longitudes it spans at the band's widest latitude (all of them near a
+    pole). The exact distance is then computed with ``haversine_km`` on the
+    items of those cells only.
+    """
+
+    def __init__(self, cell_degrees: float = 1.0):
+        self.cell_degrees = cell_degrees
+        self._columns = int(round(360 / cell_degrees))
+        self._rows = int(round(180 / cell_degrees))
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, T]]] = defaultdict(
+            list
+        )
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        row = min(int((latitude + 90) // self.cell_degrees), self._rows - 1)
+        column = int(((longitude + 180) % 360) // self.cell_degrees)
+        return row, min(column, self._columns - 1)
+
+    def add(self, latitude: float, longitude: float, item: T) -> None:
+        self._cells[self._cell(latitude, longitude)].append((latitude, longitude, item))
+
+    def discard(self, latitude: float, longitude: float, item: T) -> None:
+        """Removes an item added at this position, if present."""
+        bucket = self._cells.get(self._cell(latitude, longitude), [])
+        if (latitude, longitude, item) in bucket:
+            bucket.remove((latitude, longitude, item))
+
+    def clear(self) -> None:
+        self._cells.clear()
+
+    def cells(
+        self, latitude: float, longitude: float, radius_km: float
+    ) -> Iterator[Tuple[int, int]]:
+        """Cells that may hold points within ``radius_km`` of the point."""
+        degrees = radius_km / KM_PER_DEGREE
+        low, high = latitude - degrees, latitude + degrees
+        first_row = self._cell(max(low, -90.0), 0.0)[0]
+        last_row = self._cell(min(high, 90.0), 0.0)[0]
+        everywhere = low <= -90 or high >= 90 or degrees >= 90
+        if not everywhere:
+            # Meridians converge, so the widest latitude of the band bounds
+            # how many degrees of longitude the radius covers
+            widest = max(abs(low), abs(high))
+            span = degrees / math.cos(math.radians(widest))
+            everywhere = span >= 180
+        if everywhere:
+            columns = range(self._columns)
+        else:
+            center = self._cell(latitude, longitude)[1]
+            reach = int(span // self.cell_degrees) + 1
+            columns = range(center - reach, center + reach + 1)
+            if len(columns) >= self._columns:
+                columns = range(self._columns)
+        for row in range(first_row, last_row + 1):
+            for column in columns:
+                yield row, column % self._columns
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> List[T]:
+        """Items within ``radius_km`` of the point, in no particular order."""
+        candidates: List[Tuple[float, float, T]] = []
+        for cell in self.cells(latitude, longitude, radius_km):
+            bucket = self._cells.get(cell)
+            if bucket:
+                candidates.extend(bucket)
+        if not candidates:
+            return []
+        latitudes = np.fromiter((c[0] for c in candidates), float, len(candidates))
+        longitudes = np.fromiter((c[1] for c in candidates), float, len(candidates))
+        inside = haversine_km(latitude, longitude, latitudes, longitudes) <= radius_km
+        return [candidates[i][2] for i in np.flatnonzero(inside)]
@@ -0,0 +1,282 @@
+from datetime import datetime, timedelta, timezone
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+import numpy as np
+
+from .spatial import GridIndex, haversine_km
+
+if TYPE_CHECKING:
+    from .main import Earthquake
+
+TIME_DTYPE = "datetime64[us]"
+COLUMNS = ("magnitude", "latitude", "longitude", "depth")
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+# Time windows at most this fraction of the store are filtered by distance
+# directly; wider ones go through the grid index
+WINDOW_SCAN_FRACTION = 8
+
+
+def time_key(time: datetime) -> datetime:
+    """Naive UTC time, so feed times and client-sent aware times compare."""
+    if time.tzinfo is None:
+        return time
+    return time.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def time_window(
+    times: np.ndarray, start: Optional[datetime], end: Optional[datetime]
+) -> Tuple[int, int]:
+    """Slice of the sorted ``times`` with ``start <= time <= end``."""
+    low, high = 0, len(times)
+    if start is not None:
+        low = int(np.searchsorted(times, np.datetime64(time_key(start), "us")))
+    if end is not None:
+        last = np.datetime64(time_key(end), "us")
+        high = int(np.searchsorted(times, last, "right"))
+    return low, high
+
+
+class EarthquakeStore:
+    """
+    Earthquakes held as NumPy columns, indexed by id and sorted by time.
+
+    Rows are stored in arrival order as arrays of time, magnitude, latitude,
+    longitude and depth, with ids and descriptions in plain lists. A row
+    permutation sorted by time answers time windows by binary search, and
+    magnitude and distance filters are boolean masks over the rows of the
+    window; a GridIndex of 1 degree cells narrows wide radius queries. Only
+    the rows returned are built into ``model`` instances, so the objects
+    handed out are copies of what was stored.
+
+    New rows go to a pending tail that is merged into the arrays on the next
+    read, so a feed of events costs one merge rather than one per event. As
+    feeds arrive in time order, the merge is usually an append. Behaves like
+    the list it replaces (append, extend, clear, iteration, len, copy); an
+    id-keyed dict makes duplicate checks and lookups constant time. Events
+    without an id are stored but cannot be looked up.
+    """
+
+    def __init__(
+        self, model: Type["Earthquake"], earthquakes: Iterable["Earthquake"] = ()
+    ):
+        self.model = model
+        self._by_id: Dict[str, int]
+        self._ids: List[Optional[str]]
+        self._descriptions: List[str]
+        self._pending: Dict[str, list]
+        self._time: np.ndarray
+        self._columns: Dict[str, np.ndarray]
+        self._order: np.ndarray
+        self._sorted_times: np.ndarray
+        self._grid: GridIndex[int]
+        self.clear()
+        self.add_many(earthquakes)
+
+    def add(self, earthquake: "Earthquake") -> bool:
+        """Stores an earthquake unless its id is already stored."""
+        row = len(self._ids)
+        if earthquake.id is not None:
+            if earthquake.id in self._by_id:
+                return False
+            self._by_id[earthquake.id] = row
+        self._ids.append(earthquake.id)
+        self._descriptions.append(earthquake.location_description)
+        pending = self._pending
+        pending["time"].append((time_key(earthquake.time) - EPOCH) // MICROSECOND)
+        pending["magnitude"].append(earthquake.magnitude)
+        pending["latitude"].append(earthquake.latitude)
+        pending["longitude"].append(earthquake.longitude)
+        pending["depth"].append(earthquake.depth)
+        self._grid.add(earthquake.latitude, earthquake.longitude, row)
+        return True
+
+    def upsert(self, earthquake: "Earthquake") -> bool:
+        """
+        Stores an earthquake, replacing the stored one with the same id.
+        Returns whether it was new.
+        """
+        row = self._by_id.get(earthquake.id) if earthquake.id is not None else None
+        if row is None:
+            return self.add(earthquake)
+        self._merge()
+        columns = self._columns
+        self._grid.discard(
+            float(columns["latitude"][row]), float(columns["longitude"][row]), row
+        )
+        self._grid.add(earthquake.latitude, earthquake.longitude, row)
+        for name in COLUMNS:
+            columns[name][row] = getattr(earthquake, name)
+        self._descriptions[row] = earthquake.location_description
+
+        time = np.datetime64(time_key(earthquake.time), "us")
+        if time != self._time[row]:
+            # Rare: USGS revised the origin time, so the row moves in the order
+            self._time[row] = time
+            old = int(np.flatnonzero(self._order == row)[0])
+            order = np.delete(self._order, old)
+            times = np.delete(self._sorted_times, old)
+            new = int(np.searchsorted(times, time, "right"))
+            self._order = np.insert(order, new, row)
+            self._sorted_times = np.insert(times, new, time)
+        return False
+
+    def add_many(self, earthquakes: Iterable["Earthquake"]) -> List["Earthquake"]:
+        """Stores new earthquakes and returns them, skipping known ids."""
+        return [earthquake for earthquake in earthquakes if self.add(earthquake)]
+
+    def _merge(self) -> None:
+        """Moves the pending tail into the columns and the time order."""
+        if not self._pending["time"]:
+            return
+        first = len(self._time)
+        new_times = np.array(self._pending["time"], np.int64).view(TIME_DTYPE)
+        self._time = np.concatenate([self._time, new_times])
+        for name in COLUMNS:
+            column = np.array(self._pending[name], float)
+            self._columns[name] = np.concatenate([self._columns[name], column])
+        for values in self._pending.values():
+            values.clear()
+
+        order = np.argsort(new_times, kind="stable")
+        new_rows = order + first
+        new_times = new_times[order]
+        if not len(self._sorted_times) or new_times[0] >= self._sorted_times[-1]:
+            self._order = np.concatenate([self._order, new_rows])
+            self._sorted_times = np.concatenate([self._sorted_times, new_times])
+        else:
+            positions = np.searchsorted(self._sorted_times, new_times, side="right")
+            self._order = np.insert(self._order, positions, new_rows)
+            self._sorted_times = np.insert(self._sorted_times, positions, new_times)
+
+    def _build(self, rows: np.ndarray) -> List["Earthquake"]:
+        """Model instances for the given rows, in that order."""
+        times = self._time[rows].tolist()
+        columns = [self._columns[name][rows].tolist() for name in COLUMNS]
+        construct = self.model.model_construct
+        return [
+            construct(
+                id=self._ids[row],
+                magnitude=magnitude,
+                latitude=latitude,
+                longitude=longitude,
+                depth=depth,
+                time=time,
+                location_description=self._descriptions[row],
+            )
+            for row, time, magnitude, latitude, longitude, depth in zip(
+                rows.tolist(), times, *columns, strict=True
+            )
+        ]
+
+    def get(self, earthquake_id: str) -> Optional["Earthquake"]:
+        row = self._by_id.get(earthquake_id)
+        if row is None:
+            return None
+        self._merge()
+        return self._build(np.array([row]))[0]
+
+    def query(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        min_magnitude: Optional[float] = None,
+        max_magnitude: Optional[float] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius_km: Optional[float] = None,
+    ) -> List["Earthquake"]:
+        """
+        Earthquakes with ``start <= time <= end``, a magnitude within the
+        bounds and, given a point and ``radius_km``, within that distance of
+        it, oldest first. Every bound is optional.
+        """
+        self._merge()
+        times = self._sorted_times
+        low, high = time_window(times, start, end)
+        circle: Optional[Tuple[float, float, float]] = None
+        if latitude is not None and longitude is not None and radius_km is not None:
+            circle = (latitude, longitude, radius_km)
+        if circle is not None and (high - low) * WINDOW_SCAN_FRACTION > len(times):
+            found = self._grid.within(*circle)
+            rows = np.sort(np.array(found, np.intp))
+            rows = rows[np.argsort(self._time[rows], kind="stable")]
+            low, high = time_window(self._time[rows], start, end)
+            rows = rows[low:high]
+            # The grid has already filtered by distance
+            circle = None
+        else:
+            rows = self._order[low:high]
+
+        mask = np.ones(len(rows), bool)
+        if min_magnitude is not None:
+            mask &= self._columns["magnitude"][rows] >= min_magnitude
+        if max_magnitude is not None:
+            mask &= self._columns["magnitude"][rows] <= max_magnitude
+        if circle is not None:
+            latitude, longitude, radius_km = circle
+            distances = haversine_km(
+                latitude,
+                longitude,
+                self._columns["latitude"][rows],
+                self._columns["longitude"][rows],
+            )
+            mask &= distances <= radius_km
+        return self._build(rows[mask])
+
+    def between(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> List["Earthquake"]:
+        """Earthquakes with ``start <= time <= end``, oldest first."""
+        return self.query(start, end)
+
+    def within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List["Earthquake"]:
+        """Earthquakes within ``radius_km`` of a point, optionally in a window."""
+        return self.query(
+            start, end, latitude=latitude, longitude=longitude, radius_km=radius_km
+        )
+
+    def append(self, earthquake: "Earthquake") -> None:
+        self.add(earthquake)
+
+    def extend(self, earthquakes: Iterable["Earthquake"]) -> None:
+        self.add_many(earthquakes)
+
+    def clear(self) -> None:
+        self._by_id = {}
+        self._ids = []
+        self._descriptions = []
+        self._pending = {name: [] for name in ("time", *COLUMNS)}
+        self._time = np.empty(0, TIME_DTYPE)
+        self._columns = {name: np.empty(0) for name in COLUMNS}
+        self._order = np.empty(0, np.intp)
+        self._sorted_times = np.empty(0, TIME_DTYPE)
+        self._grid = GridIndex()
+
+    def copy(self) -> List["Earthquake"]:
+        return self.query()
+
+    def __contains__(self, earthquake_id: object) -> bool:
+        return earthquake_id in self._by_id
+
+    def __iter__(self) -> Iterator["Earthquake"]:
+        return iter(self.query())
+
+    def __len__(self) -> int:
+        return len(self._ids)
@@ -2,14 +2,15 @@ from fastapi import FastAPI, WebSocket
 from fastapi.responses import HTMLResponse, FileResponse
 import ctypes
 import numpy as np
+import os
 import soundfile as sf  # type: ignore
 import uvicorn
 from typing import List
 
 app = FastAPI()
 
-# Load C library
-lib = ctypes.CDLL("./audio_processor.so")
+# Load C library, found next to this module whatever the working directory
+lib = ctypes.CDLL(os.path.join(os.path.dirname(__file__), "audio_processor.so"))
 lib.calculate_spectrum.argtypes = [
     ctypes.POINTER(ctypes.c_double),
     ctypes.c_int,
@@ -99,6 +100,12 @@ async def get_spectrum_visualizer():
     )
 
 
+def fourier_transform(data: List[float]) -> List[float]:
+    """Gateway entrypoint: magnitude spectrum of ``data``, as calculate_spectrum."""
+    spectrum = np.abs(np.fft.rfft(np.asarray(data, dtype=np.float64)))
+    return [float(magnitude) for magnitude in spectrum]
+
+
 @app.get("/audio")
 async def get_audio():
     return FileResponse("Aiobahn +81 - 天天天国地獄国.mp3")
@@ -0,0 +1,363 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class OutboundConfig(NamedTuple):
+    connect_timeout: float = 3.05
+    read_timeout: float = 10.0
+    retries: int = 2
+    backoff: float = 0.2
+    backoff_max: float = 5.0
+    pool_size: int = 10
+    breaker_threshold: int = 5
+    breaker_reset: float = 30.0
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "OutboundConfig":
+        """Reads OUTBOUND_* environment variables, falling back to the defaults."""
+        defaults = cls()
+        return cls(
+            connect_timeout=float(
+                environ.get("OUTBOUND_CONNECT_TIMEOUT", defaults.connect_timeout)
+            ),
+            read_timeout=float(
+                environ.get("OUTBOUND_READ_TIMEOUT", defaults.read_timeout)
+            ),
+            retries=int(environ.get("OUTBOUND_RETRIES", defaults.retries)),
+            backoff=float(environ.get("OUTBOUND_BACKOFF", defaults.backoff)),
+            backoff_max=float(
+                environ.get("OUTBOUND_BACKOFF_MAX", defaults.backoff_max)
+            ),
+            pool_size=int(environ.get("OUTBOUND_POOL_SIZE", defaults.pool_size)),
+            breaker_threshold=int(
+                environ.get("OUTBOUND_BREAKER_THRESHOLD", defaults.breaker_threshold)
+            ),
+            breaker_reset=float(
+                environ.get("OUTBOUND_BREAKER_RESET", defaults.breaker_reset)
+            ),
+        )
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised without contacting the host while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a host after consecutive failures.
+
+    After ``reset_timeout`` seconds one probe request is let through; its
+    outcome closes the breaker again or keeps it open for another period.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            # Open, or half-open with the probe still in flight: allow a new
+            # probe once reset_timeout has passed since the last one started
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                if self._state != self.OPEN:
+                    logger.warning("Circuit breaker opened")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class HostMetrics:
+    """Latency, error and pool usage counters for one upstream host."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self._lock = threading.Lock()
+
+    def started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finished(self, elapsed: float, error: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.errors += int(error)
+            self.latency_total += elapsed
+            self.latency_max = max(self.latency_max, elapsed)
+
+    def retried(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def rejected_by_breaker(self) -> None:
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self, pool_size: int) -> Dict[str, Any]:
+        with self._lock:
+            avg = self.latency_total / self.requests if self.requests else 0.0
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "in_flight": self.in_flight,
+                "pool_saturation": round(self.in_flight / pool_size, 3),
+                "max_pool_saturation": round(self.max_in_flight / pool_size, 3),
+                "latency_ms": {
+                    "avg": round(avg * 1000, 3),
+                    "max": round(self.latency_max * 1000, 3),
+                },
+            }
+
+
+class OutboundClient:
+    """
+    Shared client for calls to external APIs.
+
+    Sync calls go through one ``requests.Session`` and async calls through one
+    ``httpx.AsyncClient``; both keep per-host keep-alive connection pools.
+    Idempotent requests are retried with jittered exponential backoff, and a
+    circuit breaker per host fails fast while the host keeps failing.
+    """
+
+    def __init__(
+        self,
+        config: Optional[OutboundConfig] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.config = config or OutboundConfig.from_env()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.config.pool_size,
+            pool_maxsize=self.config.pool_size,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._async_transport = async_transport
+        # httpx connections belong to the event loop that opened them, so each
+        # loop gets its own client, released together with the loop
+        self._async_clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._metrics: Dict[str, HostMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, url: str):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(
+                    self.config.breaker_threshold, self.config.breaker_reset
+                )
+                self._metrics[host] = HostMetrics()
+            return host, self._breakers[host], self._metrics[host]
+
+    def _attempts(self, method: str) -> int:
+        return self.config.retries + 1 if method.upper() in RETRY_METHODS else 1
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps clients that failed together from retrying together
+        cap = min(self.config.backoff_max, self.config.backoff * 2**attempt)
+        return random.uniform(0, cap)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """Sends a request, retrying idempotent methods on transient failures."""
+        host, breaker, metrics = self._host_state(url)
+        kwargs.setdefault(
+            "timeout", (self.config.connect_timeout, self.config.read_timeout)
+        )
+        attempts = self._attempts(method)
+        for attempt in range(attempts):
+            if not breaker.allow():
+                metrics.rejected_by_breaker()
+                raise CircuitOpenError(f"Circuit breaker is open for {host}")
+            metrics.started()
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                metrics.finished(time.perf_counter() - started, error=True)
+                breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+                metrics.retried()
+                time.sleep(self._backoff(attempt))
+                continue
+            except Exception:
+                metrics.finished(time.perf_counter() - started, error=True)
+                raise
+
+            failed = response.status_code >= 500
+            metrics.finished(time.perf_counter() - started, error=failed)
+            if failed:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if response.status_code in RETRY_STATUSES and attempt + 1 < attempts:
+                response.close()
+                metrics.retried()
+                time.sleep(self._backoff(attempt))
+                continue
+            return response
+        raise AssertionError("unreachable")
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    self.config.read_timeout, connect=self.config.connect_timeout
+                ),
+                limits=httpx.Limits(
+                    max_connections=self.config.pool_size * 4,
+                    max_keepalive_connections=self.config.pool_size,
+                ),
+                transport=self._async_transport,
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def arequest(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Async counterpart of ``request`` built on httpx."""
+        host, breaker, metrics = self._host_state(url)
+        client = self._get_async_client()
+        attempts = self._attempts(method)
+        for attempt in range(attempts):
+            if not breaker.allow():
+                metrics.rejected_by_breaker()
+                raise CircuitOpenError(f"Circuit breaker is open for {host}")
+            metrics.started()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                metrics.finished(time.perf_counter() - started, error=True)
+                breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+                metrics.retried()
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except Exception:
+                metrics.finished(time.perf_counter() - started, error=True)
+                raise
+
+            failed = response.status_code >= 500
+            metrics.finished(time.perf_counter() - started, error=failed)
+            if failed:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if response.status_code in RETRY_STATUSES and attempt + 1 < attempts:
+                await response.aclose()
+                metrics.retried()
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            return response
+        raise AssertionError("unreachable")
+
+    async def aget(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.arequest("GET", url, **kwargs)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-host counters plus the state of each host's circuit breaker."""
+        with self._lock:
+            hosts = list(self._metrics.items())
+        report = {}
+        for host, metrics in sorted(hosts):
+            snapshot = metrics.snapshot(self.config.pool_size)
+            snapshot["circuit"] = self._breakers[host].state
+            report[host] = snapshot
+        return report
+
+    async def aclose(self) -> None:
+        """Closes the async client of the running event loop."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[OutboundClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OutboundClient:
+    """Returns the process-wide outbound client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OutboundClient()
+        return _client
+
+
+def outbound_metrics() -> Dict[str, Dict[str, Any]]:
+    return get_client().metrics() if _client is not None else {}
@@ -27,8 +27,17 @@ async def translate_text(request: TranslationRequest):
     :param request: Request containing the text and target language.
     :return: Translated text.
     """
-    text = request.text
-    target_language = request.target_language.lower()
+    return language_translator(request.text, request.target_language)
+
+
+def language_translator(text: str, target_language: str):
+    """
+    Translates text with DeepL; also the gateway entrypoint.
+    :param text: Text to translate.
+    :param target_language: Language code to translate to.
+    :return: Translated text.
+    """
+    target_language = target_language.lower()
     try:
         translated_text = DeeplTranslator(
             api_key=os.getenv("DEEPL_API_KEY"),
@@ -53,6 +53,11 @@ async def run_speedtest():
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
+def net_benchmark():
+    """Gateway entrypoint: runs the speed test on the calling worker thread."""
+    return asyncio.run(run_speedtest())
+
+
 @app.get("/speedtest", summary="Run internet speed test")
 async def speedtest_endpoint():
     return await run_speedtest()
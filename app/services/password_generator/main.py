@@ -45,6 +45,11 @@ def generate_secure_password(length: int = 12):
             return {"password": password}
 
 
+def password_generator(length: int = 12):
+    """Gateway entrypoint: a secure password of ``length`` characters."""
+    return generate_secure_password(length)
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))
     uvicorn.run(app, host="0.0.0.0", port=port)
@@ -11,6 +11,7 @@ from qrcode.constants import (
 )
 from qrcode.exceptions import DataOverflowError
 from io import BytesIO
+import base64
 from PIL import ImageColor
 import logging
 
@@ -86,6 +87,15 @@ async def generate_qr(request: QRCodeRequest):
     - **fill_color**: Module color (name or HEX)
     - **back_color**: Background color (name or HEX)
     """
+    return Response(
+        content=render_qr(request),
+        media_type="image/png",
+        headers={"Content-Disposition": "attachment; filename=qrcode.png"},
+    )
+
+
+def render_qr(request: QRCodeRequest) -> bytes:
+    """PNG bytes of the requested QR code; HTTPException for bad parameters."""
     if request.version is not None and not 1 <= request.version <= 40:
         raise HTTPException(400, "Version must be between 1 and 40")
 
@@ -127,13 +137,12 @@ async def generate_qr(request: QRCodeRequest):
 
     buffer = BytesIO()
     img.save(buffer, format="PNG")
-    buffer.seek(0)
+    return buffer.getvalue()
 
-    return Response(
-        content=buffer.getvalue(),
-        media_type="image/png",
-        headers={"Content-Disposition": "attachment; filename=qrcode.png"},
-    )
+
+def qr_code_generator(data: str) -> str:
+    """Gateway entrypoint: a default QR code of ``data`` as base64 PNG."""
+    return base64.b64encode(render_qr(QRCodeRequest(data=data))).decode()
 
 
 if __name__ == "__main__":
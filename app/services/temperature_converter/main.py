@@ -73,6 +73,20 @@ def convert_temperature(value: float, from_scale: str, to_scale: str):
     }
 
 
+def temperature_converter(value: float, unit: str):
+    """Gateway entrypoint: ``value`` in ``unit`` expressed in every scale."""
+    from_scale = unit.lower()
+    if from_scale not in TEMPERATURE_SCALES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid unit: {unit}. Use one of {TEMPERATURE_SCALES}.",
+        )
+    return {
+        scale: convert_temperature_general(value, from_scale, scale)
+        for scale in sorted(TEMPERATURE_SCALES)
+    }
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))
     uvicorn.run(app, host="0.0.0.0", port=port)
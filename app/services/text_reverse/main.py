@@ -15,10 +15,14 @@ class TextRequest(BaseModel):
     text: str
 
 
+def text_reverse(text: str):
+    """Gateway entrypoint: the text reversed."""
+    return {"reversed_text": text[::-1]}
+
+
 @app.post("/text_reverse")
 async def reverse_text(request: TextRequest):
-    reversed_text = request.text[::-1]
-    return {"reversed_text": reversed_text}
+    return text_reverse(request.text)
 
 
 if __name__ == "__main__":
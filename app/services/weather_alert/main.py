@@ -6,6 +6,8 @@ import os
 import uvicorn
 import requests
 
+from ..http_client import get_client
+
 app = FastAPI()
 weather_data_db = {}
 
@@ -50,7 +52,12 @@ def fetch_weather_data(location: str):
         "timezone": "auto",
     }
 
-    response = requests.get(url, params=params)
+    try:
+        response = get_client().get(url, params=params)
+    except requests.RequestException as e:
+        raise HTTPException(
+            status_code=500, detail="Failed to fetch weather data from Open-Meteo API."
+        ) from e
     if response.status_code != 200:
         raise HTTPException(
             status_code=500, detail="Failed to fetch weather data from Open-Meteo API."
@@ -71,18 +78,20 @@ def fetch_weather_data(location: str):
     )
 
 
+def weather_alert(location: str):
+    """Fetch and store weather data for a location; also the gateway entrypoint."""
+    weather_data = fetch_weather_data(location)
+    weather_data_db[weather_data.location] = weather_data
+    return {
+        "message": "Weather data stored successfully",
+        "data": weather_data.dict(),
+    }
+
+
 @app.post("/weather/")
 async def post_weather_data(location: str):
     """Fetch and store weather data for a location using Open-Meteo API."""
-    try:
-        weather_data = fetch_weather_data(location)
-        weather_data_db[weather_data.location] = weather_data
-        return {
-            "message": "Weather data stored successfully",
-            "data": weather_data.dict(),
-        }
-    except HTTPException as e:
-        raise e
+    return weather_alert(location)
 
 
 @app.get("/alerts/", response_model=List[WeatherAlertResponse])
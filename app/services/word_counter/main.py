@@ -14,6 +14,16 @@ def read_root():
     return {"message": "Welcome to the word_counter API!"}
 
 
+def word_counter(text: str) -> Dict[str, int]:
+    """
+    Counts the words of a text; also the gateway entrypoint.
+
+    :param text: text to count
+    :return: dict with the word count
+    """
+    return {"word_count": len(text.split())}
+
+
 @app.post("/word_count/")
 async def word_count(text_data: TextData) -> Dict[str, int]:
     """
@@ -22,10 +32,7 @@ async def word_count(text_data: TextData) -> Dict[str, int]:
     :param text_data: JSON object with 'text' field
     :return: JSON object with word count
     """
-    words = text_data.text.split()
-    word_count = len(words)
-
-    return {"word_count": word_count}
+    return word_counter(text_data.text)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,10 @@
 import pytest
 from fastapi.testclient import TestClient
-from services.basic_list_operations.main import app, data_list
+from services.basic_list_operations.main import (
+    app,
+    basic_list_operations_service,
+    data_list,
+)
 
 client = TestClient(app)
 
@@ -92,3 +96,19 @@ def test_error_handling():
 
     response = client.get("/length")
     assert response.json()["length"] == 0
+
+
+def test_service_in_process(monkeypatch):
+    monkeypatch.setattr("services.basic_list_operations.main.IN_PROCESS", True)
+
+    assert "added successfully" in basic_list_operations_service("add", "b")["message"]
+    basic_list_operations_service("add", "a")
+    assert basic_list_operations_service("length") == {"length": 2}
+    assert basic_list_operations_service("sort") == {"sorted_list": ["a", "b"]}
+    assert basic_list_operations_service("search", "b") == {"index": 1}
+    assert basic_list_operations_service("remove", "c") == {
+        "detail": "Item 'c' not found."
+    }
+    assert basic_list_operations_service("add") == {
+        "error": "Invalid operation or missing item"
+    }
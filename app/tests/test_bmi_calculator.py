@@ -111,3 +111,95 @@ def test_api_bmi_success_with_different_values():
     response = client.get("/bmi?weight=95&height_cm=180")
     assert response.status_code == 200
     assert response.json() == {"bmi": 29.3, "category": "Overweight"}
+
+
+def test_calculate_many_matches_single_calculation():
+    weights = [70, 1.9, 635.0, 50, 95, 120, float("nan"), 45]
+    heights = [175, 175, 272, 160, 180, 49, 170, 180]
+    batch = BMICalculator.calculate_many(weights, heights)
+
+    for i, (weight, height) in enumerate(zip(weights, heights, strict=True)):
+        expected = BMICalculator.calculate(weight, height)
+        if expected is None:
+            assert batch.invalid[i]
+        else:
+            assert not batch.invalid[i]
+            assert batch.bmi[i] == expected
+            assert batch.categories()[i] == BMICalculator.category(expected)
+    assert batch.invalid.tolist() == [
+        False,
+        True,
+        False,
+        False,
+        False,
+        True,
+        True,
+        False,
+    ]
+
+
+def test_calculate_many_rejects_mismatched_lengths():
+    with pytest.raises(ValueError):
+        BMICalculator.calculate_many([70, 80], [175])
+
+
+def test_api_batch_json():
+    response = client.post(
+        "/bmi/batch", json={"weights": [70, 700, 45], "heights_cm": [175, 175, 180]}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "count": 3,
+        "invalid": [1],
+        "bmi": [22.9, None, 13.9],
+        "category": ["Normal weight", None, "Underweight"],
+    }
+
+
+def test_api_batch_csv():
+    response = client.post(
+        "/bmi/batch",
+        content="weight,height_cm\n70,175\n95,180\n",
+        headers={"Content-Type": "text/csv", "Accept": "text/csv"},
+    )
+    assert response.status_code == 200
+    assert response.text.splitlines() == [
+        "bmi,category",
+        "22.9,Normal weight",
+        "29.3,Overweight",
+    ]
+
+
+def test_api_batch_arrow():
+    pa = pytest.importorskip("pyarrow")
+    table = pa.table({"weight": [70.0, 50.0], "height_cm": [175.0, 160.0]})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    response = client.post(
+        "/bmi/batch",
+        content=sink.getvalue().to_pybytes(),
+        headers={"Content-Type": "application/vnd.apache.arrow.stream"},
+    )
+    assert response.status_code == 200
+    assert response.json()["bmi"] == [22.9, 19.5]
+
+
+def test_api_batch_invalid_bodies():
+    response = client.post(
+        "/bmi/batch", json={"weights": [70, 80], "heights_cm": [175]}
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        "/bmi/batch",
+        content="mass,height\n70,175\n",
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        "/bmi/batch", content=b"70 175", headers={"Content-Type": "text/plain"}
+    )
+    assert response.status_code == 415
@@ -0,0 +1,341 @@
+import hashlib
+import io
+import json
+import shutil
+import tarfile
+import time
+import zipfile
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi.testclient import TestClient
+from services.bpm_counter.audio import (
+    HOP_S,
+    AnalysisTimeoutError,
+    BPMResult,
+    FastOptions,
+    TempoTracker,
+    UnsupportedAudioError,
+    analyze_bytes,
+    analyze_stream,
+    beats_to_bpm,
+    open_pcm_stream,
+)
+from services.bpm_counter.cache import BPMCache
+from concurrent.futures.process import BrokenProcessPool
+from services.bpm_counter.jobs import (
+    AnalysisExecutor,
+    AnalysisQueueFullError,
+    FileTooLargeError,
+    hash_file,
+    spool,
+)
+from services.bpm_counter.main import app, calculate_bpm
+
+client = TestClient(app)
+
+
+def click_track(bpm=120.0, seconds=20.0, samplerate=44100, channels=1, fmt="WAV"):
+    """Encodes a metronome click at ``bpm`` into an in-memory audio file."""
+    signal = np.zeros(int(seconds * samplerate), dtype=np.float32)
+    click = np.sin(2 * np.pi * 1000 * np.arange(441) / samplerate) * np.hanning(441)
+    step = int(round(60.0 / bpm * samplerate))
+    for start in range(0, len(signal) - len(click), step):
+        signal[start : start + len(click)] += click.astype(np.float32)
+    if channels > 1:
+        signal = np.repeat(signal[:, None], channels, axis=1)
+    buffer = io.BytesIO()
+    sf.write(buffer, signal, samplerate, format=fmt)
+    buffer.seek(0)
+    return buffer
+
+
+def test_analyze_stream_detects_click_tempo():
+    assert analyze_stream(click_track(120)).bpm == pytest.approx(120, abs=2)
+
+
+def test_analyze_stream_handles_stereo_and_other_rates():
+    audio = click_track(100, samplerate=22050, channels=2, fmt="FLAC")
+    assert analyze_stream(audio).bpm == pytest.approx(100, abs=2)
+
+
+def test_pcm_stream_yields_reused_hop_sized_blocks():
+    samplerate, blocks = open_pcm_stream(click_track(seconds=1))
+    seen = [block for block in blocks]
+    assert samplerate == 44100
+    assert len(seen) == 44100 // HOP_S
+    assert all(block.shape == (HOP_S,) and block.dtype == np.float32 for block in seen)
+    # One buffer for the whole file, so memory is bounded by the hop size
+    assert all(block is seen[0] for block in seen)
+
+
+def test_beats_to_bpm():
+    assert beats_to_bpm([0, 22050, 44100, 66150], 44100) == 120.0
+    assert beats_to_bpm([22050], 44100) == 0.0
+
+
+def test_fast_mode_tracks_excerpts_until_the_tempo_converges():
+    fast = analyze_bytes(click_track(95, seconds=120).getvalue(), FastOptions())
+    assert fast.bpm == pytest.approx(95, abs=2)
+    assert 0 < fast.confidence <= 1
+
+
+def test_fast_mode_on_short_files_tracks_everything():
+    fast = analyze_stream(click_track(90, seconds=10), FastOptions(downsample=False))
+    assert fast.bpm == pytest.approx(90, abs=2)
+
+
+def test_tempo_tracker_convergence():
+    tracker = TempoTracker(tolerance=0.5, stable_beats=4)
+    # Running medians 60, 90, 120, 120, 120: the last four are not yet stable
+    for bpm in (60.0, 120.0, 120.0, 120.0, 120.0):
+        tracker.add(bpm)
+        assert not tracker.converged
+    tracker.add(120.0)
+    assert tracker.converged
+    assert tracker.result() == BPMResult(120.0, 0.833)
+    assert not TempoTracker().converged
+
+
+def test_upload_fast_mode():
+    response = client.post(
+        "/upload?mode=fast",
+        files={"file": ("click.wav", click_track(120), "audio/wav")},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["mode"] == "fast"
+    assert body["bpm"] == pytest.approx(120, abs=2)
+    assert body["confidence"] > 0
+
+
+def test_calculate_bpm_from_path(tmp_path):
+    path = tmp_path / "click.wav"
+    path.write_bytes(click_track(90).getvalue())
+    assert calculate_bpm(str(path)) == pytest.approx(90, abs=2)
+    assert calculate_bpm(str(tmp_path / "missing.wav")) == 0.0
+
+
+def test_upload_audio():
+    response = client.post(
+        "/upload", files={"file": ("click.wav", click_track(120), "audio/wav")}
+    )
+    assert response.status_code == 200
+    assert response.json()["bpm"] == pytest.approx(120, abs=2)
+
+
+def test_upload_silence_is_rejected():
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(44100 * 5, dtype=np.float32), 44100, format="WAV")
+    response = client.post(
+        "/upload", files={"file": ("silence.wav", buffer.getvalue(), "audio/wav")}
+    )
+    assert response.status_code == 400
+
+
+def test_unsupported_format_without_ffmpeg(monkeypatch):
+    monkeypatch.setattr("services.bpm_counter.audio.shutil.which", lambda name: None)
+    with pytest.raises(UnsupportedAudioError):
+        analyze_bytes(b"not audio at all")
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is not None, reason="ffmpeg installed")
+def test_upload_unsupported_format():
+    response = client.post(
+        "/upload", files={"file": ("notes.txt", b"not audio at all", "text/plain")}
+    )
+    assert response.status_code == 415
+
+
+def test_analysis_deadline():
+    with pytest.raises(AnalysisTimeoutError):
+        analyze_bytes(click_track().getvalue(), timeout=0)
+
+
+def test_job_api():
+    response = client.post(
+        "/jobs", files={"file": ("click.wav", click_track(120), "audio/wav")}
+    )
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.json()["status"] in ("queued", "running", "done")
+
+    for _ in range(300):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.1)
+    assert job["status"] == "done"
+    assert job["bpm"] == pytest.approx(120, abs=2)
+
+    assert client.get("/jobs/unknown").status_code == 404
+    assert client.get("/jobs/stats").json()["completed"] >= 1
+
+
+def test_executor_rejects_jobs_past_its_queue():
+    executor = AnalysisExecutor(workers=1, max_queue=1, timeout=5)
+    try:
+        data = click_track().getvalue()
+        futures = [executor.submit(analyze_bytes, data) for _ in range(2)]
+        with pytest.raises(AnalysisQueueFullError):
+            executor.submit(analyze_bytes, data)
+        assert [future.result().bpm for future in futures] == pytest.approx(
+            [120, 120], abs=2
+        )
+        assert executor.stats()["rejected"] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_executor_releases_its_slot_when_a_restart_fails(monkeypatch):
+    executor = AnalysisExecutor(workers=1, max_queue=0)
+
+    def broken_pool():
+        raise BrokenProcessPool("worker died")
+
+    monkeypatch.setattr(executor, "_get_pool", broken_pool)
+    for _ in range(2):
+        with pytest.raises(BrokenProcessPool):
+            executor.submit(analyze_bytes, b"")
+    assert executor.stats()["pending"] == 0
+
+
+def test_spool_hashes_and_removes_oversized_files(tmp_path, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    digest = hashlib.sha256()
+    path, size = spool(io.BytesIO(b"x" * 10), digest)
+    with open(path, "rb") as fileobj:
+        assert fileobj.read() == b"x" * 10
+    assert size == 10 and digest.hexdigest() == hashlib.sha256(b"x" * 10).hexdigest()
+
+    with pytest.raises(FileTooLargeError):
+        spool(io.BytesIO(b"x" * 10), hashlib.sha256(), max_bytes=5)
+    assert [entry.name for entry in tmp_path.iterdir()] == [path.rsplit("/", 1)[1]]
+
+
+def test_hash_file_rewinds():
+    fileobj = io.BytesIO(b"x" * 10)
+    key, size = hash_file(fileobj, hashlib.sha256())
+    assert (key, size) == (hashlib.sha256(b"x" * 10).hexdigest(), 10)
+    assert fileobj.tell() == 0
+
+
+def test_cache_hits_are_not_copied_to_disk(monkeypatch):
+    audio = click_track(140).getvalue()
+    assert client.post("/upload", files={"file": ("a.wav", audio)}).status_code == 200
+    copies = []
+    monkeypatch.setattr("services.bpm_counter.main.spool", copies.append)
+    response = client.post("/upload", files={"file": ("b.wav", audio)})
+    assert response.headers["X-Cache"] == "hit"
+    assert copies == []
+
+
+def test_upload_result_is_cached_by_content():
+    audio = click_track(130).getvalue()
+    first = client.post("/upload", files={"file": ("a.wav", audio, "audio/wav")})
+    second = client.post("/upload", files={"file": ("b.wav", audio, "audio/wav")})
+
+    assert first.headers["X-Cache"] == "miss"
+    assert second.headers["X-Cache"] == "hit"
+    assert first.json() == second.json()
+    stats = client.get("/cache/stats").json()
+    assert stats["bytes_saved"] >= len(audio)
+
+
+def test_bpm_cache_memory_tier_is_lru():
+    cache = BPMCache(max_entries=2)
+    cache.put("a", BPMResult(120.0, 1.0), 100)
+    cache.put("b", BPMResult(90.0, 1.0), 100)
+    assert cache.get("a") == BPMResult(120.0, 1.0)
+    cache.put("c", BPMResult(60.0, 1.0), 100)
+
+    assert cache.get("b") is None
+    assert cache.get("c") == BPMResult(60.0, 1.0)
+    stats = cache.stats()
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["bytes_saved"] == 200
+
+
+def test_bpm_cache_disk_tier_survives_restarts_and_is_bounded(tmp_path):
+    path = str(tmp_path / "bpm.db")
+    cache = BPMCache(max_entries=1, disk_path=path)
+    cache.put("a", BPMResult(120.0, 1.0), 1000)
+    cache.put("b", BPMResult(90.0, 1.0), 1000)
+    cache.close()
+
+    reopened = BPMCache(max_entries=1, disk_path=path)
+    assert reopened.get("a") == BPMResult(120.0, 1.0)
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.get("a") == BPMResult(120.0, 1.0)
+    assert reopened.stats()["memory_hits"] == 1
+    reopened.close()
+
+    bounded = BPMCache(max_entries=1, disk_path=path, disk_max_bytes=0)
+    for i in range(50):
+        bounded.put(f"key{i}", BPMResult(float(i), 1.0), 10)
+    (rows,) = bounded._disk.execute("SELECT COUNT(*) FROM bpm_cache").fetchone()
+    assert rows < 50
+    assert bounded.get("key49") == BPMResult(49.0, 1.0)
+    bounded.close()
+
+
+def ndjson(response):
+    return {line["file"]: line for line in map(json.loads, response.text.splitlines())}
+
+
+def test_batch_multipart_files():
+    response = client.post(
+        "/batch",
+        files=[
+            ("files", ("fast.wav", click_track(125).getvalue(), "audio/wav")),
+            (
+                "files",
+                ("slow.flac", click_track(80, fmt="FLAC").getvalue(), "audio/flac"),
+            ),
+        ],
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = ndjson(response)
+    assert results["fast.wav"]["bpm"] == pytest.approx(125, abs=2)
+    assert results["slow.flac"]["bpm"] == pytest.approx(80, abs=2)
+
+
+def test_batch_archives_are_spooled_member_by_member():
+    zipped = io.BytesIO()
+    with zipfile.ZipFile(zipped, "w") as archive:
+        archive.writestr("set/a.wav", click_track(105).getvalue())
+        archive.writestr("set/notes.txt", "not audio")
+        archive.writestr("__MACOSX/set/._a.wav", "resource fork")
+    tarred = io.BytesIO()
+    with tarfile.open(fileobj=tarred, mode="w:gz") as archive:
+        data = click_track(95).getvalue()
+        info = tarfile.TarInfo("b.wav")
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+
+    response = client.post(
+        "/batch",
+        files=[
+            ("files", ("set.zip", zipped.getvalue(), "application/zip")),
+            ("files", ("more.tar.gz", tarred.getvalue(), "application/gzip")),
+        ],
+    )
+    results = ndjson(response)
+    assert set(results) == {"set/a.wav", "set/notes.txt", "b.wav"}
+    assert results["set/a.wav"]["bpm"] == pytest.approx(105, abs=2)
+    assert results["b.wav"]["bpm"] == pytest.approx(95, abs=2)
+    assert "error" in results["set/notes.txt"]
+
+
+def test_batch_rejects_oversized_members(monkeypatch):
+    monkeypatch.setattr("services.bpm_counter.main.MAX_MEMBER_BYTES", 1000)
+    zipped = io.BytesIO()
+    with zipfile.ZipFile(zipped, "w") as archive:
+        archive.writestr("big.wav", click_track().getvalue())
+
+    response = client.post(
+        "/batch", files=[("files", ("set.zip", zipped.getvalue(), "application/zip"))]
+    )
+    assert ndjson(response)["big.wav"]["error"] == "File is larger than 1000 bytes"
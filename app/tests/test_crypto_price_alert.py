@@ -1,10 +1,29 @@
+import threading
+import time
 import pytest
 from fastapi.testclient import TestClient
-from services.crypto_price_alert.main import app
+from services.crypto_price_alert import utils
+from services.crypto_price_alert.alerts import AlertBook
+from services.crypto_price_alert.broadcast import HEARTBEAT, PriceHub
+from services.crypto_price_alert.cache import PriceCache
+from services.crypto_price_alert.store import SQLiteAlertStore
+from services.crypto_price_alert import main as crypto_main
+from services.crypto_price_alert.main import app, check_price_alerts, price_alerts
 
 client = TestClient(app)
 
 
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
 @pytest.mark.asyncio
 async def test_get_price():
     response = client.get("/price/bitcoin")
@@ -59,3 +78,301 @@ async def test_set_price_alert_invalid():
     assert response.status_code == 400
     data = response.json()
     assert data["detail"] == "At least one of 'above' or 'below' must be provided."
+
+
+def test_get_crypto_prices_batches_ids(monkeypatch):
+    calls = []
+
+    def fake_get(self, url, params=None, **kwargs):
+        ids = params["ids"].split(",")
+        calls.append(ids)
+        return FakeResponse({coin: {"usd": float(len(coin))} for coin in ids})
+
+    monkeypatch.setattr("services.http_client.OutboundClient.get", fake_get)
+
+    prices = utils.get_crypto_prices(
+        ["bitcoin", "ethereum", "solana", "bitcoin"], chunk_size=2
+    )
+
+    assert calls == [["bitcoin", "ethereum"], ["solana"]]
+    assert prices == {"bitcoin": 7.0, "ethereum": 8.0, "solana": 6.0}
+
+
+def test_check_price_alerts_fetches_once(monkeypatch, capsys):
+    calls = []
+
+    def fake_prices(cryptos, currency="usd"):
+        calls.append(sorted(cryptos))
+        return {"bitcoin": 50000.0, "ethereum": 1000.0}
+
+    monkeypatch.setattr(
+        "services.crypto_price_alert.main.get_crypto_prices", fake_prices
+    )
+    monkeypatch.setattr(
+        "services.crypto_price_alert.main.price_cache", PriceCache(fake_prices)
+    )
+    monkeypatch.setattr(price_alerts, "coins", {})
+    price_alerts.set_alert("bitcoin", "alice", 40000, None)
+    price_alerts.set_alert("ethereum", "bob", 5000, None)
+
+    check_price_alerts()
+
+    assert calls == [["bitcoin", "ethereum"]]
+    output = capsys.readouterr().out
+    assert "Alert for alice: bitcoin has reached 50,000.00 USD!" in output
+    assert "bob" not in output
+
+
+def test_price_cache_serves_fresh_entries_without_fetching():
+    calls = []
+
+    def fetch(cryptos, currency):
+        calls.append(list(cryptos))
+        return {coin: 1.0 for coin in cryptos if coin != "unknown"}
+
+    cache = PriceCache(fetch, ttl=60)
+
+    assert cache.get_many(["bitcoin", "ethereum"]) == {"bitcoin": 1.0, "ethereum": 1.0}
+    assert cache.get("bitcoin") == 1.0
+    assert cache.get("unknown") is None
+    assert cache.get("bitcoin", "eur") == 1.0
+
+    assert calls == [["bitcoin", "ethereum"], ["unknown"], ["bitcoin"]]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+
+
+def test_price_cache_coalesces_concurrent_misses():
+    calls = []
+    release = threading.Event()
+
+    def fetch(cryptos, currency):
+        calls.append(list(cryptos))
+        release.wait(5)
+        return {coin: 2.0 for coin in cryptos}
+
+    cache = PriceCache(fetch, ttl=60)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get("bitcoin")))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["misses"] + cache.stats()["coalesced"] < 5:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [["bitcoin"]]
+    assert results == [2.0] * 5
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_price_cache_serves_stale_entry_while_refreshing():
+    prices = iter([1.0, 2.0])
+    refreshed = threading.Event()
+
+    def fetch(cryptos, currency):
+        price = next(prices)
+        if price == 2.0:
+            refreshed.set()
+        return {"bitcoin": price}
+
+    cache = PriceCache(fetch, ttl=0, stale_ttl=60)
+
+    assert cache.get("bitcoin") == 1.0
+    assert cache.get("bitcoin", allow_stale=True) == 1.0
+    assert refreshed.wait(5)
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_cache_stats_endpoint():
+    response = client.get("/cache/stats")
+    assert response.status_code == 200
+    assert {"hits", "misses", "coalesced", "stale_hits"} <= response.json().keys()
+
+
+@pytest.mark.asyncio
+async def test_price_hub_fetches_once_per_tick_for_all_subscribers():
+    calls = []
+
+    def fetch(cryptos):
+        calls.append(cryptos)
+        return {"bitcoin": 50000.0, "ethereum": 2000.0}
+
+    hub = PriceHub(fetch, lambda: ["bitcoin", "ethereum"], interval=3600)
+    everything = hub.subscribe()
+    only_bitcoin = hub.subscribe(["bitcoin"])
+    await hub.publish()
+
+    assert calls == [["bitcoin", "ethereum"]]
+    assert await everything.get() == [
+        "🔔 bitcoin: 50,000.00 USD",
+        "🔔 ethereum: 2,000.00 USD",
+        HEARTBEAT,
+    ]
+    assert await only_bitcoin.get() == ["🔔 bitcoin: 50,000.00 USD", HEARTBEAT]
+
+    late = hub.subscribe(["ethereum"])
+    assert await late.get() == ["🔔 ethereum: 2,000.00 USD"]
+    await hub.aclose()
+
+
+@pytest.mark.asyncio
+async def test_price_hub_coalesces_and_drops_slow_subscribers():
+    prices = iter(range(1, 100))
+    hub = PriceHub(
+        lambda cryptos: {"bitcoin": float(next(prices))},
+        lambda: ["bitcoin"],
+        interval=3600,
+        max_lag=3,
+    )
+    slow = hub.subscribe()
+    await hub.publish()
+    await hub.publish()
+
+    assert await slow.get() == ["🔔 bitcoin: 2.00 USD", HEARTBEAT]
+    assert slow.coalesced == 2
+
+    for _ in range(5):
+        await hub.publish()
+    assert slow.closed
+    assert await slow.get() == []
+    assert hub.stats()["dropped"] == 1
+    assert hub.stats()["subscribers"] == 0
+
+
+def test_alert_book_fires_on_first_price():
+    book = AlertBook()
+    book.set_alert("bitcoin", "alice", 100, None)
+    book.set_alert("bitcoin", "bob", 200, None)
+    book.set_alert("bitcoin", "carol", None, 150)
+
+    assert sorted(book.evaluate("bitcoin", 160)) == [("alice", "above")]
+    assert book.evaluate("ethereum", 160) == []
+
+
+def test_alert_book_only_fires_crossed_thresholds():
+    book = AlertBook()
+    book.set_alert("bitcoin", "alice", 110, None)
+    book.set_alert("bitcoin", "bob", 130, None)
+    book.set_alert("bitcoin", "carol", None, 90)
+    book.evaluate("bitcoin", 100)
+
+    assert book.evaluate("bitcoin", 105) == []
+    assert book.evaluate("bitcoin", 110) == [("alice", "above")]
+    assert book.evaluate("bitcoin", 120) == []
+    assert book.evaluate("bitcoin", 85) == [("carol", "below")]
+    assert sorted(book.evaluate("bitcoin", 140)) == [
+        ("alice", "above"),
+        ("bob", "above"),
+    ]
+
+
+def test_alert_book_new_alert_checked_against_current_price():
+    book = AlertBook()
+    book.set_alert("bitcoin", "alice", 200, None)
+    book.evaluate("bitcoin", 100)
+
+    book.set_alert("bitcoin", "bob", 50, None)
+    assert book.evaluate("bitcoin", 100) == [("bob", "above")]
+    assert book.evaluate("bitcoin", 100) == []
+
+
+def test_alert_book_replaces_and_removes_alerts():
+    book = AlertBook()
+    book.set_alert("bitcoin", "alice", 100, None)
+    book.set_alert("bitcoin", "alice", 300, 50)
+    assert book.get("bitcoin", "alice") == (300, 50)
+    assert len(book) == 1
+    assert book.evaluate("bitcoin", 150) == []
+
+    book.remove_alert("bitcoin", "alice")
+    assert "bitcoin" not in book
+    assert len(book) == 0
+
+
+def test_alert_book_bulk_load_matches_single_inserts():
+    rows = [("bitcoin", f"user{i}", 100 + i, 100 - i) for i in range(1, 50)]
+    loaded, inserted = AlertBook(), AlertBook()
+    assert loaded.load(rows) == len(rows)
+    for row in rows:
+        inserted.set_alert(*row)
+
+    for price in (100, 120, 60, 170):
+        assert sorted(loaded.evaluate("bitcoin", price)) == sorted(
+            inserted.evaluate("bitcoin", price)
+        )
+
+
+def test_sqlite_store_persists_alerts_across_restarts(tmp_path):
+    path = str(tmp_path / "alerts.db")
+    store = SQLiteAlertStore(path)
+    futures = [store.save("bitcoin", f"user{i}", 1000.0 + i, None) for i in range(50)]
+    store.save("ethereum", "bob", None, 1500.0).result()
+    for future in futures:
+        future.result()
+    store.delete("bitcoin", "user0").result()
+    store.close()
+
+    reopened = SQLiteAlertStore(path)
+    book = AlertBook()
+    assert book.load(reopened.iter_alerts()) == 50
+    assert book.get("bitcoin", "user0") is None
+    assert book.get("bitcoin", "user1") == (1001.0, None)
+    assert book.get("ethereum", "bob") == (None, 1500.0)
+    reopened.close()
+
+
+def test_sqlite_store_reports_changes_to_other_workers(tmp_path):
+    path = str(tmp_path / "alerts.db")
+    writer = SQLiteAlertStore(path)
+    reader = SQLiteAlertStore(path)
+    version = reader.version()
+
+    writer.save("bitcoin", "alice", 60000.0, None).result()
+    writer.delete("bitcoin", "alice").result()
+    writer.save("solana", "carol", 200.0, 100.0).result()
+
+    version, changes = reader.changes_since(version)
+    assert changes == [
+        ("bitcoin", "alice", None, None, True),
+        ("solana", "carol", 200.0, 100.0, False),
+    ]
+    assert reader.changes_since(version) == (version, [])
+    writer.close()
+    reader.close()
+
+
+def test_sqlite_store_lease_elects_one_evaluator(tmp_path):
+    path = str(tmp_path / "alerts.db")
+    first = SQLiteAlertStore(path)
+    second = SQLiteAlertStore(path)
+
+    assert first.acquire_lease("worker-1", ttl=60)
+    assert not second.acquire_lease("worker-2", ttl=60)
+    assert first.acquire_lease("worker-1", ttl=60)
+    first.release_lease("worker-1")
+    assert second.acquire_lease("worker-2", ttl=0)
+    assert first.acquire_lease("worker-1", ttl=60)
+    first.close()
+    second.close()
+
+
+def test_set_price_alert_is_persisted_and_reloaded(tmp_path, monkeypatch):
+    store = SQLiteAlertStore(str(tmp_path / "alerts.db"))
+    monkeypatch.setattr(crypto_main, "alert_store", store)
+    monkeypatch.setattr(price_alerts, "coins", {})
+
+    response = client.post(
+        "/set_alert/", json={"crypto": "bitcoin", "above": 70000, "user": "dave"}
+    )
+    assert response.status_code == 200
+
+    monkeypatch.setattr(price_alerts, "coins", {})
+    assert crypto_main.load_alerts() == 1
+    assert price_alerts.get("bitcoin", "dave") == (70000.0, None)
+    store.close()
@@ -1,6 +1,14 @@
 from fastapi.testclient import TestClient
+from services.csv_tool import main
+from services.csv_tool.datasets import DatasetNotFoundError, DatasetRegistry
+from services.csv_tool.ingest import read_csv_parallel, split_records
 from services.csv_tool.main import app
+from services.csv_tool.query import Query, run_query
+from services.csv_tool.reader import CSVStream
 import io
+import json
+import pandas as pd
+import pytest
 
 client = TestClient(app)
 
@@ -52,3 +60,387 @@ def test_upload_csv_empty_file():
     response = client.post("/upload-csv/", files=files)
     assert response.status_code == 400
     assert "Error reading CSV file" in response.json()["detail"]
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_upload_csv_stream():
+    """
+    Test for streaming a CSV upload back as NDJSON.
+    """
+    csv_data = "col1,col2\n1,a\n3,\n5,c\n"
+    files = {"file": ("test.csv", io.BytesIO(csv_data.encode("utf-8")), "text/csv")}
+
+    response = client.post("/upload-csv/?stream=true", files=files)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert ndjson(response) == [
+        {"col1": 1, "col2": "a"},
+        {"col1": 3, "col2": None},
+        {"col1": 5, "col2": "c"},
+    ]
+
+
+def test_upload_csv_stream_empty_file():
+    """
+    Test that an empty file is rejected before the stream starts.
+    """
+    files = {"file": ("test.csv", io.BytesIO(b""), "text/csv")}
+
+    response = client.post("/upload-csv/?stream=true", files=files)
+    assert response.status_code == 400
+    assert "Error reading CSV file" in response.json()["detail"]
+
+
+def test_csv_stream_reads_in_chunks():
+    """
+    Test that rows are parsed chunk by chunk and errors end the stream.
+    """
+    csv_data = "a,b\n1,2\n3,4\n5,6\n7,8,9\n"
+    rows = CSVStream(io.BytesIO(csv_data.encode("utf-8")), chunk_rows=2)
+    assert rows.columns == ["a", "b"]
+    lines = [json.loads(line) for chunk in rows.ndjson() for line in chunk.splitlines()]
+    assert lines[:2] == [{"a": 1, "b": 2}, {"a": 3, "b": 4}]
+    assert "Error reading CSV file" in lines[-1]["error"]
+
+
+def test_upload_csv_columns_format():
+    """
+    Test for column-oriented JSON output.
+    """
+    csv_data = "col1,col2,col3\n1,a,0.5\n3,,\n"
+    files = {"file": ("test.csv", io.BytesIO(csv_data.encode("utf-8")), "text/csv")}
+
+    response = client.post("/upload-csv/?format=columns", files=files)
+    assert response.status_code == 200
+    assert response.json() == {
+        "col1": [1, 3],
+        "col2": ["a", None],
+        "col3": [0.5, None],
+    }
+
+
+def test_upload_csv_ndjson_accept_header():
+    """
+    Test that an NDJSON Accept header streams the rows.
+    """
+    files = {"file": ("test.csv", io.BytesIO(b"col1\n1\n2\n"), "text/csv")}
+
+    response = client.post(
+        "/upload-csv/", files=files, headers={"Accept": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    assert ndjson(response) == [{"col1": 1}, {"col1": 2}]
+
+
+def test_upload_csv_arrow_and_parquet():
+    """
+    Test that the binary formats round-trip with their column types.
+    """
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    csv_data = "id,name,score\n1,a,0.5\n2,b,\n"
+
+    response = client.post(
+        "/upload-csv/",
+        files={"file": ("test.csv", io.BytesIO(csv_data.encode()), "text/csv")},
+        headers={"Accept": "application/vnd.apache.arrow.stream"},
+    )
+    assert response.status_code == 200
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.schema.field("id").type == pa.int64()
+    assert table.column("score").to_pylist() == [0.5, None]
+
+    response = client.post(
+        "/upload-csv/?format=parquet",
+        files={"file": ("test.csv", io.BytesIO(csv_data.encode()), "text/csv")},
+    )
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column("name").to_pylist() == ["a", "b"]
+
+
+SALES_CSV = (
+    "region,product,units,price\n"
+    "north,a,3,2.5\n"
+    "south,b,1,4.0\n"
+    "north,b,,4.0\n"
+    "east,a,7,2.5\n"
+    "south,a,2,2.5\n"
+)
+
+
+def run_sales_query(chunk_rows=2, **query):
+    rows = CSVStream(
+        io.BytesIO(SALES_CSV.encode()), chunk_rows=chunk_rows, usecols=None
+    )
+    return run_query(rows.chunks(), Query(**query))
+
+
+def test_query_aggregates_merge_across_chunks():
+    """
+    Test that group-by aggregates over chunks match the whole-file result.
+    """
+    result = run_sales_query(
+        where=[{"column": "price", "op": "<", "value": 4}],
+        group_by=["region"],
+        aggregates=[
+            {"func": "count"},
+            {"func": "sum", "column": "units"},
+            {"func": "mean", "column": "units", "alias": "avg_units"},
+        ],
+        order_by=[{"column": "region"}],
+    )
+    assert result.to_dict(orient="records") == [
+        {"region": "east", "count": 1, "sum_units": 7.0, "avg_units": 7.0},
+        {"region": "north", "count": 1, "sum_units": 3.0, "avg_units": 3.0},
+        {"region": "south", "count": 1, "sum_units": 2.0, "avg_units": 2.0},
+    ]
+
+    totals = run_sales_query(
+        aggregates=[
+            {"func": "count", "column": "units"},
+            {"func": "max", "column": "units"},
+        ]
+    )
+    assert totals.to_dict(orient="records") == [{"count_units": 4, "max_units": 7.0}]
+
+
+def test_query_select_sort_and_limit():
+    """
+    Test projection with a top-k sort kept across chunks.
+    """
+    result = run_sales_query(
+        select=["product"],
+        where=[{"column": "units", "op": "not_null"}],
+        order_by=[{"column": "units", "descending": True}],
+        limit=2,
+    )
+    assert list(result.columns) == ["product"]
+    assert result["product"].tolist() == ["a", "a"]
+
+
+def test_query_reads_only_the_columns_it_uses():
+    """
+    Test that the query's columns are pushed down into the reader.
+    """
+    query = Query(
+        where=[{"column": "region", "op": "in", "value": ["north"]}],
+        aggregates=[{"func": "sum", "column": "units"}],
+    )
+    assert query.columns() == ["region", "units"]
+    rows = CSVStream(io.BytesIO(SALES_CSV.encode()), usecols=query.columns())
+    assert rows.columns == ["region", "units"]
+    assert run_query(rows.chunks(), query)["sum_units"].tolist() == [3.0]
+
+
+def test_query_endpoint():
+    """
+    Test for querying an uploaded CSV.
+    """
+    query = {
+        "group_by": ["product"],
+        "aggregates": [{"func": "sum", "column": "units"}],
+        "order_by": [{"column": "sum_units", "descending": True}],
+    }
+    response = client.post(
+        "/query?format=columns",
+        files={"file": ("sales.csv", io.BytesIO(SALES_CSV.encode()), "text/csv")},
+        data={"query": json.dumps(query)},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"product": ["a", "b"], "sum_units": [12.0, 1.0]}
+
+
+def test_query_endpoint_bare_count():
+    """
+    Test that a count without columns still reads every row.
+    """
+    assert Query(aggregates=[{"func": "count"}]).columns() is None
+    response = client.post(
+        "/query",
+        files={"file": ("sales.csv", io.BytesIO(SALES_CSV.encode()), "text/csv")},
+        data={"query": json.dumps({"aggregates": [{"func": "count"}]})},
+    )
+    assert response.status_code == 200
+    assert response.json() == [{"count": 5}]
+
+
+def test_query_endpoint_errors():
+    """
+    Test that invalid queries and unknown columns are rejected.
+    """
+    for query, detail in (
+        ({"group_by": ["region"]}, "Invalid query"),
+        ({"select": ["missing"]}, "Error reading CSV file"),
+        ({"where": [{"column": "region", "op": ">", "value": 1}]}, "Invalid query"),
+    ):
+        response = client.post(
+            "/query",
+            files={"file": ("sales.csv", io.BytesIO(SALES_CSV.encode()), "text/csv")},
+            data={"query": json.dumps(query)},
+        )
+        assert response.status_code == 400
+        assert detail in response.json()["detail"]
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "sales.csv").write_text(SALES_CSV)
+    store = DatasetRegistry(str(tmp_path / "store"), data_dir=str(data_dir))
+    monkeypatch.setattr(main, "_datasets", store)
+    yield store
+    store.close()
+
+
+def test_dataset_upload_query_and_export(registry):
+    """
+    Test that a dataset is converted once and then queried and exported.
+    """
+    response = client.post(
+        "/datasets",
+        files={"file": ("sales.csv", io.BytesIO(SALES_CSV.encode()), "text/csv")},
+    )
+    assert response.status_code == 201
+    dataset = response.json()
+    assert dataset["rows"] == 5
+    assert {"name": "units", "type": "int64"} in dataset["columns"]
+
+    query = {
+        "where": [{"column": "region", "op": "==", "value": "north"}],
+        "aggregates": [{"func": "count"}, {"func": "sum", "column": "price"}],
+    }
+    response = client.post(f"/datasets/{dataset['id']}/query", json=query)
+    assert response.status_code == 200
+    assert response.json() == [{"count": 2, "sum_price": 6.5}]
+
+    response = client.get(f"/datasets/{dataset['id']}/rows?format=columns")
+    assert response.json()["region"] == ["north", "south", "north", "east", "south"]
+
+    assert client.get("/datasets").json()["datasets"][0]["id"] == dataset["id"]
+    assert client.delete(f"/datasets/{dataset['id']}").status_code == 204
+    assert client.get(f"/datasets/{dataset['id']}").status_code == 404
+
+
+def test_unknown_dataset_is_not_found(registry):
+    """
+    Test that every dataset endpoint answers 404 for an unknown id.
+    """
+    assert client.get("/datasets/nope").status_code == 404
+    assert client.get("/datasets/nope/rows").status_code == 404
+    assert client.delete("/datasets/nope").status_code == 404
+    response = client.post(
+        "/datasets/nope/query", json={"aggregates": [{"func": "count"}]}
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Dataset not found"}
+
+
+def test_dataset_from_server_path(registry):
+    """
+    Test that server-side paths are confined to the data directory.
+    """
+    response = client.post("/datasets", data={"path": "sales.csv"})
+    assert response.status_code == 201
+    assert response.json()["name"] == "sales.csv"
+    response = client.post("/datasets", data={"path": "sales.csv", "parallel": "true"})
+    assert response.status_code == 201
+    assert response.json()["rows"] == 5
+
+    assert client.post("/datasets", data={"path": "../store/x"}).status_code == 403
+    assert client.post("/datasets", data={"path": "missing.csv"}).status_code == 404
+    assert client.post("/datasets").status_code == 400
+
+
+def test_dataset_store_evicts_least_recently_used(registry):
+    """
+    Test that cold datasets are evicted once the store is over its size.
+    """
+    first = registry.add_path("sales.csv")
+    second = registry.add_path("sales.csv")
+    registry.open(first["id"])
+    registry.max_bytes = first["bytes"] * 2
+    third = registry.add_path("sales.csv")
+
+    ids = [dataset["id"] for dataset in registry.list()]
+    assert ids == [first["id"], third["id"]]
+    assert registry.stats()["evicted"] == 1
+    with pytest.raises(DatasetNotFoundError):
+        registry.open(second["id"])
+
+    reopened = DatasetRegistry(registry.root)
+    assert [dataset["id"] for dataset in reopened.list()] == ids
+    assert reopened.open(third["id"], ["units"]).column_names == ["units"]
+    reopened.close()
+
+
+QUOTED_ROWS = '1,"multi\nline, with comma",0.5\n2,"say ""hi""\n",1\n3,plain,\n4,x,2.5\n'
+QUOTED_CSV = "id,note,score\n" + QUOTED_ROWS
+
+
+def test_split_records_respects_quoted_newlines():
+    """
+    Test that partitions only end at newlines outside quoted fields.
+    """
+    data = QUOTED_CSV.encode()
+    header_end, ranges = split_records(data, parts=8)
+    assert data[:header_end] == b"id,note,score\n"
+    assert ranges[0][0] == header_end and ranges[-1][1] == len(data)
+    for start, end in ranges:
+        assert data[start:end].count(b'"') % 2 == 0
+    assert [data[start:end].split(b",")[0] for start, end in ranges] == [
+        b"1",
+        b"2",
+        b"3",
+        b"4",
+    ]
+
+
+def test_read_csv_parallel_matches_pandas(tmp_path, monkeypatch):
+    """
+    Test that a partitioned parse merges to the single-threaded result.
+    """
+    path = tmp_path / "quoted.csv"
+    path.write_text(QUOTED_CSV + QUOTED_ROWS * 50)
+    monkeypatch.setattr("services.csv_tool.ingest.MIN_PARTITION_BYTES", 256)
+
+    expected = pd.read_csv(path)
+    # Sampling only the first rows infers score as int64, which later
+    # partitions do not fit
+    result = read_csv_parallel(str(path), workers=2, sample_rows=1)
+    pd.testing.assert_frame_equal(result, expected)
+
+    typed = read_csv_parallel(str(path), workers=1, schema={"id": "int64"})
+    assert str(typed["id"].dtype) == "int64"
+    with pytest.raises(ValueError):
+        read_csv_parallel(str(path), workers=1, schema={"note": "int64"})
+
+
+def test_upload_csv_parallel_with_column_types():
+    """
+    Test for the parallel ingest mode and explicit column types.
+    """
+    files = {"file": ("test.csv", io.BytesIO(QUOTED_CSV.encode()), "text/csv")}
+    response = client.post(
+        "/upload-csv/",
+        files=files,
+        params={
+            "parallel": "true",
+            "format": "columns",
+            "column_types": json.dumps({"score": "float64"}),
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["score"] == [0.5, 1.0, None, 2.5]
+
+    files = {"file": ("test.csv", io.BytesIO(QUOTED_CSV.encode()), "text/csv")}
+    response = client.post(
+        "/upload-csv/", files=files, params={"column_types": '{"id": "date"}'}
+    )
+    assert response.status_code == 400
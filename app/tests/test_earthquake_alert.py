@@ -1,7 +1,25 @@
+import asyncio
+import json
+
+import httpx
+import numpy as np
 import pytest
+from fastapi import WebSocketDisconnect
 from fastapi.testclient import TestClient
 from datetime import datetime, timedelta
-from services.earthquake_alert.main import app, db, active_connections, Earthquake
+from typing import List, Optional
+from services.earthquake_alert.main import (
+    app,
+    db,
+    active_connections,
+    calculate_distance,
+    store_features,
+    Earthquake,
+)
+from services.earthquake_alert.broadcast import EarthquakeBroadcaster
+from services.earthquake_alert.feed import FeedPoller
+from services.earthquake_alert.spatial import GridIndex
+from services.http_client import OutboundClient, OutboundConfig
 
 client = TestClient(app)
 
@@ -180,3 +198,314 @@ def test_get_recent_earthquakes():
 
     assert len(data) == 1
     assert data[0]["id"] == "test_id_1"
+
+
+def test_store_skips_duplicate_ids_and_keeps_time_order():
+    """
+    Test for the id index and time ordering of the earthquake store.
+    Verifies that known ids are skipped and windows are cut by time.
+    """
+    now = datetime.utcnow()
+    later = create_earthquake("later", 5.0, 0.0, 0.0, 10.0, "Later")
+    earlier = create_earthquake("earlier", 4.0, 0.0, 0.0, 10.0, "Earlier")
+    earlier.time = now - timedelta(hours=2)
+
+    assert db.add_many([later, earlier, later]) == [later, earlier]
+    assert not db.add(create_earthquake("later", 6.0, 1.0, 1.0, 5.0, "Again"))
+    assert [eq.id for eq in db] == ["earlier", "later"]
+    assert db.get("later") == later and "earlier" in db
+    assert db.between(now - timedelta(hours=1)) == [later]
+    assert db.between(end=now - timedelta(hours=1)) == [earlier]
+    assert len(db) == 2
+
+
+def test_get_earthquakes_by_time_window():
+    """
+    Test for filtering earthquakes by start and end time.
+    Verifies that aware and naive timestamps select the same window.
+    """
+    earthquake = create_earthquake("test_id_1", 5.0, 0.0, 0.0, 10.0, "Somewhere")
+    earthquake.time = datetime(2024, 1, 1, 12, 0)
+    db.append(earthquake)
+
+    response = client.get(
+        "/earthquakes",
+        params={"start_time": "2024-01-01T11:00:00Z", "end_time": "2024-01-01T13:00"},
+    )
+    assert [eq["id"] for eq in response.json()] == ["test_id_1"]
+    response = client.get("/earthquakes", params={"start_time": "2024-01-02T00:00"})
+    assert response.json() == []
+
+
+def test_get_earthquakes_within_radius():
+    """
+    Test for filtering earthquakes by distance from a point.
+    Verifies that only events within `radius_km` are returned, oldest first.
+    """
+    los_angeles = create_earthquake("la", 5.0, 34.0522, -118.2437, 10.0, "LA")
+    los_angeles.time = datetime.utcnow() - timedelta(hours=1)
+    pasadena = create_earthquake("pasadena", 4.0, 34.1478, -118.1445, 8.0, "Pasadena")
+    san_francisco = create_earthquake("sf", 6.0, 37.7749, -122.4194, 12.0, "SF")
+    db.extend([pasadena, san_francisco, los_angeles])
+
+    response = client.get(
+        "/earthquakes",
+        params={"latitude": 34.05, "longitude": -118.25, "radius_km": 200},
+    )
+    assert [eq["id"] for eq in response.json()] == ["la", "pasadena"]
+    response = client.get(
+        "/earthquakes",
+        params={
+            "latitude": 34.05,
+            "longitude": -118.25,
+            "radius_km": 200,
+            "min_magnitude": 4.5,
+        },
+    )
+    assert [eq["id"] for eq in response.json()] == ["la"]
+
+
+@pytest.mark.parametrize(
+    "latitude, longitude, radius_km",
+    [
+        (0.0, 0.0, 500.0),
+        (89.0, 30.0, 300.0),
+        (-60.0, 179.5, 800.0),
+        (10.0, -180.0, 5e4),
+    ],
+)
+def test_grid_index_matches_linear_scan(latitude, longitude, radius_km):
+    """
+    Test for the grid spatial index.
+    Verifies that radius queries near the poles and across the antimeridian
+    find the same points as an exact scan of every point.
+    """
+    rng = np.random.default_rng(0)
+    points = list(
+        zip(rng.uniform(-90, 90, 5000), rng.uniform(-180, 180, 5000), strict=True)
+    )
+    points += [(latitude + 1.0, longitude), (89.9, -longitude), (-89.9, 0.0)]
+    grid: GridIndex[int] = GridIndex()
+    for i, (lat, lon) in enumerate(points):
+        grid.add(lat, lon, i)
+
+    expected = {
+        i
+        for i, (lat, lon) in enumerate(points)
+        if calculate_distance(lat, lon, latitude, longitude) <= radius_km
+    }
+    assert expected
+    assert set(grid.within(latitude, longitude, radius_km)) == expected
+
+
+def test_store_query_combines_time_magnitude_and_distance():
+    """
+    Test for the columnar earthquake store.
+    Verifies that late arrivals are merged in time order and that narrow and
+    wide time windows apply the same magnitude and distance filters.
+    """
+    start = datetime(2024, 1, 1)
+    quakes = []
+    for i in range(40):
+        quake = create_earthquake(f"eq{i}", i % 8, i % 4, 0.0, 10.0, "Somewhere")
+        quake.time = start + timedelta(hours=i)
+        quakes.append(quake)
+    db.extend(quakes[20:])
+    assert len(db.between()) == 20
+    db.extend(reversed(quakes[:20]))  # Late arrivals, merged before newer rows
+
+    assert [eq.id for eq in db] == [f"eq{i}" for i in range(40)]
+    expected = [
+        eq.id
+        for eq in quakes[4:]
+        if eq.magnitude >= 5 and calculate_distance(eq.latitude, 0, 0, 0) <= 250
+    ]
+    for end in (start + timedelta(hours=6), None):
+        found = db.query(start + timedelta(hours=4), end, 5, None, 0.0, 0.0, 250)
+        assert [eq.id for eq in found] == [
+            eq_id for eq_id in expected if end is None or int(eq_id[2:]) <= 6
+        ]
+    found[0].magnitude = 0.0
+    assert db.get(found[0].id).magnitude == 5
+
+
+def usgs_feature(id: str, magnitude: float, updated: int) -> dict:
+    """
+    Helper function to create a USGS GeoJSON feature.
+    """
+    return {
+        "id": id,
+        "properties": {
+            "mag": magnitude,
+            "time": 1704110400000,
+            "updated": updated,
+            "place": "Somewhere",
+        },
+        "geometry": {"coordinates": [-118.2437, 34.0522, 10.0]},
+    }
+
+
+@pytest.mark.asyncio
+async def test_feed_poller_sends_validators_and_skips_unchanged():
+    """
+    Test for incremental polling of the USGS feed.
+    Verifies that validators are sent back, a 304 yields nothing and only
+    features updated since the last poll are returned and upserted.
+    """
+    requests = []
+    responses = [
+        httpx.Response(
+            200,
+            json={"features": [usgs_feature("a", 4.0, 10), usgs_feature("b", 5.0, 20)]},
+            headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 12:00:00 GMT"},
+        ),
+        httpx.Response(304),
+        httpx.Response(
+            200,
+            json={"features": [usgs_feature("a", 4.5, 30), usgs_feature("b", 5.0, 20)]},
+            headers={"ETag": '"v2"'},
+        ),
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return responses.pop(0)
+
+    client = OutboundClient(
+        OutboundConfig(retries=0), async_transport=httpx.MockTransport(handler)
+    )
+    poller = FeedPoller("hour", client)
+
+    assert store_features(await poller.poll()) == db.copy()
+    assert await poller.poll() == []
+    changed = await poller.poll("day")
+    assert [feature["id"] for feature in changed] == ["a"]
+    assert store_features(changed) == []
+
+    assert "If-None-Match" not in requests[0].headers
+    assert requests[1].headers["If-None-Match"] == '"v1"'
+    assert requests[1].headers["If-Modified-Since"].startswith("Mon, 01 Jan 2024")
+    assert "If-None-Match" not in requests[2].headers  # A different feed
+    assert requests[2].url.path.endswith("all_day.geojson")
+    assert poller.not_modified == 1 and poller.updated == 30
+    assert db.get("a").magnitude == 4.5 and len(db) == 2
+
+
+def test_store_upsert_moves_revised_events():
+    """
+    Test for updating a stored earthquake.
+    Verifies that a revised time and position are reflected by queries.
+    """
+    first = create_earthquake("first", 5.0, 0.0, 0.0, 10.0, "Somewhere")
+    second = create_earthquake("second", 5.0, 10.0, 10.0, 10.0, "Elsewhere")
+    first.time = second.time - timedelta(hours=1)
+    db.extend([first, second])
+    assert db.within(0.0, 0.0, 100) == [first]
+
+    revised = first.model_copy(
+        update={"time": second.time + timedelta(hours=1), "latitude": 10.0}
+    )
+    assert not db.upsert(revised)
+    assert [eq.id for eq in db] == ["second", "first"]
+    assert db.within(0.0, 0.0, 100) == []
+    assert db.within(10.0, 0.0, 100) == [revised]
+
+
+class FakeWebSocket:
+    """
+    Stand-in for a connected client that records what it is sent.
+    A delay makes it slow and ``fail`` makes every send raise.
+    """
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.received: List[str] = []
+        self.close_code: Optional[int] = None
+        self._gone = asyncio.Event()
+
+    async def send_text(self, message: str):
+        if self.fail:
+            raise RuntimeError("Connection lost")
+        await asyncio.sleep(self.delay)
+        self.received.append(json.loads(message)["id"])
+
+    async def receive_text(self):
+        await self._gone.wait()
+        raise WebSocketDisconnect()
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+        self._gone.set()
+
+    def disconnect(self):
+        self._gone.set()
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_applies_subscriber_filters():
+    """
+    Test for the websocket broadcaster.
+    Verifies that subscribers only receive events passing their magnitude
+    and region filters, and are removed once they disconnect.
+    """
+    broadcaster = EarthquakeBroadcaster()
+    everything, strong, nearby = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    tasks = [
+        asyncio.create_task(broadcaster.serve(broadcaster.subscribe(everything))),
+        asyncio.create_task(
+            broadcaster.serve(broadcaster.subscribe(strong, min_magnitude=5.0))
+        ),
+        asyncio.create_task(
+            broadcaster.serve(
+                broadcaster.subscribe(
+                    nearby, latitude=34.0, longitude=-118.0, radius_km=500.0
+                )
+            )
+        ),
+    ]
+    broadcaster.publish(
+        [
+            create_earthquake("la", 4.0, 34.05, -118.24, 10.0, "Los Angeles"),
+            create_earthquake("tokyo", 6.5, 35.68, 139.69, 30.0, "Tokyo"),
+        ]
+    )
+    await asyncio.sleep(0.05)
+
+    assert everything.received == ["la", "tokyo"]
+    assert strong.received == ["tokyo"]
+    assert nearby.received == ["la"]
+    assert broadcaster.stats()["sent"] == 4
+    for websocket in (everything, strong, nearby):
+        websocket.disconnect()
+    await asyncio.gather(*tasks)
+    assert broadcaster.subscribers == [] and broadcaster.evicted == 0
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_evicts_slow_and_dead_subscribers():
+    """
+    Test for evicting websocket subscribers.
+    Verifies that a stalled or failing client is dropped and closed without
+    delaying the alerts of a healthy one.
+    """
+    broadcaster = EarthquakeBroadcaster(max_queue=2, send_timeout=0.1)
+    healthy, slow, dead = (
+        FakeWebSocket(),
+        FakeWebSocket(delay=10),
+        FakeWebSocket(fail=True),
+    )
+    tasks = [
+        asyncio.create_task(broadcaster.serve(broadcaster.subscribe(websocket)))
+        for websocket in (healthy, slow, dead)
+    ]
+    for i in range(5):
+        broadcaster.publish([create_earthquake(f"eq{i}", 5.0, 0, 0, 10.0, "Sea")])
+        await asyncio.sleep(0.01)
+
+    assert healthy.received == [f"eq{i}" for i in range(5)]
+    assert [s.websocket for s in broadcaster.subscribers] == [healthy]
+    assert slow.close_code == 1013 and dead.close_code == 1013
+    assert broadcaster.evicted == 2
+    healthy.disconnect()
+    await asyncio.wait_for(asyncio.gather(*tasks), 1.0)
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import pytest
+from gateway.executor import (
+    GatewayExecutor,
+    PoolSaturatedError,
+    ServicePool,
+    parse_pool_sizes,
+)
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result():
+    pool = ServicePool("test", max_workers=1, max_queue=0)
+    try:
+        assert await pool.run(lambda a, b: a + b, 2, b=3) == 5
+        stats = pool.stats()
+        assert stats["completed"] == 1
+        assert stats["active"] == 0
+        assert stats["queued"] == 0
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_propagates_exceptions():
+    pool = ServicePool("test", max_workers=1, max_queue=0)
+
+    def fail():
+        raise ValueError("boom")
+
+    try:
+        with pytest.raises(ValueError):
+            await pool.run(fail)
+        assert pool.stats()["completed"] == 1
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_full_pool_rejects_calls():
+    pool = ServicePool("slow", max_workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(PoolSaturatedError):
+            await pool.run(release.wait)
+
+        stats = pool.stats()
+        assert stats["active"] == 1
+        assert stats["queued"] == 1
+        assert stats["rejected"] == 1
+
+        release.set()
+        await asyncio.gather(running, queued)
+        assert pool.stats()["completed"] == 2
+        assert pool.stats()["wait_ms"]["max"] > 0
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_slow_service_does_not_block_other_services():
+    executor = GatewayExecutor(default_workers=1, default_queue=0)
+    release = threading.Event()
+    try:
+        slow = asyncio.ensure_future(executor.run("slow", release.wait))
+        await asyncio.sleep(0.05)
+        assert await executor.run("fast", lambda: "ok") == "ok"
+        assert set(executor.stats()) == {"fast", "slow"}
+        release.set()
+        await slow
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_parse_pool_sizes():
+    assert parse_pool_sizes("crypto_price_alert=8:32, weather_alert=2", 16) == {
+        "crypto_price_alert": (8, 32),
+        "weather_alert": (2, 16),
+    }
+    assert parse_pool_sizes("", 16) == {}
+    with pytest.raises(ValueError):
+        parse_pool_sizes("broken", 16)
+
+
+def test_executor_from_env():
+    executor = GatewayExecutor.from_env(
+        {
+            "GATEWAY_POOL_WORKERS": "2",
+            "GATEWAY_POOL_QUEUE": "3",
+            "GATEWAY_POOL_SIZES": "csv_tool=5:7",
+        }
+    )
+    try:
+        assert executor.pool("csv_tool").max_workers == 5
+        assert executor.pool("csv_tool").max_queue == 7
+        assert executor.pool("word_counter").max_workers == 2
+        assert executor.pool("word_counter").max_queue == 3
+    finally:
+        executor.shutdown()
@@ -0,0 +1,96 @@
+import sys
+import textwrap
+import types
+import pytest
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from gateway.mount import LazyServiceApp, enable_in_process
+from gateway.registry import ServiceRegistry, ServiceSpec
+
+SERVICE_MODULE = """
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket
+
+events = []
+IN_PROCESS = False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    events.append("startup")
+    yield
+    events.append("shutdown")
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.get("/hello")
+def hello():
+    return {"message": "hello", "in_process": IN_PROCESS}
+
+
+@app.websocket("/ws")
+async def ws(websocket: WebSocket):
+    await websocket.accept()
+    await websocket.send_text("hi")
+    await websocket.close()
+"""
+
+
+@pytest.fixture
+def gateway(tmp_path, monkeypatch):
+    """Gateway app with one lazily mounted service and one broken service."""
+    (tmp_path / "mounted_service.py").write_text(textwrap.dedent(SERVICE_MODULE))
+    (tmp_path / "unmountable.py").write_text("raise ImportError('missing')\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    registry = ServiceRegistry(
+        [
+            ServiceSpec("mounted", "mounted_service"),
+            ServiceSpec("broken", "unmountable"),
+        ],
+        on_load=enable_in_process,
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await registry.aclose()
+
+    app = FastAPI(lifespan=lifespan)
+    for name in registry.specs:
+        app.mount(f"/services/{name}", LazyServiceApp(registry, name))
+    yield app, registry
+    sys.modules.pop("mounted_service", None)
+    sys.modules.pop("unmountable", None)
+
+
+def test_mounted_service_is_served_in_process(gateway):
+    app, registry = gateway
+    with TestClient(app) as client:
+        assert not registry.is_loaded("mounted")
+        response = client.get("/services/mounted/hello")
+        assert response.status_code == 200
+        assert response.json() == {"message": "hello", "in_process": True}
+        assert sys.modules["mounted_service"].events == ["startup"]
+
+        with client.websocket_connect("/services/mounted/ws") as websocket:
+            assert websocket.receive_text() == "hi"
+
+    assert sys.modules["mounted_service"].events == ["startup", "shutdown"]
+
+
+def test_unavailable_service_returns_503(gateway):
+    app, _ = gateway
+    with TestClient(app) as client:
+        response = client.get("/services/broken/anything")
+        assert response.status_code == 503
+        assert "is unavailable" in response.json()["detail"]
+
+
+def test_enable_in_process_ignores_services_without_switch():
+    module = types.ModuleType("plain")
+    enable_in_process("plain", module)
+    assert not hasattr(module, "IN_PROCESS")
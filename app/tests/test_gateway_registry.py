@@ -0,0 +1,208 @@
+import importlib
+import inspect
+import sys
+import textwrap
+import pytest
+from fastapi.testclient import TestClient
+from pathlib import Path
+from gateway.registry import (
+    ServiceRegistry,
+    ServiceSpec,
+    ServiceUnavailableError,
+    parse_warmup,
+)
+
+SERVICE_MODULE = """
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+
+events = []
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    events.append("startup")
+    yield
+    events.append("shutdown")
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def echo(value):
+    return value
+"""
+
+
+@pytest.fixture
+def fake_service(tmp_path, monkeypatch):
+    """Creates an importable service module with a recording lifespan."""
+    (tmp_path / "fake_service.py").write_text(textwrap.dedent(SERVICE_MODULE))
+    (tmp_path / "broken_service.py").write_text("raise RuntimeError('no deps')\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield
+    sys.modules.pop("fake_service", None)
+    sys.modules.pop("broken_service", None)
+
+
+@pytest.fixture
+def registry(fake_service):
+    return ServiceRegistry(
+        [
+            ServiceSpec("fake", "fake_service", "echo"),
+            ServiceSpec("no_entrypoint", "fake_service", "missing"),
+            ServiceSpec("broken", "broken_service", "echo"),
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_service_is_loaded_on_first_use(registry):
+    assert "fake_service" not in sys.modules
+    assert not registry.is_loaded("fake")
+
+    entrypoint = await registry.resolve("fake")
+    assert entrypoint("hello") == "hello"
+    assert registry.is_loaded("fake")
+
+    module = sys.modules["fake_service"]
+    assert module.events == ["startup"]
+
+    await registry.resolve("fake")
+    assert module.events == ["startup"]
+
+    await registry.aclose()
+    assert module.events == ["startup", "shutdown"]
+
+
+@pytest.mark.asyncio
+async def test_stats_report_import_time(registry):
+    await registry.load("fake")
+    stats = registry.stats()
+    assert stats["fake"]["loaded"] is True
+    assert stats["fake"]["import_ms"] >= 0
+    assert stats["broken"] == {"loaded": False}
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_broken_service_is_unavailable(registry):
+    with pytest.raises(ServiceUnavailableError):
+        await registry.load("broken")
+    assert "import failed" in registry.stats()["broken"]["error"]
+
+
+@pytest.mark.asyncio
+async def test_missing_entrypoint_is_unavailable(registry):
+    with pytest.raises(ServiceUnavailableError):
+        await registry.resolve("no_entrypoint")
+    # Rejected before the lifespan, so nothing was started
+    assert sys.modules["fake_service"].events == []
+    stats = registry.stats()["no_entrypoint"]
+    assert stats["loaded"] is False
+    assert "no entrypoint" in stats["error"]
+    with pytest.raises(ServiceUnavailableError):
+        await registry.resolve("unknown")
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_skips_failures(registry):
+    await registry.warm_up(["fake", "broken"])
+    assert registry.is_loaded("fake")
+    assert not registry.is_loaded("broken")
+    await registry.aclose()
+
+
+def test_parse_warmup():
+    names = ["fake", "broken"]
+    assert parse_warmup("", names) == []
+    assert parse_warmup("fake", names) == ["fake"]
+    assert parse_warmup("all", names) == names
+    with pytest.raises(ValueError):
+        parse_warmup("fake,unknown", names)
+
+
+# Positional arguments each gateway route in app/main.py passes to its service
+GATEWAY_ARGS = {
+    "basic_list_operations": ("add", "item"),
+    "bmi_calculator": (180.0, 75.0),
+    "crypto_price_alert": ("bitcoin", 50000.0),
+    "bpm_counter": ([0.0, 0.5, 1.0],),
+    "word_counter": ("some text",),
+    "weather_alert": ("Berlin",),
+    "text_to_speech": ("hello", "en"),
+    "text_reverse": ("abc",),
+    "temperature_converter": (20.0, "celsius"),
+    "qr_code_generator": ("https://example.com",),
+    "password_generator": (16,),
+    "net_benchmark": (),
+    "language_translator": ("hello", "de"),
+    "fourier_transform": ([0.0, 1.0, 0.0, -1.0],),
+    "earthquake_alert": ("Alaska",),
+    "csv_tool": ("sales.csv",),
+}
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """The gateway module, imported from the repository root like in production."""
+    monkeypatch.syspath_prepend(str(Path(__file__).resolve().parents[2]))
+    return importlib.import_module("app.main")
+
+
+def test_gateway_args_cover_every_service(gateway):
+    assert {spec.name for spec in gateway.SERVICES} == set(GATEWAY_ARGS)
+
+
+@pytest.mark.parametrize("name", sorted(GATEWAY_ARGS))
+def test_gateway_entrypoint_accepts_route_arguments(gateway, name):
+    spec = gateway.registry.specs[name]
+    try:
+        module = importlib.import_module(spec.module)
+    except (ImportError, OSError) as e:
+        pytest.skip(f"{spec.module} cannot be imported here: {e}")
+    entrypoint = getattr(module, spec.entrypoint, None)
+    assert callable(entrypoint), f"{spec.module} has no {spec.entrypoint}"
+    inspect.signature(entrypoint).bind(*GATEWAY_ARGS[name])
+
+
+def test_gateway_routes_call_their_services(gateway):
+    client = TestClient(gateway.app)
+    for path, params, expected in (
+        ("/api/word-counter", {"text": "one two"}, {"word_count": 2}),
+        ("/api/text-reverse", {"text": "abc"}, {"reversed_text": "cba"}),
+        ("/api/bmi-calculator", {"height": 200, "weight": 100}, None),
+        ("/api/password-generator", {"length": 12}, None),
+        ("/api/temperature-converter", {"value": 100, "unit": "celsius"}, None),
+    ):
+        response = client.post(path, params=params)
+        assert response.status_code == 200, response.text
+        if expected is not None:
+            assert response.json() == {"result": expected}
+    response = client.post(
+        "/api/temperature-converter", params={"value": 0, "unit": "celsius"}
+    )
+    assert response.json()["result"]["kelvin"] == 273.15
+
+
+def test_gateway_csv_tool_maps_path_errors(gateway, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "sales.csv").write_text("region,units\nnorth,3\nsouth,1\n")
+    monkeypatch.setenv("CSV_TOOL_DATASET_DIR", str(tmp_path / "store"))
+    monkeypatch.setenv("CSV_TOOL_DATA_DIR", str(data_dir))
+    csv_main = importlib.import_module("app.services.csv_tool.main")
+    monkeypatch.setattr(csv_main, "_datasets", None)
+
+    client = TestClient(gateway.app)
+    for file_path, status in (
+        ("../../etc/passwd", 403),
+        ("missing.csv", 404),
+        ("sales.csv", 200),
+    ):
+        response = client.post("/api/csv-tool", params={"file_path": file_path})
+        assert response.status_code == status, response.text
+    assert response.json()["result"]["rows"] == 2
+    csv_main.get_datasets().close()
@@ -0,0 +1,154 @@
+import asyncio
+import io
+
+import httpx
+import pytest
+import requests
+from services.http_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    OutboundClient,
+    OutboundConfig,
+)
+
+URL = "https://api.example.com/data"
+
+
+def make_response(status_code: int) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(b"{}")
+    return response
+
+
+@pytest.fixture
+def config():
+    return OutboundConfig(retries=2, backoff=0, breaker_threshold=3)
+
+
+def fake_session(monkeypatch, client, outcomes):
+    """Replaces the session transport with a scripted list of outcomes."""
+    calls = []
+
+    def request(method, url, **kwargs):
+        calls.append((method, kwargs))
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return make_response(outcome)
+
+    monkeypatch.setattr(client.session, "request", request)
+    return calls
+
+
+def test_get_retries_transient_failures(monkeypatch, config):
+    client = OutboundClient(config)
+    calls = fake_session(monkeypatch, client, [requests.ConnectionError(), 503, 200])
+
+    response = client.get(URL)
+
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert calls[0][1]["timeout"] == (config.connect_timeout, config.read_timeout)
+    metrics = client.metrics()["api.example.com"]
+    assert metrics["requests"] == 3
+    assert metrics["errors"] == 2
+    assert metrics["retries"] == 2
+    assert metrics["in_flight"] == 0
+
+
+def test_post_is_not_retried(monkeypatch, config):
+    client = OutboundClient(config)
+    calls = fake_session(monkeypatch, client, [503, 200])
+
+    assert client.post(URL).status_code == 503
+    assert len(calls) == 1
+
+
+def test_gives_up_after_retries(monkeypatch, config):
+    client = OutboundClient(config)
+    fake_session(monkeypatch, client, [requests.Timeout()] * 3)
+
+    with pytest.raises(requests.Timeout):
+        client.get(URL)
+
+
+def test_circuit_opens_after_failures(monkeypatch, config):
+    client = OutboundClient(config)
+    calls = fake_session(monkeypatch, client, [500, 500, 500])
+
+    assert client.post(URL).status_code == 500
+    assert client.post(URL).status_code == 500
+    assert client.post(URL).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        client.get(URL)
+
+    assert len(calls) == 3
+    metrics = client.metrics()["api.example.com"]
+    assert metrics["circuit"] == "open"
+    assert metrics["rejected"] == 1
+
+
+def test_circuit_breaker_half_open_probe(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_config_from_env():
+    config = OutboundConfig.from_env(
+        {"OUTBOUND_READ_TIMEOUT": "2.5", "OUTBOUND_RETRIES": "0"}
+    )
+    assert config.read_timeout == 2.5
+    assert config.retries == 0
+    assert config.pool_size == OutboundConfig().pool_size
+
+
+@pytest.mark.asyncio
+async def test_async_get_retries_and_keeps_one_client(config):
+    statuses = [502, 200, 200]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(statuses.pop(0), json={"ok": True})
+
+    client = OutboundClient(config, async_transport=httpx.MockTransport(handler))
+
+    response = await client.aget(URL)
+    assert response.status_code == 200
+    first_client = client._get_async_client()
+    await client.aget(URL)
+    assert client._get_async_client() is first_client
+
+    metrics = client.metrics()["api.example.com"]
+    assert metrics["requests"] == 3
+    assert metrics["retries"] == 1
+
+
+def test_async_clients_are_kept_per_event_loop(config):
+    client = OutboundClient(config, async_transport=httpx.MockTransport(lambda r: None))
+
+    async def current():
+        return client._get_async_client()
+
+    async def closed_and_replaced():
+        first = client._get_async_client()
+        await client.aclose()
+        return first.is_closed and client._get_async_client() is not first
+
+    loop = asyncio.new_event_loop()
+    try:
+        first = loop.run_until_complete(current())
+        assert asyncio.run(current()) is not first
+        assert loop.run_until_complete(current()) is first
+        assert loop.run_until_complete(closed_and_replaced())
+    finally:
+        loop.close()
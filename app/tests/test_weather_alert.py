@@ -59,7 +59,7 @@ def test_post_weather_data_invalid_location():
 
 
 def test_fetch_weather_data_api_error(monkeypatch):
-    """Mock the requests.get method to simulate an API error"""
+    """Mock the outbound client's get method to simulate an API error"""
 
     def mock_response(*args, **kwargs):
         class MockResponse:
@@ -70,7 +70,7 @@ def test_fetch_weather_data_api_error(monkeypatch):
 
         return MockResponse()
 
-    monkeypatch.setattr("requests.get", mock_response)
+    monkeypatch.setattr("services.http_client.OutboundClient.get", mock_response)
 
     location = "Berlin"
     response = client.post(f"/weather/?location={location}")